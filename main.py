@@ -1,9 +1,15 @@
 import sys
+from contextlib import nullcontext
 import logging
 import argparse
 from modules.config import load_config
 from modules.ontology_creator import create_ontology_from_config
+from modules.sharded_creator import create_sharded_ontology
+from modules.ontology_updater import update_ontology_from_config
 from modules.ontology_processor import OntologyProcessor
+from modules.query_server import serve_ontology
+from modules.ontology_output import OUTPUT_FORMATS
+from modules.alignment_io import ALIGNMENT_FORMATS, alignment_format
 from modules.ontology_aligner import OntologyAligner
 from modules.ontology_matcher import OntologyMatcher
 
@@ -13,29 +19,74 @@ logger = logging.getLogger(__name__)
 
 def main():
     parser = argparse.ArgumentParser(description="OntologyAgent: Create, process, align, and match ontologies.")
-    parser.add_argument("action", choices=["create", "process", "align", "match"], help="Action to perform")
-    parser.add_argument("--config", help="Path to the configuration file (for create action)")
-    parser.add_argument("--ontology", help="Path to the ontology file (for process action)")
+    parser.add_argument("action", choices=["create", "update", "process", "serve", "align", "match"], help="Action to perform")
+    parser.add_argument("--config", help="Path to the configuration file (for create and update actions)")
+    parser.add_argument("--ontology", help="Path to the ontology file (for process and serve actions)")
     parser.add_argument("--ontology1", help="Path to the first ontology file (for align and match actions)")
     parser.add_argument("--ontology2", help="Path to the second ontology file (for align and match actions)")
     parser.add_argument("--output", help="Path to save the output")
     parser.add_argument("--concept", help="Concept name for reasoning (for process action)")
     parser.add_argument("--class", dest="class_name", help="Class name for subclass or individual queries (for process action)")
     parser.add_argument("--query", choices=["subclasses", "individuals"], help="Type of query to perform (for process action)")
+    parser.add_argument("--batch", help="JSON Lines file of queries to answer, or - for stdin (for process action)")
+    parser.add_argument("--stream", action="store_true", default=None, help="Stream individuals into a disk-backed quadstore (for create action)")
+    parser.add_argument("--format", choices=[*OUTPUT_FORMATS, *ALIGNMENT_FORMATS],
+                        help=f"Output serialization (for create and update actions: {', '.join(OUTPUT_FORMATS)}) "
+                             f"or alignment format (for align action: {', '.join(ALIGNMENT_FORMATS)})")
+    parser.add_argument("--gzip", action="store_true", default=None,
+                        help="Gzip-compress the created ontology or alignment (for create, update and align actions; not parquet alignments)")
+    parser.add_argument("--shards", type=int, help="Create individuals in this many parallel shards (for create action)")
+    parser.add_argument("--workers", type=int, help="Number of worker processes for sharded creation (for create action)")
+    parser.add_argument("--shard-merge", choices=["concat", "imports"], help="Merge shards into one file or import them (for create action)")
+    parser.add_argument("--verify", choices=["none", "cheap", "full"], help="How to check the written ontology file (for create action)")
+    parser.add_argument("--quadstore", help="Quadstore holding the last applied config (for update action)")
+    parser.add_argument("--quadstore-dir", help="Directory of persistent quadstores to load the ontology from (for process and serve actions)")
+    parser.add_argument("--reference", help="Reference alignment to measure candidate recall against (for align action)")
+    parser.add_argument("--previous", help="Previous alignment to update incrementally (for align action)")
+    parser.add_argument("--old-ontology1", help="Previous release of the first ontology (for align action with --previous)")
+    parser.add_argument("--old-ontology2", help="Previous release of the second ontology (for align action with --previous)")
+    parser.add_argument("--host", help="Interface to listen on (for serve action)")
+    parser.add_argument("--port", type=int, help="Port to listen on (for serve action)")
     args = parser.parse_args()
+    # --format is shared by actions writing different kinds of files, check it before any work
+    if args.format and args.action in ("create", "update") and args.format not in OUTPUT_FORMATS:
+        parser.error(f"--format {args.format} is not an ontology format (for {args.action} action)")
+    if args.action == "align":
+        if args.format and args.format not in ALIGNMENT_FORMATS:
+            parser.error(f"--format {args.format} is not an alignment format (for align action)")
+        if args.gzip and (args.format or alignment_format(args.output or "")[0]) == "parquet":
+            parser.error("--gzip does not apply to parquet alignments, which compress their columns")
 
     try:
         if args.action == "create":
             if not args.config:
                 raise ValueError("Config file path is required for create action")
-            create_ontology_from_config(args.config)
+            if args.shards:
+                create_sharded_ontology(args.config, shards=args.shards, workers=args.workers, merge=args.shard_merge,
+                                        output_path=args.output, output_format=args.format or "ntriples",
+                                        compress=bool(args.gzip), verification=args.verify)
+            else:
+                create_ontology_from_config(args.config, streaming=args.stream, verification=args.verify,
+                                            output_path=args.output, output_format=args.format, compress=args.gzip)
+        
+        elif args.action == "update":
+            if not args.config:
+                raise ValueError("Config file path is required for update action")
+            update_ontology_from_config(args.config, quadstore_path=args.quadstore, streaming=args.stream,
+                                        verification=args.verify, output_path=args.output,
+                                        output_format=args.format, compress=args.gzip)
         
         elif args.action == "process":
             if not args.ontology:
                 raise ValueError("Ontology file path is required for process action")
-            processor = OntologyProcessor(args.ontology)
+            processor = OntologyProcessor(args.ontology, quadstore_dir=args.quadstore_dir)
             
-            if args.concept:
+            if args.batch:
+                # The standard streams are left open for the rest of the program
+                with open(args.batch) if args.batch != "-" else nullcontext(sys.stdin) as queries, \
+                        open(args.output, 'w') if args.output else nullcontext(sys.stdout) as results:
+                    processor.run_batch_file(queries, results)
+            elif args.concept:
                 inferred_subsumers = processor.perform_reasoning(args.concept)
                 print(f"Inferred subsumers of {args.concept}: {inferred_subsumers}")
             elif args.class_name and args.query:
@@ -50,13 +101,27 @@ def main():
                 print(f"Classes: {classes}")
                 print(f"Properties: {properties}")
         
+        elif args.action == "serve":
+            if not args.ontology:
+                raise ValueError("Ontology file path is required for serve action")
+            serve_ontology(args.ontology, host=args.host, port=args.port, quadstore_dir=args.quadstore_dir)
+        
         elif args.action == "align":
             if not (args.ontology1 and args.ontology2):
                 raise ValueError("Two ontology file paths are required for align action")
             aligner = OntologyAligner(args.ontology1, args.ontology2)
-            alignment = aligner.align_ontologies()
+            if args.reference:
+                for k, recall in aligner.evaluate_candidates(args.reference, [1, 5, 10, 20, 50, 100]).items():
+                    print(f"Candidate recall at {k}: {recall:.4f}")
+                return
+            if args.previous:
+                alignment = aligner.realign(args.previous, args.old_ontology1, args.old_ontology2)
+            else:
+                alignment = aligner.iter_alignment()
             output_path = args.output or "alignment_results.txt"
-            aligner.save_alignment(alignment, output_path)
+            if args.gzip and not output_path.endswith(".gz"):
+                output_path += ".gz"
+            aligner.save_alignment(alignment, output_path, args.format)
             print(f"Alignment completed. Results saved to {output_path}")
         
         elif args.action == "match":
@@ -0,0 +1,84 @@
+import logging
+from typing import Dict, Iterable, List, Set, Tuple
+from owlready2 import Ontology, rdfs_subclassof
+from modules.config import load_config
+from modules.config_fingerprints import config_fingerprint
+from modules.candidate_index import class_labels
+from modules.alignment_io import read_alignment
+
+config = load_config()
+logging.basicConfig(level=config.get('Logging', 'level'), format=config.get('Logging', 'format'))
+logger = logging.getLogger(__name__)
+
+Alignment = List[Tuple[str, str, float]]
+
+def class_fingerprints(ontology: Ontology) -> Dict[str, str]:
+    """
+    Fingerprint every named class of an ontology by its labels and named superclasses.
+
+    Two releases of a class have the same fingerprint unless a label, synonym or direct
+    superclass was added, removed or changed.
+    """
+    parents: Dict[int, List[str]] = {}
+    for s, iri in ontology.world.graph.db.execute(
+            """SELECT objs.s, resources.iri FROM objs JOIN resources ON resources.storid = objs.o
+            WHERE objs.c=? AND objs.p=? AND objs.s > 0 AND objs.o > 0""",
+            (ontology.graph.c, rdfs_subclassof)):
+        parents.setdefault(s, []).append(iri)
+    fingerprints = {}
+    for iri, labels in class_labels(ontology):
+        storid = ontology.world._abbreviate(iri, False)
+        fingerprints[iri] = config_fingerprint({"labels": sorted(labels), "parents": sorted(parents.get(storid, []))})
+    return fingerprints
+
+def diff_classes(old: Ontology, new: Ontology) -> Dict[str, Set[str]]:
+    """
+    Compare two releases of an ontology class by class.
+
+    Returns:
+        Dict[str, Set[str]]: The IRIs of the "added", "removed" and "changed" classes.
+    """
+    old_fingerprints, new_fingerprints = class_fingerprints(old), class_fingerprints(new)
+    diff = {
+        "added": new_fingerprints.keys() - old_fingerprints.keys(),
+        "removed": old_fingerprints.keys() - new_fingerprints.keys(),
+        "changed": {iri for iri, fingerprint in new_fingerprints.items()
+                    if iri in old_fingerprints and old_fingerprints[iri] != fingerprint},
+    }
+    logger.info(f"{len(diff['added'])} classes added, {len(diff['removed'])} removed and "
+                f"{len(diff['changed'])} changed out of {len(new_fingerprints)}")
+    return diff
+
+def merge_alignments(previous: Alignment, rescored: Iterable[Tuple[str, str, float]], stale_sources: Set[str],
+                     stale_targets: Set[str], one_per_source: bool = False) -> Alignment:
+    """
+    Carry over the previous mappings between unchanged classes and merge in the rescored ones.
+
+    Mappings are keyed by their (source, target) pair: a rescored pair replaces the previous
+    score of that pair, and only the pairs involving a stale class are dropped.
+
+    Args:
+        previous (Alignment): The previous alignment.
+        rescored (Iterable[Tuple[str, str, float]]): Mappings scored against the new releases.
+        stale_sources (Set[str]): Source classes whose previous mappings are dropped.
+        stale_targets (Set[str]): Target classes whose previous mappings are dropped.
+        one_per_source (bool): Keep only the best mapping of each source class, for alignment
+            methods that map each class once.
+
+    Returns:
+        Alignment: The merged alignment, in (source, target) order.
+    """
+    merged: Dict[Tuple[str, str], Tuple[str, str, float]] = {}
+    for mapping in previous:
+        if mapping[0] not in stale_sources and mapping[1] not in stale_targets:
+            merged[mapping[0], mapping[1]] = mapping
+    logger.info(f"Carried over {len(merged)} of {len(previous)} previous mappings")
+    for mapping in rescored:
+        merged[mapping[0], mapping[1]] = mapping
+    if one_per_source:
+        best: Dict[str, Tuple[str, str, float]] = {}
+        for mapping in merged.values():
+            if mapping[0] not in best or mapping[2] > best[mapping[0]][2]:
+                best[mapping[0]] = mapping
+        return [best[source] for source in sorted(best)]
+    return [merged[pair] for pair in sorted(merged)]
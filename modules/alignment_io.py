@@ -0,0 +1,338 @@
+import abc
+import gzip
+import io
+import json
+import logging
+import os
+from typing import IO, Iterable, Iterator, List, Optional, Tuple
+from xml.etree import ElementTree
+from xml.sax.saxutils import quoteattr
+from modules.config import load_config
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+config = load_config()
+logging.basicConfig(level=config.get('Logging', 'level'), format=config.get('Logging', 'format'))
+logger = logging.getLogger(__name__)
+
+Mapping = Tuple[str, str, float]
+
+ALIGNMENT_FORMATS = ("txt", "tsv", "jsonl", "rdf", "sssom", "parquet")
+
+# File name suffixes of each format, checked in order, after a trailing ".gz" is removed
+_SUFFIXES = (
+    (".sssom.tsv", "sssom"),
+    (".tsv", "tsv"),
+    (".jsonl", "jsonl"),
+    (".rdf", "rdf"),
+    (".parquet", "parquet"),
+)
+
+TSV_HEADER = ("SrcEntity", "TgtEntity", "Score")
+SSSOM_COLUMNS = ("subject_id", "predicate_id", "object_id", "mapping_justification", "confidence")
+SSSOM_PREDICATE = "skos:exactMatch"
+SSSOM_JUSTIFICATION = "semapv:SemanticSimilarityThresholdMatching"
+
+ALIGNMENT_NS = "http://knowledgeweb.semanticweb.org/heterogeneity/alignment#"
+RDF_NS = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+
+def alignment_format(file_path: str) -> Tuple[str, bool]:
+    """
+    Infer the format of an alignment file from its name.
+
+    Returns:
+        Tuple[str, bool]: One of ALIGNMENT_FORMATS, "txt" for unknown suffixes, and whether the
+            file is gzip-compressed (a ".gz" suffix).
+    """
+    name = file_path.lower()
+    compressed = name.endswith(".gz")
+    if compressed:
+        name = name[:-3]
+    for suffix, fmt in _SUFFIXES:
+        if name.endswith(suffix):
+            return fmt, compressed
+    return "txt", compressed
+
+class AlignmentWriter(abc.ABC):
+    """
+    Write mappings to an alignment file one at a time, through a buffered, optionally gzipped stream.
+
+    Subclasses write one format each; open_alignment_writer picks the one for a file. Use as a
+    context manager: the mappings go to a temporary file next to file_path, which replaces it
+    only when the block exits cleanly. If producing the mappings fails, the temporary file is
+    removed, and a previous alignment at file_path is left as it was.
+    """
+
+    def __init__(self, file_path: str, compress: bool = False, ontology1_iri: Optional[str] = None,
+                 ontology2_iri: Optional[str] = None):
+        """
+        Args:
+            file_path (str): The file to write.
+            compress (bool): Whether to gzip the output.
+            ontology1_iri (Optional[str]): IRI of the source ontology, for formats that record it.
+            ontology2_iri (Optional[str]): IRI of the target ontology, for formats that record it.
+        """
+        self.file_path = file_path
+        self.compress = compress
+        self.ontology1_iri = ontology1_iri
+        self.ontology2_iri = ontology2_iri
+        self.count = 0
+        self._file: Optional[IO[str]] = None
+
+    def __enter__(self) -> "AlignmentWriter":
+        self._tmp_path = self.file_path + ".tmp"
+        self._open(self._tmp_path)
+        self._begin()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        completed = False
+        try:
+            if exc_type is None:
+                self._end()
+                completed = True
+        finally:
+            self._close()
+            if completed:
+                os.replace(self._tmp_path, self.file_path)
+            else:
+                os.remove(self._tmp_path)
+
+    def write(self, source: str, target: str, score: float) -> None:
+        """Write one mapping."""
+        self._write(source, target, float(score))
+        self.count += 1
+
+    def write_all(self, mappings: Iterable[Mapping]) -> int:
+        """Write mappings one at a time as they are iterated and return how many were written."""
+        for source, target, score in mappings:
+            self.write(source, target, score)
+        return self.count
+
+    def _open(self, path: str) -> None:
+        buffer_size = config.getint('OntologyAligner', 'alignment_buffer_size', fallback=1 << 20)
+        if self.compress:
+            self._file = io.TextIOWrapper(gzip.open(path, 'wb', compresslevel=6),
+                                          encoding='utf-8', newline='', write_through=False)
+        else:
+            self._file = open(path, 'w', encoding='utf-8', newline='', buffering=buffer_size)
+
+    def _close(self) -> None:
+        self._file.close()
+        self._file = None
+
+    def _begin(self) -> None:
+        pass
+
+    @abc.abstractmethod
+    def _write(self, source: str, target: str, score: float) -> None:
+        """Write one mapping to the open file."""
+
+    def _end(self) -> None:
+        pass
+
+class TextAlignmentWriter(AlignmentWriter):
+    """The original "source <-> target: score" lines."""
+
+    def _write(self, source: str, target: str, score: float) -> None:
+        self._file.write(f"{source} <-> {target}: {score}\n")
+
+class TsvAlignmentWriter(AlignmentWriter):
+    """Tab-separated source, target and score, with the header read_reference skips."""
+
+    def _begin(self) -> None:
+        self._file.write("\t".join(TSV_HEADER) + "\n")
+
+    def _write(self, source: str, target: str, score: float) -> None:
+        self._file.write(f"{source}\t{target}\t{score}\n")
+
+class JsonlAlignmentWriter(AlignmentWriter):
+    """One {"source", "target", "score"} object per line."""
+
+    def _write(self, source: str, target: str, score: float) -> None:
+        self._file.write(json.dumps({"source": source, "target": target, "score": score}) + "\n")
+
+class SssomAlignmentWriter(AlignmentWriter):
+    """SSSOM TSV: the mapping set metadata as commented YAML, then one mapping per row."""
+
+    def _begin(self) -> None:
+        self._file.write("# curie_map:\n"
+                         "#   skos: http://www.w3.org/2004/02/skos/core#\n"
+                         "#   semapv: https://w3id.org/semapv/vocab/\n"
+                         f"# mapping_set_id: urn:alignment:{os.path.basename(self.file_path)}\n"
+                         "# license: https://w3id.org/sssom/license/unspecified\n")
+        if self.ontology1_iri:
+            self._file.write(f"# subject_source: {self.ontology1_iri}\n")
+        if self.ontology2_iri:
+            self._file.write(f"# object_source: {self.ontology2_iri}\n")
+        self._file.write("\t".join(SSSOM_COLUMNS) + "\n")
+
+    def _write(self, source: str, target: str, score: float) -> None:
+        self._file.write(f"{source}\t{SSSOM_PREDICATE}\t{target}\t{SSSOM_JUSTIFICATION}\t{score}\n")
+
+class RdfAlignmentWriter(AlignmentWriter):
+    """The Alignment API RDF/XML format, with one equivalence Cell per mapping."""
+
+    def _begin(self) -> None:
+        self._file.write('<?xml version="1.0" encoding="utf-8"?>\n'
+                         f'<rdf:RDF xmlns="{ALIGNMENT_NS}" xmlns:rdf="{RDF_NS}" '
+                         'xmlns:xsd="http://www.w3.org/2001/XMLSchema#">\n'
+                         '<Alignment>\n  <xml>yes</xml>\n  <level>0</level>\n  <type>??</type>\n')
+        for tag, iri in (("onto1", self.ontology1_iri), ("onto2", self.ontology2_iri)):
+            if iri:
+                self._file.write(f'  <{tag}><Ontology rdf:about={quoteattr(iri)}/></{tag}>\n')
+
+    def _write(self, source: str, target: str, score: float) -> None:
+        self._file.write('  <map><Cell>'
+                         f'<entity1 rdf:resource={quoteattr(source)}/>'
+                         f'<entity2 rdf:resource={quoteattr(target)}/>'
+                         '<relation>=</relation>'
+                         f'<measure rdf:datatype="http://www.w3.org/2001/XMLSchema#float">{score}</measure>'
+                         '</Cell></map>\n')
+
+    def _end(self) -> None:
+        self._file.write('</Alignment>\n</rdf:RDF>\n')
+
+class ParquetAlignmentWriter(AlignmentWriter):
+    """
+    Parquet columns source, target and score, written one row group per batch of mappings.
+
+    Parquet compresses its column chunks itself (zstd by default), so the file is not gzipped.
+    """
+
+    def __enter__(self) -> "ParquetAlignmentWriter":
+        if pyarrow is None:
+            raise ImportError("pyarrow is required to write Parquet alignments")
+        return super().__enter__()
+
+    def _open(self, path: str) -> None:
+        self._schema = pyarrow.schema([("source", pyarrow.string()), ("target", pyarrow.string()),
+                                       ("score", pyarrow.float32())])
+        self._writer = pyarrow.parquet.ParquetWriter(
+            path, self._schema,
+            compression=config.get('OntologyAligner', 'parquet_compression', fallback='zstd'))
+        self._batch_size = config.getint('OntologyAligner', 'parquet_batch_size', fallback=100000)
+        self._columns: Tuple[List[str], List[str], List[float]] = ([], [], [])
+
+    def _close(self) -> None:
+        self._writer.close()
+
+    def _end(self) -> None:
+        self._flush()
+
+    def _write(self, source: str, target: str, score: float) -> None:
+        sources, targets, scores = self._columns
+        sources.append(source)
+        targets.append(target)
+        scores.append(score)
+        if len(sources) >= self._batch_size:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._columns[0]:
+            self._writer.write_table(pyarrow.Table.from_arrays(
+                [pyarrow.array(column, type=field.type) for column, field in zip(self._columns, self._schema)],
+                schema=self._schema))
+            self._columns = ([], [], [])
+
+WRITERS = {
+    "txt": TextAlignmentWriter,
+    "tsv": TsvAlignmentWriter,
+    "jsonl": JsonlAlignmentWriter,
+    "rdf": RdfAlignmentWriter,
+    "sssom": SssomAlignmentWriter,
+    "parquet": ParquetAlignmentWriter,
+}
+
+def open_alignment_writer(file_path: str, fmt: Optional[str] = None, ontology1_iri: Optional[str] = None,
+                          ontology2_iri: Optional[str] = None) -> AlignmentWriter:
+    """
+    Create the writer for an alignment file.
+
+    Args:
+        file_path (str): The file to write. A ".gz" suffix gzips the file.
+        fmt (Optional[str]): One of ALIGNMENT_FORMATS. Defaults to the format of the file
+            name, see alignment_format.
+        ontology1_iri (Optional[str]): IRI of the source ontology, recorded by the RDF and SSSOM formats.
+        ontology2_iri (Optional[str]): IRI of the target ontology, recorded by the RDF and SSSOM formats.
+
+    Raises:
+        ValueError: If the format is unknown, or a Parquet file is to be gzipped.
+    """
+    inferred, compress = alignment_format(file_path)
+    fmt = fmt or inferred
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown alignment format: {fmt}")
+    if compress and fmt == "parquet":
+        raise ValueError("Parquet alignments compress their columns and cannot be gzipped")
+    return WRITERS[fmt](file_path, compress, ontology1_iri, ontology2_iri)
+
+def _read_lines(file_path: str, compress: bool) -> IO[str]:
+    if compress:
+        return gzip.open(file_path, 'rt', encoding='utf-8', newline='')
+    return open(file_path, 'r', encoding='utf-8', newline='')
+
+def iter_alignment(file_path: str, fmt: Optional[str] = None) -> Iterator[Mapping]:
+    """
+    Read the mappings of an alignment file one at a time, in any of ALIGNMENT_FORMATS.
+
+    Args:
+        file_path (str): The file to read. A ".gz" suffix means it is gzipped.
+        fmt (Optional[str]): The format. Defaults to the format of the file name.
+
+    Raises:
+        ValueError: If the format is unknown.
+        ImportError: If the file is Parquet and pyarrow is not installed.
+    """
+    inferred, compress = alignment_format(file_path)
+    fmt = fmt or inferred
+    if fmt == "parquet":
+        if pyarrow is None:
+            raise ImportError("pyarrow is required to read Parquet alignments")
+        for batch in pyarrow.parquet.ParquetFile(file_path).iter_batches(columns=["source", "target", "score"]):
+            columns = batch.to_pydict()
+            yield from zip(columns["source"], columns["target"], columns["score"])
+        return
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown alignment format: {fmt}")
+    with _read_lines(file_path, compress) as f:
+        if fmt == "txt":
+            for line in f:
+                line = line.rstrip("\n")
+                if line:
+                    pair, _, confidence = line.rpartition(": ")
+                    entity1, _, entity2 = pair.partition(" <-> ")
+                    yield entity1, entity2, float(confidence)
+        elif fmt == "jsonl":
+            for line in f:
+                if line.strip():
+                    mapping = json.loads(line)
+                    yield mapping["source"], mapping["target"], float(mapping["score"])
+        elif fmt == "rdf":
+            cell = "{%s}Cell" % ALIGNMENT_NS
+            resource = "{%s}resource" % RDF_NS
+            for _, element in ElementTree.iterparse(f):
+                if element.tag == cell:
+                    yield (element.find("{%s}entity1" % ALIGNMENT_NS).get(resource),
+                           element.find("{%s}entity2" % ALIGNMENT_NS).get(resource),
+                           float(element.findtext("{%s}measure" % ALIGNMENT_NS)))
+                    element.clear()
+        else:
+            rows = (line.rstrip("\n").split("\t") for line in f if not line.startswith("#"))
+            header = next(rows, None)
+            if fmt == "sssom":
+                subject, object_, confidence = (header.index(column) for column in
+                                                ("subject_id", "object_id", "confidence"))
+            else:
+                subject, object_, confidence = 0, 1, 2
+            for row in rows:
+                if len(row) > 1:
+                    yield row[subject], row[object_], float(row[confidence])
+
+def read_alignment(file_path: str, fmt: Optional[str] = None) -> List[Mapping]:
+    """Read all mappings of an alignment file, see iter_alignment."""
+    return list(iter_alignment(file_path, fmt))
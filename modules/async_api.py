@@ -0,0 +1,227 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from owlready2 import OwlReadyInconsistentOntologyError
+from modules.config import load_config
+from modules.ontology_processor import OntologyProcessor
+
+config = load_config()
+logging.basicConfig(level=config.get('Logging', 'level'), format=config.get('Logging', 'format'))
+logger = logging.getLogger(__name__)
+
+def _config_timeout(section: str, option: str) -> Optional[float]:
+    timeout = config.getfloat(section, option, fallback=0)
+    return timeout or None
+
+async def _run_in(executor: ThreadPoolExecutor, function: Callable[[], Any], timeout: Optional[float],
+                  cancelled: Optional[threading.Event] = None) -> Any:
+    """
+    Await a blocking call in an executor, giving up after timeout seconds.
+
+    On timeout or cancellation, a call that has not started yet is dropped from the executor's
+    queue. A running call cannot be interrupted, so it is told through cancelled, if given,
+    to discard its result; it keeps its executor slot until it returns.
+    """
+    try:
+        return await asyncio.wait_for(asyncio.get_running_loop().run_in_executor(executor, function), timeout)
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        if cancelled is not None:
+            cancelled.set()
+        raise
+
+class AsyncOntologyProcessor:
+    """
+    Asyncio front end to an OntologyProcessor.
+
+    Loading and reasoning run in a job pool, and short queries in a separate query pool, so a
+    long classification never occupies the workers that answer queries. Owlready2 worlds are
+    not thread-safe, so every call holds a lock on the processor. Classification holds it only
+    while copying the quadstore and replaying the inferences (see
+    ReasoningSession.classify_detached); queries in the meantime see the ontology as it was.
+
+    Use ``await AsyncOntologyProcessor.open(path)`` to load an ontology off the event loop.
+    """
+
+    def __init__(self, processor: OntologyProcessor, query_workers: Optional[int] = None,
+                 job_workers: Optional[int] = None):
+        self.processor = processor
+        self.lock = threading.RLock()
+        self.query_timeout = _config_timeout('OntologyProcessor', 'async_query_timeout')
+        self.job_timeout = _config_timeout('OntologyProcessor', 'async_job_timeout')
+        self._queries = ThreadPoolExecutor(
+            query_workers or config.getint('OntologyProcessor', 'async_query_workers', fallback=4),
+            thread_name_prefix="ontology-query")
+        self._jobs = ThreadPoolExecutor(
+            job_workers or config.getint('OntologyProcessor', 'async_job_workers', fallback=1),
+            thread_name_prefix="ontology-job")
+
+    @classmethod
+    async def open(cls, ontology_path: str, quadstore_dir: Optional[str] = None,
+                   timeout: Optional[float] = None, **kwargs) -> "AsyncOntologyProcessor":
+        """
+        Load (and, if enabled, classify) an ontology in a worker thread.
+
+        Args:
+            ontology_path (str): Path to the ontology file.
+            quadstore_dir (Optional[str]): Directory of persistent quadstores to load the ontology from.
+            timeout (Optional[float]): Seconds to wait for the ontology to load.
+            **kwargs: Passed on to the constructor.
+
+        Raises:
+            asyncio.TimeoutError: If loading took longer than timeout.
+        """
+        loader = ThreadPoolExecutor(1, thread_name_prefix="ontology-load")
+        try:
+            processor = await _run_in(loader, lambda: OntologyProcessor(ontology_path, quadstore_dir=quadstore_dir),
+                                      timeout)
+        finally:
+            loader.shutdown(wait=False)
+        return cls(processor, **kwargs)
+
+    async def close(self) -> None:
+        self._queries.shutdown(wait=False, cancel_futures=True)
+        self._jobs.shutdown(wait=False, cancel_futures=True)
+
+    async def __aenter__(self) -> "AsyncOntologyProcessor":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    def _locked(self, function: Callable[..., Any], *args, **kwargs) -> Callable[[], Any]:
+        def call():
+            with self.lock:
+                return function(*args, **kwargs)
+        return call
+
+    async def _query(self, method: str, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        return await _run_in(self._queries, self._locked(getattr(self.processor, method), *args, **kwargs),
+                             timeout or self.query_timeout)
+
+    async def classify(self, timeout: Optional[float] = None) -> bool:
+        """
+        Classify the ontology if it changed since the last classification, without blocking queries.
+
+        Args:
+            timeout (Optional[float]): Seconds to wait. Defaults to the configured async_job_timeout.
+
+        Returns:
+            bool: Whether the ontology is classified.
+
+        Raises:
+            asyncio.TimeoutError: If the classification took longer than timeout. Its inferences
+                are then not applied.
+            OwlReadyInconsistentOntologyError: If the ontology is inconsistent.
+        """
+        cancelled = threading.Event()
+        return await _run_in(self._jobs, lambda: self.processor.reasoning.classify_detached(self.lock, cancelled),
+                             timeout or self.job_timeout, cancelled)
+
+    async def perform_reasoning(self, concept_name: str, timeout: Optional[float] = None) -> List[Any]:
+        if self.processor.reasoning_enabled:
+            await self.classify(timeout)
+        return await self._query("perform_reasoning", concept_name, timeout=timeout)
+
+    async def check_ontology_consistency(self, timeout: Optional[float] = None) -> bool:
+        try:
+            await self.classify(timeout)
+        except OwlReadyInconsistentOntologyError:
+            pass
+        return await self._query("check_ontology_consistency", timeout=timeout)
+
+    async def run_query(self, query: Dict[str, Any], timeout: Optional[float] = None) -> Any:
+        """Answer one query object, as OntologyProcessor.run_query does."""
+        if query.get("query") == "consistency":
+            return await self.check_ontology_consistency(timeout)
+        if query.get("query") == "reasoning" and self.processor.reasoning_enabled:
+            await self.classify(timeout)
+        return await self._query("run_query", query, timeout=timeout)
+
+    async def query_subclasses(self, class_name: str, timeout: Optional[float] = None) -> List[Any]:
+        return await self._query("query_subclasses", class_name, timeout=timeout)
+
+    async def query_individuals(self, class_name: str, timeout: Optional[float] = None) -> List[Any]:
+        return await self._query("query_individuals", class_name, timeout=timeout)
+
+    async def query_ancestors(self, class_name: str, include_self: bool = False,
+                              timeout: Optional[float] = None) -> List[Any]:
+        return await self._query("query_ancestors", class_name, include_self, timeout=timeout)
+
+    async def query_descendants(self, class_name: str, include_self: bool = False,
+                                timeout: Optional[float] = None) -> List[Any]:
+        return await self._query("query_descendants", class_name, include_self, timeout=timeout)
+
+    async def is_subclass_of(self, class_name: str, ancestor_name: str, timeout: Optional[float] = None) -> bool:
+        return await self._query("is_subclass_of", class_name, ancestor_name, timeout=timeout)
+
+    async def query_entities(self, timeout: Optional[float] = None) -> Tuple[List[Any], List[Any]]:
+        return await self._query("query_entities", timeout=timeout)
+
+    async def query_object_properties(self, timeout: Optional[float] = None) -> List[Any]:
+        return await self._query("query_object_properties", timeout=timeout)
+
+    async def query_data_properties(self, timeout: Optional[float] = None) -> List[Any]:
+        return await self._query("query_data_properties", timeout=timeout)
+
+    async def query_annotations(self, properties: Optional[List[str]] = None,
+                                timeout: Optional[float] = None) -> Dict[str, Dict[str, List[str]]]:
+        return await self._query("query_annotations", properties, timeout=timeout)
+
+    async def query_property_characteristics(self, property_name: str, timeout: Optional[float] = None) -> List[str]:
+        return await self._query("query_property_characteristics", property_name, timeout=timeout)
+
+    async def query_class_hierarchy(self, timeout: Optional[float] = None) -> Dict[str, List[str]]:
+        return await self._query("query_class_hierarchy", timeout=timeout)
+
+    async def query_property_domains_and_ranges(self, property_name: str,
+                                                timeout: Optional[float] = None) -> Tuple[List[Any], List[Any]]:
+        return await self._query("query_property_domains_and_ranges", property_name, timeout=timeout)
+
+    async def get_ontology_metrics(self, timeout: Optional[float] = None) -> Dict[str, int]:
+        return await self._query("get_ontology_metrics", timeout=timeout)
+
+class AsyncOntologyAligner:
+    """
+    Asyncio front end to an OntologyAligner.
+
+    Loading and alignment run in a bounded pool of worker threads, so the event loop, and any
+    AsyncOntologyProcessor queries on it, keep running while an alignment job does.
+    """
+
+    def __init__(self, aligner, workers: Optional[int] = None):
+        self.aligner = aligner
+        self.timeout = _config_timeout('OntologyAligner', 'async_timeout')
+        self._jobs = ThreadPoolExecutor(workers or config.getint('OntologyAligner', 'async_workers', fallback=1),
+                                        thread_name_prefix="ontology-align")
+
+    @classmethod
+    async def open(cls, ontology_path1: str, ontology_path2: str, timeout: Optional[float] = None,
+                   **kwargs) -> "AsyncOntologyAligner":
+        """Load both ontologies and the alignment model in a worker thread."""
+        # Imported here so that the processor API does not require the alignment dependencies
+        from modules.ontology_aligner import OntologyAligner
+        loader = ThreadPoolExecutor(1, thread_name_prefix="ontology-load")
+        try:
+            aligner = await _run_in(loader, lambda: OntologyAligner(ontology_path1, ontology_path2), timeout)
+        finally:
+            loader.shutdown(wait=False)
+        return cls(aligner, **kwargs)
+
+    async def close(self) -> None:
+        self._jobs.shutdown(wait=False, cancel_futures=True)
+
+    async def __aenter__(self) -> "AsyncOntologyAligner":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def align_ontologies(self, timeout: Optional[float] = None) -> List[Tuple[str, str, float]]:
+        return await _run_in(self._jobs, self.aligner.align_ontologies, timeout or self.timeout)
+
+    async def save_alignment(self, alignment: List[Tuple[str, str, float]], file_path: str,
+                             fmt: Optional[str] = None, timeout: Optional[float] = None) -> int:
+        return await _run_in(self._jobs, lambda: self.aligner.save_alignment(alignment, file_path, fmt),
+                             timeout or self.timeout)
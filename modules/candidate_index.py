@@ -0,0 +1,213 @@
+import heapq
+import logging
+import math
+import re
+from array import array
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from owlready2 import Ontology, rdf_type, owl_class
+from modules.config import load_config
+
+config = load_config()
+logging.basicConfig(level=config.get('Logging', 'level'), format=config.get('Logging', 'format'))
+logger = logging.getLogger(__name__)
+
+# Annotation properties whose values name a class, besides its IRI local name
+LABEL_PROPERTIES = (
+    "http://www.w3.org/2000/01/rdf-schema#label",
+    "http://www.w3.org/2004/02/skos/core#prefLabel",
+    "http://www.w3.org/2004/02/skos/core#altLabel",
+    "http://www.geneontology.org/formats/oboInOwl#hasExactSynonym",
+    "http://www.geneontology.org/formats/oboInOwl#hasRelatedSynonym",
+    "http://www.geneontology.org/formats/oboInOwl#hasBroadSynonym",
+    "http://www.geneontology.org/formats/oboInOwl#hasNarrowSynonym",
+)
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Character n-grams catch inflections and spelling variants; they count less than whole tokens
+NGRAM_SIZE = 3
+NGRAM_WEIGHT = 0.5
+
+_CAMEL_CASE = re.compile(r"(?<=[a-z0-9])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])")
+_NON_ALPHANUMERIC = re.compile(r"[^0-9a-z]+")
+
+Candidates = Dict[str, List[Tuple[str, float]]]
+
+def label_tokens(label: str) -> List[str]:
+    """Split a label or IRI local name such as "BodyPart_of" into lowercase word tokens."""
+    label = _CAMEL_CASE.sub(" ", label.replace("_", " "))
+    return [token for token in _NON_ALPHANUMERIC.split(label.lower()) if token]
+
+def label_features(labels: Iterable[str]) -> Counter:
+    """Count the token and character n-gram features of all labels of one class."""
+    features = Counter()
+    for label in labels:
+        for token in label_tokens(label):
+            features["w:" + token] += 1
+            padded = f"#{token}#"
+            for i in range(len(padded) - NGRAM_SIZE + 1):
+                features["g:" + padded[i:i + NGRAM_SIZE]] += 1
+    return features
+
+def class_labels(ontology: Ontology) -> Iterator[Tuple[str, List[str]]]:
+    """
+    Yield the IRI and labels of every named class of an ontology, in one quadstore scan.
+
+    The labels are the class's IRI local name followed by its LABEL_PROPERTIES values.
+    """
+    world = ontology.world
+    label_storids = [storid for storid in (world._abbreviate(iri, False) for iri in LABEL_PROPERTIES) if storid]
+    placeholders = ",".join("?" * len(label_storids)) or "NULL"
+    rows = world.graph.db.execute(
+        f"""SELECT classes.s, resources.iri, labels.o FROM
+            (SELECT DISTINCT s FROM objs WHERE c=? AND p=? AND o=? AND s > 0) classes
+        JOIN resources ON resources.storid = classes.s
+        LEFT JOIN datas labels ON labels.s = classes.s AND labels.p IN ({placeholders})
+        ORDER BY classes.s""",
+        (ontology.graph.c, rdf_type, owl_class, *label_storids))
+    current, current_iri, labels = None, None, []
+    for s, iri, label in rows:
+        if s != current:
+            if current is not None:
+                yield current_iri, labels
+            current, current_iri = s, iri
+            labels = [re.split(r"[#/]", iri)[-1]]
+        if label is not None:
+            labels.append(str(label))
+    if current is not None:
+        yield current_iri, labels
+
+class CandidateIndex:
+    """
+    Inverted index over the labels of target classes, ranking them for a source class by BM25.
+
+    Each target class is a document made of the token and character n-gram features of its
+    labels. Per posting, the BM25 weight is precomputed, so scoring a source class only sums
+    the weights in the postings of its features. Features shared by more than max_postings
+    targets (such as "of" or common n-grams) are left out of the index: they bound the work per
+    source class and carry little evidence anyway.
+    """
+
+    def __init__(self, targets: Iterable[Tuple[str, List[str]]], max_postings: Optional[int] = None):
+        """
+        Build the index.
+
+        Args:
+            targets (Iterable[Tuple[str, List[str]]]): (IRI, labels) of the target classes,
+                as yielded by class_labels.
+            max_postings (Optional[int]): Maximum number of targets a feature may occur in.
+                Defaults to the configured candidate_max_postings.
+        """
+        max_postings = max_postings or config.getint('OntologyAligner', 'candidate_max_postings', fallback=1000)
+        self.iris: List[str] = []
+        documents: List[Counter] = []
+        document_frequency = Counter()
+        for iri, labels in targets:
+            features = label_features(labels)
+            self.iris.append(iri)
+            documents.append(features)
+            document_frequency.update(features.keys())
+
+        num_documents = len(documents)
+        average_length = sum(sum(features.values()) for features in documents) / max(num_documents, 1)
+        idf = {feature: math.log(1 + (num_documents - df + 0.5) / (df + 0.5))
+               for feature, df in document_frequency.items() if df <= max_postings}
+        self.postings: Dict[str, Tuple[array, array]] = defaultdict(lambda: (array('i'), array('f')))
+        for target, features in enumerate(documents):
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * sum(features.values()) / average_length)
+            for feature, tf in features.items():
+                if feature in idf:
+                    weight = idf[feature] * tf * (BM25_K1 + 1) / (tf + norm)
+                    if feature.startswith("g:"):
+                        weight *= NGRAM_WEIGHT
+                    targets_of, weights_of = self.postings[feature]
+                    targets_of.append(target)
+                    weights_of.append(weight)
+        self.postings = dict(self.postings)
+        logger.info(f"Indexed {num_documents} target classes under {len(self.postings)} features, "
+                    f"{len(document_frequency) - len(idf)} frequent features left out")
+
+    def __len__(self) -> int:
+        return len(self.iris)
+
+    def search(self, labels: Iterable[str], k: int) -> List[Tuple[str, float]]:
+        """Return the k best-scoring target IRIs for a class with these labels, best first."""
+        scores: Dict[int, float] = defaultdict(float)
+        for feature in label_features(labels):
+            posting = self.postings.get(feature)
+            if posting is not None:
+                for target, weight in zip(*posting):
+                    scores[target] += weight
+        return [(self.iris[target], score)
+                for target, score in heapq.nlargest(k, scores.items(), key=lambda item: item[1])]
+
+def generate_candidates(source: Ontology, target: Ontology, k: int, max_postings: Optional[int] = None,
+                        sources: Optional[Set[str]] = None, targets: Optional[Set[str]] = None) -> Candidates:
+    """
+    Map every named class of the source ontology to its k most plausible target classes.
+
+    Args:
+        source (Ontology): The ontology whose classes are mapped.
+        target (Ontology): The ontology whose classes are candidates.
+        k (int): Number of candidates per source class.
+        max_postings (Optional[int]): See CandidateIndex.
+        sources (Optional[Set[str]]): Only map these source class IRIs.
+        targets (Optional[Set[str]]): Only consider these target class IRIs.
+
+    Returns:
+        Candidates: The candidate target IRIs and their lexical scores, best first, by source
+            IRI. Source classes sharing no indexed feature with any target are left out.
+    """
+    index = CandidateIndex(((iri, labels) for iri, labels in class_labels(target) if targets is None or iri in targets),
+                           max_postings)
+    candidates = {}
+    for iri, labels in class_labels(source):
+        if sources is not None and iri not in sources:
+            continue
+        matches = index.search(labels, k)
+        if matches:
+            candidates[iri] = matches
+    logger.info(f"Generated candidates for {len(candidates)} source classes, top {k} each")
+    return candidates
+
+def read_reference(path: str) -> Set[Tuple[str, str]]:
+    """
+    Read a reference alignment as (source IRI, target IRI) pairs.
+
+    The file has one mapping per line, source and target IRIs first, separated by tabs; an
+    optional header line starting with "SrcEntity" is skipped, as are further columns.
+    """
+    pairs = set()
+    with open(path, 'r') as f:
+        for line in f:
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) >= 2 and fields[0] != "SrcEntity":
+                pairs.add((fields[0], fields[1]))
+    return pairs
+
+def candidate_recall(candidates: Candidates, reference: Set[Tuple[str, str]],
+                     ks: Optional[Iterable[int]] = None) -> Dict[int, float]:
+    """
+    Measure the share of reference mappings whose target is among the source's candidates.
+
+    Args:
+        candidates (Candidates): Candidates, as generated with the largest k of interest.
+        reference (Set[Tuple[str, str]]): The reference mappings.
+        ks (Optional[Iterable[int]]): Candidate list lengths to evaluate, by truncating the
+            candidate lists. Defaults to the full lists.
+
+    Returns:
+        Dict[int, float]: Recall by candidate list length.
+    """
+    if not reference:
+        raise ValueError("The reference alignment is empty")
+    longest = max((len(matches) for matches in candidates.values()), default=0)
+    recall = {}
+    for k in sorted(ks or [longest]):
+        found = sum(1 for source, target in reference
+                    if any(iri == target for iri, _ in candidates.get(source, [])[:k]))
+        recall[k] = found / len(reference)
+    return recall
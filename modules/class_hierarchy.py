@@ -0,0 +1,243 @@
+import logging
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, Iterable, List, Tuple
+from owlready2 import Ontology, rdf_type, rdfs_subclassof, owl_class, owl_equivalentclass, owl_thing
+from modules.config import load_config
+
+config = load_config()
+logging.basicConfig(level=config.get('Logging', 'level'), format=config.get('Logging', 'format'))
+logger = logging.getLogger(__name__)
+
+def _csr(num_nodes: int, edges: Iterable[Tuple[int, int]]) -> Tuple[array, array]:
+    """Pack (source, target) edges into compressed sparse row offset and target arrays."""
+    buckets = defaultdict(list)
+    for source, target in edges:
+        buckets[source].append(target)
+    offsets = array('i', [0] * (num_nodes + 1))
+    targets = array('i')
+    for node in range(num_nodes):
+        node_targets = sorted(set(buckets.get(node, ())))
+        targets.extend(node_targets)
+        offsets[node + 1] = len(targets)
+    return offsets, targets
+
+def iri_name(iri: str) -> str:
+    """Return the local name of an IRI, as Owlready2 derives it for entity names."""
+    if "#" in iri:
+        return iri.rsplit("#", 1)[1]
+    return iri.rsplit("/", 1)[-1]
+
+def hierarchy_signature(ontology: Ontology) -> List[Tuple[int, int, int, int]]:
+    """
+    Summarize the triples a ClassHierarchyIndex is built from, in one SQL pass.
+
+    Class declarations, subclass and equivalence links are counted and checksummed per
+    predicate and context, so edits to annotations, individuals or property values leave
+    the signature unchanged and the index can be kept.
+
+    Args:
+        ontology (Ontology): The ontology whose world is indexed.
+
+    Returns:
+        List[Tuple[int, int, int, int]]: Predicate, context, triple count and checksum rows.
+    """
+    return ontology.world.graph.db.execute(
+        """SELECT p, c, COUNT(*), SUM((s * 1000003 + o) % 2147483647) FROM objs
+        WHERE (p IN (?, ?) OR (p=? AND o=?)) AND s > 0 AND o > 0 GROUP BY p, c ORDER BY p, c""",
+        (rdfs_subclassof, owl_equivalentclass, rdf_type, owl_class)).fetchall()
+
+class ClassHierarchyIndex:
+    """
+    A read-only snapshot of the named class hierarchy of an Owlready2 world.
+
+    Classes are numbered with dense integer IDs. Direct parent and child links are stored
+    as CSR integer arrays, and every class gets the sorted array of its ancestors, so
+    is-subclass-of checks are a binary search and ancestor lookups need no graph walk.
+    Equivalent classes (and any subclass cycles) are collapsed into strongly connected
+    components that share one ancestor array, matching Owlready2's ``ancestors()``.
+    """
+
+    def __init__(self, ontology: Ontology):
+        """
+        Build the index from the subclass and equivalence triples of the ontology's world.
+
+        Args:
+            ontology (Ontology): The ontology whose classes are reported as local classes.
+        """
+        db = ontology.world.graph.db
+        self.storids = array('q')
+        self.iris = []
+        self.ids = {}
+        for storid, iri in db.execute(
+                """SELECT DISTINCT objs.s, resources.iri FROM objs JOIN resources ON resources.storid = objs.s
+                WHERE objs.p=? AND objs.o=? AND objs.s > 0 ORDER BY objs.s""", (rdf_type, owl_class)):
+            self._add_node(storid, iri)
+        if owl_thing not in self.ids:
+            self._add_node(owl_thing, ontology.world._unabbreviate(owl_thing))
+        thing = self.ids[owl_thing]
+
+        self.local = bytearray(len(self.storids))
+        for (storid,) in db.execute("SELECT s FROM objs WHERE c=? AND p=? AND o=? AND s > 0",
+                                    (ontology.graph.c, rdf_type, owl_class)):
+            self.local[self.ids[storid]] = 1
+
+        parent_edges = set()
+        for s, o in db.execute("SELECT s, o FROM objs WHERE p=? AND s > 0 AND o > 0", (rdfs_subclassof,)):
+            if s in self.ids and o in self.ids and s != o:
+                parent_edges.add((self.ids[s], self.ids[o]))
+        equivalent_edges = set()
+        for s, o in db.execute("SELECT s, o FROM objs WHERE p=? AND s > 0 AND o > 0", (owl_equivalentclass,)):
+            if s in self.ids and o in self.ids and s != o:
+                equivalent_edges.add((self.ids[s], self.ids[o]))
+                equivalent_edges.add((self.ids[o], self.ids[s]))
+        has_parent = {child for child, _ in parent_edges}
+        for node in range(len(self.storids)):
+            if node != thing and node not in has_parent:
+                parent_edges.add((node, thing))
+
+        self.parent_offsets, self.parent_ids = _csr(len(self.storids), parent_edges)
+        self.child_offsets, self.child_ids = _csr(len(self.storids), ((p, c) for c, p in parent_edges))
+        self.equivalent_offsets, self.equivalent_ids = _csr(len(self.storids), equivalent_edges)
+        self._build_closure()
+        logger.info(f"Built class hierarchy index for {len(self.storids)} classes and {len(parent_edges)} subclass links")
+
+    def _add_node(self, storid: int, iri: str) -> None:
+        self.ids[storid] = len(self.storids)
+        self.storids.append(storid)
+        self.iris.append(iri)
+
+    def _parents_of(self, node: int) -> array:
+        return self.parent_ids[self.parent_offsets[node]:self.parent_offsets[node + 1]]
+
+    def _children_of(self, node: int) -> array:
+        return self.child_ids[self.child_offsets[node]:self.child_offsets[node + 1]]
+
+    def _equivalents_of(self, node: int) -> array:
+        return self.equivalent_ids[self.equivalent_offsets[node]:self.equivalent_offsets[node + 1]]
+
+    def _links_of(self, node: int) -> array:
+        return self._parents_of(node) + self._equivalents_of(node)
+
+    def _build_closure(self) -> None:
+        # Iterative Tarjan over child -> parent and equivalence links. Components are emitted
+        # after every component they can reach, i.e. ancestors come out before descendants.
+        num_nodes = len(self.storids)
+        self.component = array('i', [-1] * num_nodes)
+        self.component_ancestors = []
+        order = array('i', [-1] * num_nodes)
+        lowlink = array('i', [0] * num_nodes)
+        on_stack = bytearray(num_nodes)
+        stack = []
+        counter = 0
+
+        for root in range(num_nodes):
+            if order[root] != -1:
+                continue
+            work = [(root, 0)]
+            while work:
+                node, position = work.pop()
+                if position == 0:
+                    order[node] = lowlink[node] = counter
+                    counter += 1
+                    stack.append(node)
+                    on_stack[node] = 1
+                links = self._links_of(node)
+                descended = False
+                while position < len(links):
+                    link = links[position]
+                    position += 1
+                    if order[link] == -1:
+                        work.append((node, position))
+                        work.append((link, 0))
+                        descended = True
+                        break
+                    if on_stack[link]:
+                        lowlink[node] = min(lowlink[node], order[link])
+                if descended:
+                    continue
+                if lowlink[node] == order[node]:
+                    self._close_component(node, stack, on_stack)
+                if work:
+                    caller = work[-1][0]
+                    lowlink[caller] = min(lowlink[caller], lowlink[node])
+
+    def _close_component(self, node: int, stack: List[int], on_stack: bytearray) -> None:
+        members = []
+        while True:
+            member = stack.pop()
+            on_stack[member] = 0
+            members.append(member)
+            if member == node:
+                break
+        component_id = len(self.component_ancestors)
+        for member in members:
+            self.component[member] = component_id
+        ancestors = set(members)
+        for member in members:
+            for parent in self._links_of(member):
+                parent_component = self.component[parent]
+                if parent_component != component_id:
+                    ancestors.update(self.component_ancestors[parent_component])
+        self.component_ancestors.append(array('i', sorted(ancestors)))
+
+    def __contains__(self, storid: int) -> bool:
+        return storid in self.ids
+
+    def __len__(self) -> int:
+        return len(self.storids)
+
+    def parents(self, storid: int) -> List[int]:
+        return [self.storids[p] for p in self._parents_of(self.ids[storid])]
+
+    def children(self, storid: int) -> List[int]:
+        return [self.storids[c] for c in self._children_of(self.ids[storid])]
+
+    def ancestors(self, storid: int, include_self: bool = True) -> List[int]:
+        node = self.ids[storid]
+        return [self.storids[a] for a in self.component_ancestors[self.component[node]] if include_self or a != node]
+
+    def descendants(self, storid: int, include_self: bool = True) -> List[int]:
+        node = self.ids[storid]
+        seen = {node}
+        pending = [node]
+        while pending:
+            current = pending.pop()
+            for child in self._children_of(current) + self._equivalents_of(current):
+                if child not in seen:
+                    seen.add(child)
+                    pending.append(child)
+        if not include_self:
+            seen.discard(node)
+        return [self.storids[d] for d in sorted(seen)]
+
+    def is_subclass_of(self, storid: int, ancestor_storid: int) -> bool:
+        if ancestor_storid not in self.ids:
+            return False
+        ancestors = self.component_ancestors[self.component[self.ids[storid]]]
+        target = self.ids[ancestor_storid]
+        position = bisect_left(ancestors, target)
+        return position < len(ancestors) and ancestors[position] == target
+
+    def equivalence_groups(self) -> List[List[int]]:
+        """Return the storids of every group of two or more mutually subsuming classes."""
+        groups = defaultdict(list)
+        for node, component in enumerate(self.component):
+            groups[component].append(self.storids[node])
+        return [members for members in groups.values() if len(members) > 1]
+
+    def hierarchy(self) -> Dict[str, List[str]]:
+        """
+        Map each parent class name to the names of its direct subclasses declared in the ontology.
+
+        Returns:
+            Dict[str, List[str]]: The parent to children adjacency of the ontology's classes.
+        """
+        hierarchy = {}
+        for node in range(len(self.storids)):
+            if not self.local[node]:
+                continue
+            for parent in self._parents_of(node):
+                hierarchy.setdefault(iri_name(self.iris[parent]), []).append(iri_name(self.iris[node]))
+        return hierarchy
@@ -0,0 +1,61 @@
+import hashlib
+import json
+import sqlite3
+from typing import Any, Dict, Iterable, Iterator, Tuple
+
+# Fingerprints of the applied config live in the quadstore itself, next to Owlready2's
+# tables, so they are committed together with the triples they describe.
+FINGERPRINT_TABLE = "config_fingerprints"
+
+# Keys that name the ontology; a change to any of them needs a full rebuild
+HEADER_KEYS = ("ontology_iri", "namespace_iri", "imports")
+
+# Axiom sections are small and are compared, undone and reapplied as a whole
+AXIOM_KEYS = ("disjoint_classes", "equivalent_classes", "general_axioms")
+
+# Sections whose entries are compared one entity at a time, in the order they are applied
+ENTITY_SECTIONS = ("classes", "object_properties", "data_properties", "annotations")
+
+FingerprintRow = Tuple[str, str, str, str]
+
+def config_fingerprint(value: Any) -> str:
+    """Hash a config value independently of key order."""
+    return hashlib.sha256(json.dumps(value, sort_keys=True, separators=(",", ":")).encode()).hexdigest()[:32]
+
+def ensure_fingerprint_table(db: sqlite3.Connection, table: str = FINGERPRINT_TABLE) -> None:
+    db.execute(f"""CREATE TABLE IF NOT EXISTS {table}
+                   (section TEXT, name TEXT, fingerprint TEXT, value TEXT, PRIMARY KEY (section, name))""")
+
+def section_fingerprints(ontology_config: Dict[str, Any]) -> Iterator[FingerprintRow]:
+    """
+    Yield one (section, name, fingerprint, value) row per header, entity and axiom group of a config.
+
+    Individuals are not included; see fingerprinted_individuals. Values are kept as JSON so
+    that removed or changed entries can be undone without the old config.
+    """
+    header = {key: ontology_config.get(key) for key in HEADER_KEYS}
+    yield "ontology", "", config_fingerprint(header), json.dumps(header)
+    for section in ENTITY_SECTIONS:
+        for name, value in ontology_config.get(section, {}).items():
+            yield section, name, config_fingerprint(value), json.dumps(value)
+    axioms = {key: ontology_config.get(key, []) for key in AXIOM_KEYS}
+    yield "axioms", "", config_fingerprint(axioms), json.dumps(axioms)
+
+def record_fingerprints(db: sqlite3.Connection, rows: Iterable[FingerprintRow], table: str = FINGERPRINT_TABLE) -> None:
+    db.executemany(f"INSERT OR REPLACE INTO {table} VALUES (?,?,?,?)", rows)
+
+def fingerprinted_individuals(db: sqlite3.Connection, individuals: Iterable[Dict[str, Any]],
+                              table: str = FINGERPRINT_TABLE, batch_size: int = 10000) -> Iterator[Dict[str, Any]]:
+    """
+    Pass individuals through, recording their fingerprints in batches as they go by.
+
+    Only fingerprints are stored for individuals, not their values, to keep the table small.
+    """
+    rows = []
+    for individual in individuals:
+        rows.append(("individuals", individual.get("name"), config_fingerprint(individual), None))
+        if len(rows) >= batch_size:
+            record_fingerprints(db, rows, table)
+            rows.clear()
+        yield individual
+    record_fingerprints(db, rows, table)
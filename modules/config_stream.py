@@ -0,0 +1,95 @@
+import json
+import logging
+import os
+from typing import Any, Dict, Iterator, Tuple
+from modules.config import load_config
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+config = load_config()
+logging.basicConfig(level=config.get('Logging', 'level'), format=config.get('Logging', 'format'))
+logger = logging.getLogger(__name__)
+
+def iter_json_lines(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Read one JSON object per non-blank line of a JSON Lines file.
+
+    Args:
+        path (str): Path to the JSON Lines file.
+
+    Yields:
+        Dict[str, Any]: The decoded objects, in file order.
+
+    Raises:
+        json.JSONDecodeError: If a line is not valid JSON.
+    """
+    with open(path, 'r') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def _load_sections(config_path: str) -> Dict[str, Any]:
+    # Build every top-level value except "individuals" from the parser's event stream,
+    # so the individuals array is scanned but never materialized.
+    sections = {}
+    key, builder = None, None
+    with open(config_path, 'rb') as f:
+        for prefix, event, value in ijson.parse(f, use_float=True):
+            if prefix == "":
+                if builder is not None:
+                    sections[key] = builder.value
+                    builder = None
+                if event == "map_key":
+                    key = value
+                    if value != "individuals":
+                        builder = ijson.ObjectBuilder()
+            elif builder is not None:
+                builder.event(event, value)
+    return sections
+
+def _iter_inline_individuals(config_path: str) -> Iterator[Dict[str, Any]]:
+    with open(config_path, 'rb') as f:
+        yield from ijson.items(f, "individuals.item", use_float=True)
+
+def stream_ontology_config(config_path: str) -> Tuple[Dict[str, Any], Iterator[Dict[str, Any]]]:
+    """
+    Open an ontology config without holding its individuals in memory.
+
+    Every section but "individuals" is returned as a dict. Individuals are read lazily,
+    first from the inline "individuals" array (incrementally when ijson is installed),
+    then from the JSON Lines file named by "individuals_file", relative to the config.
+
+    Args:
+        config_path (str): Path to the configuration JSON file.
+
+    Returns:
+        Tuple[Dict[str, Any], Iterator[Dict[str, Any]]]: The other sections and an iterator
+            over the individuals.
+
+    Raises:
+        FileNotFoundError: If the configuration file is not found.
+        json.JSONDecodeError: If the configuration file is not valid JSON.
+    """
+    if ijson is None:
+        logger.warning("ijson is not installed, inline individuals are loaded all at once")
+        with open(config_path, 'r') as f:
+            sections = json.load(f)
+        inline = iter(sections.pop("individuals", []))
+    else:
+        try:
+            sections = _load_sections(config_path)
+        except ijson.JSONError as e:
+            raise json.JSONDecodeError(str(e), config_path, 0)
+        inline = _iter_inline_individuals(config_path)
+    return sections, _chain_individuals(config_path, sections, inline)
+
+def _chain_individuals(config_path: str, sections: Dict[str, Any], inline: Iterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    yield from inline
+    if "individuals_file" in sections:
+        yield from iter_json_lines(resolve_individuals_file(config_path, sections))
+
+def resolve_individuals_file(config_path: str, sections: Dict[str, Any]) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(config_path)), sections["individuals_file"])
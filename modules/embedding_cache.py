@@ -0,0 +1,142 @@
+import hashlib
+import json
+import logging
+import os
+import uuid
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from modules.config import load_config
+from modules.candidate_index import label_tokens
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    SentenceTransformer = None
+
+config = load_config()
+logging.basicConfig(level=config.get('Logging', 'level'), format=config.get('Logging', 'format'))
+logger = logging.getLogger(__name__)
+
+# (entity IRI, label text) pairs, one embedding row each
+LabelRows = List[Tuple[str, str]]
+
+def _digest(text: str, length: int = 16) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()[:length]
+
+class SentenceTransformerEncoder:
+    """Encode label texts with a sentence-transformers model, loaded on first use."""
+
+    def __init__(self, model_name: Optional[str] = None, batch_size: Optional[int] = None):
+        self.model_id = model_name or config.get('OntologyAligner', 'embedding_model',
+                                                 fallback='sentence-transformers/all-MiniLM-L6-v2')
+        self.batch_size = batch_size or config.getint('OntologyAligner', 'embedding_batch_size', fallback=256)
+        self._model = None
+
+    def __call__(self, texts: List[str]) -> np.ndarray:
+        if self._model is None:
+            if SentenceTransformer is None:
+                raise ImportError("sentence-transformers is required to encode labels")
+            self._model = SentenceTransformer(self.model_id)
+        return self._model.encode(texts, batch_size=self.batch_size, normalize_embeddings=True,
+                                  convert_to_numpy=True).astype(np.float32, copy=False)
+
+class EmbeddingCache:
+    """
+    On-disk cache of label embeddings, one memory-mapped matrix per ontology and model.
+
+    Each ontology's rows are keyed by entity IRI and a hash of the label text, under a directory
+    derived from the encoder's model_id and the ontology IRI. Rows whose label is unchanged are
+    read from the memory map; only new or changed labels are encoded. The matrix and its key
+    list are rewritten as a whole, the key list last, so readers never see them out of step.
+    """
+
+    def __init__(self, encoder: Callable[[List[str]], np.ndarray], cache_dir: Optional[str] = None):
+        """
+        Args:
+            encoder (Callable[[List[str]], np.ndarray]): Maps label texts to a float32 matrix
+                with one row per text. Its model_id attribute identifies the model.
+            cache_dir (Optional[str]): Root directory of the cache. Defaults to the configured
+                embedding_cache_dir.
+        """
+        self.encoder = encoder
+        self.model_id = getattr(encoder, "model_id", type(encoder).__name__)
+        self.cache_dir = cache_dir or config.get('OntologyAligner', 'embedding_cache_dir',
+                                                 fallback=os.path.join(config.get('General', 'output_dir'), 'embeddings'))
+        self.encoded = 0
+        self.reused = 0
+
+    def _directory(self, ontology_iri: str) -> str:
+        return os.path.join(self.cache_dir, _digest(self.model_id), _digest(ontology_iri))
+
+    def _load(self, directory: str) -> Tuple[Dict[Tuple[str, str], int], Optional[np.ndarray], Optional[str]]:
+        keys_path = os.path.join(directory, "keys.json")
+        if not os.path.exists(keys_path):
+            return {}, None, None
+        with open(keys_path, 'r') as f:
+            entry = json.load(f)
+        if entry["model"] != self.model_id:
+            return {}, None, None
+        vectors = np.load(os.path.join(directory, entry["vectors"]), mmap_mode="r")
+        return {tuple(key): row for row, key in enumerate(entry["keys"])}, vectors, entry["vectors"]
+
+    def embed(self, ontology_iri: str, rows: LabelRows) -> np.ndarray:
+        """
+        Return one embedding per (entity IRI, label) row, encoding only those not cached.
+
+        Args:
+            ontology_iri (str): IRI of the ontology the labels belong to.
+            rows (LabelRows): The labels to embed.
+
+        Returns:
+            np.ndarray: A float32 matrix with one row per label, in the order given. If every
+                row was cached in that order, it is the memory map itself.
+        """
+        if not rows:
+            return np.zeros((0, 0), dtype=np.float32)
+        directory = self._directory(ontology_iri)
+        cached, vectors, vectors_file = self._load(directory)
+        keys = [(iri, _digest(text)) for iri, text in rows]
+        positions = [cached.get(key) for key in keys]
+        missing = [i for i, position in enumerate(positions) if position is None]
+        self.reused += len(rows) - len(missing)
+        self.encoded += len(missing)
+
+        if not missing and vectors is not None and positions == list(range(len(vectors))):
+            logger.info(f"Reused all {len(rows)} cached label embeddings of {ontology_iri}")
+            return vectors
+
+        new_vectors = self.encoder([rows[i][1] for i in missing]) if missing else None
+        dim = new_vectors.shape[1] if new_vectors is not None else vectors.shape[1]
+        os.makedirs(directory, exist_ok=True)
+        file_name = f"vectors-{uuid.uuid4().hex[:8]}.npy"
+        matrix = np.lib.format.open_memmap(os.path.join(directory, file_name), mode="w+",
+                                           dtype=np.float32, shape=(len(rows), dim))
+        reused = [i for i, position in enumerate(positions) if position is not None]
+        if reused:
+            matrix[reused] = vectors[[positions[i] for i in reused]]
+        if missing:
+            matrix[missing] = new_vectors
+        matrix.flush()
+
+        keys_path = os.path.join(directory, "keys.json")
+        with open(keys_path + ".tmp", 'w') as f:
+            json.dump({"model": self.model_id, "ontology": ontology_iri, "vectors": file_name,
+                       "keys": [list(key) for key in keys]}, f)
+        os.replace(keys_path + ".tmp", keys_path)
+        if vectors_file is not None:
+            os.remove(os.path.join(directory, vectors_file))
+        logger.info(f"Encoded {len(missing)} and reused {len(reused)} label embeddings of {ontology_iri}")
+        return np.load(os.path.join(directory, file_name), mmap_mode="r")
+
+def label_rows(labels: Iterable[Tuple[str, List[str]]]) -> LabelRows:
+    """
+    Flatten (IRI, labels) pairs, as yielded by class_labels, into one row per distinct label.
+
+    Labels are normalized to lowercase words first, so that an IRI local name such as
+    "Heart_Valve" and the label "heart valve" share one row.
+    """
+    rows = []
+    for iri, entity_labels in labels:
+        texts = dict.fromkeys(" ".join(label_tokens(label)) for label in entity_labels)
+        rows.extend((iri, text) for text in texts if text)
+    return rows
@@ -0,0 +1,144 @@
+import logging
+from typing import List, Optional, Tuple
+import numpy as np
+from modules.config import load_config
+from modules.embedding_cache import LabelRows
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+config = load_config()
+logging.basicConfig(level=config.get('Logging', 'level'), format=config.get('Logging', 'format'))
+logger = logging.getLogger(__name__)
+
+NN_BACKENDS = ("matmul", "faiss", "hnsw")
+
+def _top_k_matmul(source: np.ndarray, target: np.ndarray, k: int, block_size: int) -> Tuple[np.ndarray, np.ndarray]:
+    # One block of source rows at a time, so the score matrix held is block_size x len(target)
+    indices = np.empty((len(source), k), dtype=np.int64)
+    scores = np.empty((len(source), k), dtype=np.float32)
+    target_t = np.ascontiguousarray(target, dtype=np.float32).T
+    for start in range(0, len(source), block_size):
+        block = np.asarray(source[start:start + block_size], dtype=np.float32) @ target_t
+        top = np.argpartition(block, -k, axis=1)[:, -k:]
+        top_scores = np.take_along_axis(block, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        indices[start:start + len(block)] = np.take_along_axis(top, order, axis=1)
+        scores[start:start + len(block)] = np.take_along_axis(top_scores, order, axis=1)
+    return indices, scores
+
+def _top_k_faiss(source: np.ndarray, target: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    if faiss is None:
+        raise ImportError("faiss is required for the faiss nearest-neighbour backend")
+    index = faiss.IndexFlatIP(target.shape[1])
+    index.add(np.ascontiguousarray(target, dtype=np.float32))
+    scores, indices = index.search(np.ascontiguousarray(source, dtype=np.float32), k)
+    return indices.astype(np.int64), scores
+
+def _top_k_hnsw(source: np.ndarray, target: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    if hnswlib is None:
+        raise ImportError("hnswlib is required for the hnsw nearest-neighbour backend")
+    index = hnswlib.Index(space="ip", dim=target.shape[1])
+    index.init_index(max_elements=len(target), ef_construction=config.getint('OntologyAligner', 'hnsw_ef_construction', fallback=200),
+                     M=config.getint('OntologyAligner', 'hnsw_m', fallback=16))
+    index.add_items(np.asarray(target, dtype=np.float32))
+    index.set_ef(max(k, config.getint('OntologyAligner', 'hnsw_ef', fallback=100)))
+    labels, distances = index.knn_query(np.asarray(source, dtype=np.float32), k=k)
+    # hnswlib's inner product space reports 1 - similarity
+    return labels.astype(np.int64), (1 - distances).astype(np.float32)
+
+def top_k_neighbours(source: np.ndarray, target: np.ndarray, k: int, backend: Optional[str] = None,
+                     block_size: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Find the k target rows with the highest inner product for every source row.
+
+    With normalized embeddings, the inner product is the cosine similarity. "matmul" is exact
+    and needs only numpy; "faiss" (exact, flat index) and "hnsw" (approximate) need the
+    optional faiss-cpu and hnswlib packages.
+
+    Args:
+        source (np.ndarray): Source embeddings, one per row.
+        target (np.ndarray): Target embeddings, one per row.
+        k (int): Number of neighbours. Capped at the number of target rows.
+        backend (Optional[str]): One of NN_BACKENDS. Defaults to the configured nn_backend.
+        block_size (Optional[int]): Source rows scored per matrix product with "matmul".
+            Defaults to the configured nn_block_size.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The (len(source), k) target row indices and their
+            scores, best first.
+
+    Raises:
+        ValueError: If the backend is unknown.
+        ImportError: If the backend's package is not installed.
+    """
+    backend = backend or config.get('OntologyAligner', 'nn_backend', fallback='matmul')
+    k = min(k, len(target))
+    if len(source) == 0 or k == 0:
+        return np.empty((len(source), k), dtype=np.int64), np.empty((len(source), k), dtype=np.float32)
+    if backend == "matmul":
+        block_size = block_size or config.getint('OntologyAligner', 'nn_block_size', fallback=1024)
+        return _top_k_matmul(source, target, k, block_size)
+    if backend == "faiss":
+        return _top_k_faiss(source, target, k)
+    if backend == "hnsw":
+        return _top_k_hnsw(source, target, k)
+    raise ValueError(f"Unknown nearest-neighbour backend: {backend}")
+
+def entity_neighbours(source_rows: LabelRows, source_vectors: np.ndarray, target_rows: LabelRows,
+                      target_vectors: np.ndarray, k: int, backend: Optional[str] = None,
+                      label_k: Optional[int] = None) -> Tuple[List[str], List[str], np.ndarray, np.ndarray]:
+    """
+    Find the k most similar target entities for every source entity, from label embeddings.
+
+    Entities may have several labels. An entity pair scores the best similarity between any
+    of their labels, taken among the label_k nearest target labels of each source label.
+
+    Args:
+        source_rows (LabelRows): (entity IRI, label) of each source embedding row.
+        source_vectors (np.ndarray): Source label embeddings.
+        target_rows (LabelRows): (entity IRI, label) of each target embedding row.
+        target_vectors (np.ndarray): Target label embeddings.
+        k (int): Number of target entities per source entity.
+        backend (Optional[str]): Nearest-neighbour backend, see top_k_neighbours.
+        label_k (Optional[int]): Neighbours searched per source label. Defaults to 2 * k.
+
+    Returns:
+        Tuple[List[str], List[str], np.ndarray, np.ndarray]: The source entity IRIs, the target
+            entity IRIs, and (len(source IRIs), k) arrays of target entity indices and scores,
+            best first. Rows with fewer than k distinct neighbours are padded with index -1
+            and score -inf.
+    """
+    source_iris, source_entity = np.unique([iri for iri, _ in source_rows], return_inverse=True)
+    target_iris, target_entity = np.unique([iri for iri, _ in target_rows], return_inverse=True)
+    label_indices, label_scores = top_k_neighbours(source_vectors, target_vectors, label_k or 2 * k, backend)
+
+    # Flatten to (source entity, target entity, score) and keep the best score of each pair
+    sources = np.repeat(source_entity, label_indices.shape[1])
+    targets = target_entity[label_indices.ravel()]
+    scores = label_scores.ravel()
+    order = np.lexsort((-scores, targets, sources))
+    sources, targets, scores = sources[order], targets[order], scores[order]
+    first = np.ones(len(sources), dtype=bool)
+    first[1:] = (sources[1:] != sources[:-1]) | (targets[1:] != targets[:-1])
+    sources, targets, scores = sources[first], targets[first], scores[first]
+
+    # Then the k best target entities of each source entity
+    order = np.lexsort((-scores, sources))
+    sources, targets, scores = sources[order], targets[order], scores[order]
+    starts = np.searchsorted(sources, np.arange(len(source_iris)))
+    rank = np.arange(len(sources)) - starts[sources]
+    keep = rank < k
+    indices = np.full((len(source_iris), k), -1, dtype=np.int64)
+    entity_scores = np.full((len(source_iris), k), -np.inf, dtype=np.float32)
+    indices[sources[keep], rank[keep]] = targets[keep]
+    entity_scores[sources[keep], rank[keep]] = scores[keep]
+    logger.info(f"Found the {k} nearest of {len(target_iris)} target entities for {len(source_iris)} source entities")
+    return source_iris.tolist(), target_iris.tolist(), indices, entity_scores
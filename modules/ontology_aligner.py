@@ -1,13 +1,71 @@
+import inspect
 import logging
-from typing import List, Tuple
-from owlready2 import get_ontology, sync_reasoner
-from deeponto.align import BERTMap
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import numpy as np
+from owlready2 import Ontology, World, get_ontology, sync_reasoner
 from modules.config import load_config
+from modules.candidate_index import Candidates, candidate_recall, class_labels, generate_candidates, read_reference
+from modules.embedding_cache import EmbeddingCache, LabelRows, SentenceTransformerEncoder, label_rows
+from modules.nearest_neighbours import entity_neighbours
+from modules.alignment_diff import diff_classes, merge_alignments
+from modules.alignment_io import ALIGNMENT_FORMATS, open_alignment_writer, read_alignment
+
+try:
+    from deeponto.align import BERTMap
+except ImportError:
+    BERTMap = None
 
 config = load_config()
 logging.basicConfig(level=config.get('Logging', 'level'), format=config.get('Logging', 'format'))
 logger = logging.getLogger(__name__)
 
+class BERTMapScorer:
+    """
+    The aligner's view of BERTMap: scores every pair of classes, or only candidate pairs.
+
+    All it assumes of BERTMap is align(ontology1, ontology2) returning (entity1, entity2,
+    confidence) tuples. Candidate pairs can only be scored if that align has a candidates
+    parameter; a BERTMap without one would have to score every pair, so asking it for
+    candidates raises instead. Only mappings between candidate pairs are returned, even if
+    the BERTMap scored more.
+    """
+
+    def __init__(self, bertmap: Optional[Any] = None):
+        """
+        Args:
+            bertmap (Optional[Any]): The BERTMap instance. Defaults to deeponto's BERTMap().
+
+        Raises:
+            ImportError: If no instance is given and deeponto is not installed.
+        """
+        if bertmap is None:
+            if BERTMap is None:
+                raise ImportError("deeponto is required for BERTMap alignment")
+            bertmap = BERTMap()
+        self.bertmap = bertmap
+        try:
+            parameters = inspect.signature(bertmap.align).parameters
+        except (TypeError, ValueError):
+            parameters = {}
+        # A **kwargs catch-all does not count: it may silently drop the candidates
+        self.accepts_candidates = "candidates" in parameters
+
+    def align(self, ontology1: Ontology, ontology2: Ontology,
+              candidates: Optional[List[Tuple[str, str]]] = None) -> List[Tuple[str, str, float]]:
+        """
+        Score all pairs of classes of the two ontologies, or only the candidate (source, target) pairs.
+
+        Raises:
+            ValueError: If candidates are given but BERTMap cannot restrict its scoring to them.
+        """
+        if candidates is None:
+            return list(self.bertmap.align(ontology1, ontology2))
+        if not self.accepts_candidates:
+            raise ValueError("BERTMap.align takes no candidates and would score every pair of classes; "
+                             "set candidate_k = 0 to align all pairs")
+        wanted = set(candidates)
+        return [a for a in self.bertmap.align(ontology1, ontology2, candidates=candidates) if (a[0], a[1]) in wanted]
+
 class OntologyAligner:
     """
     A class for aligning two ontologies using BERTMap.
@@ -28,44 +86,213 @@ class OntologyAligner:
             self.ontology1 = get_ontology(ontology_path1).load()
             self.ontology2 = get_ontology(ontology_path2).load()
             logger.info(f"Loaded ontologies from {ontology_path1} and {ontology_path2}")
-            self.bertmap = BERTMap()
             self.confidence_threshold = config.getfloat('OntologyAligner', 'confidence_threshold')
+            self.candidate_k = config.getint('OntologyAligner', 'candidate_k', fallback=0)
+            self.alignment_method = config.get('OntologyAligner', 'alignment_method', fallback='bertmap')
+            self.bertmap = BERTMapScorer() if self.alignment_method != "embedding" else None
+            self.embedding_cache = EmbeddingCache(SentenceTransformerEncoder())
         except FileNotFoundError as e:
             logger.error(f"Ontology file not found: {e.filename}")
             raise
 
+    def generate_candidates(self, k: Optional[int] = None) -> Candidates:
+        """
+        Narrow each class of the first ontology to its k most plausible classes of the second.
+
+        Args:
+            k (Optional[int]): Number of candidates per class. Defaults to the configured candidate_k.
+
+        Returns:
+            Candidates: The candidate target IRIs and their lexical scores, by source IRI.
+        """
+        return generate_candidates(self.ontology1, self.ontology2, k or self.candidate_k)
+
+    def label_embeddings(self, ontology: Ontology) -> Tuple[LabelRows, np.ndarray]:
+        """
+        Embed the labels and synonyms of every class of an ontology, reusing cached embeddings.
+
+        Only labels that are new or changed since the last run are encoded, so re-aligning
+        against an unchanged reference ontology encodes only the other side.
+
+        Args:
+            ontology (Ontology): One of the two ontologies.
+
+        Returns:
+            Tuple[LabelRows, np.ndarray]: The (class IRI, label) rows and their embeddings.
+        """
+        rows = label_rows(class_labels(ontology))
+        return rows, self.embedding_cache.embed(ontology.base_iri, rows)
+
+    def embedding_neighbours(self, k: int) -> Tuple[List[str], List[str], np.ndarray, np.ndarray]:
+        """
+        Find the k most similar classes of the second ontology for every class of the first,
+        by batched matrix products (or the configured nn_backend) over their label embeddings.
+
+        Returns:
+            Tuple[List[str], List[str], np.ndarray, np.ndarray]: Source and target class IRIs,
+                and the target indices and scores of each source class, as entity_neighbours.
+        """
+        source_rows, source_vectors = self.label_embeddings(self.ontology1)
+        target_rows, target_vectors = self.label_embeddings(self.ontology2)
+        return entity_neighbours(source_rows, source_vectors, target_rows, target_vectors, k)
+
+    def evaluate_candidates(self, reference_path: str, ks: Iterable[int]) -> Dict[int, float]:
+        """
+        Measure the recall of the candidate stage against a reference alignment, to tune candidate_k.
+
+        Args:
+            reference_path (str): Path to the reference alignment, as read by read_reference.
+            ks (Iterable[int]): Numbers of candidates per class to evaluate.
+
+        Returns:
+            Dict[int, float]: Recall by number of candidates.
+        """
+        ks = sorted(ks)
+        recall = candidate_recall(self.generate_candidates(ks[-1]), read_reference(reference_path), ks)
+        for k, value in recall.items():
+            logger.info(f"Candidate recall at {k}: {value:.4f}")
+        return recall
+
+    def _align_classes(self, sources: Optional[Set[str]] = None,
+                       targets: Optional[Set[str]] = None) -> List[Tuple[str, str, float]]:
+        # Score the classes of the first ontology (or only sources) against those of the
+        # second (or only targets), before the confidence threshold is applied
+        if self.alignment_method == "embedding":
+            source_rows, source_vectors = self.label_embeddings(self.ontology1)
+            target_rows, target_vectors = self.label_embeddings(self.ontology2)
+            if sources is not None:
+                keep = [i for i, (iri, _) in enumerate(source_rows) if iri in sources]
+                source_rows, source_vectors = [source_rows[i] for i in keep], source_vectors[keep]
+            if targets is not None:
+                keep = [i for i, (iri, _) in enumerate(target_rows) if iri in targets]
+                target_rows, target_vectors = [target_rows[i] for i in keep], target_vectors[keep]
+            if not source_rows or not target_rows:
+                return []
+            source_iris, target_iris, indices, scores = entity_neighbours(source_rows, source_vectors,
+                                                                          target_rows, target_vectors, 1)
+            return [(source_iris[i], target_iris[indices[i, 0]], float(scores[i, 0]))
+                    for i in np.flatnonzero(indices[:, 0] >= 0)]
+        if self.candidate_k or sources is not None or targets is not None:
+            k = self.candidate_k or config.getint('OntologyAligner', 'realign_candidate_k', fallback=50)
+            candidates = generate_candidates(self.ontology1, self.ontology2, k, sources=sources, targets=targets)
+            pairs = [(source, target) for source, matches in candidates.items() for target, _ in matches]
+            logger.info(f"Scoring {len(pairs)} candidate pairs")
+            return self.bertmap.align(self.ontology1, self.ontology2, candidates=pairs)
+        return self.bertmap.align(self.ontology1, self.ontology2)
+
+    def iter_alignment(self) -> Iterator[Tuple[str, str, float]]:
+        """
+        Yield the alignment of align_ontologies one mapping at a time.
+
+        The classes are scored in full first; only the confidence threshold is applied lazily,
+        so save_alignment can write the mappings without building the filtered list.
+        """
+        count = 0
+        for a in self._align_classes():
+            if a[2] >= self.confidence_threshold:
+                count += 1
+                yield a
+        logger.info(f"Aligned ontologies, found {count} alignments above threshold")
+
     def align_ontologies(self) -> List[Tuple[str, str, float]]:
         """
         Align the two ontologies using BERTMap.
 
+        With candidate_k configured, BERTMap scores only the candidate pairs of
+        generate_candidates instead of every pair of classes. With alignment_method set to
+        "embedding", each class is aligned to its nearest neighbour by label embeddings
+        instead, without BERTMap.
+
         Returns:
             List[Tuple[str, str, float]]: A list of alignment tuples (entity1, entity2, confidence).
         """
         try:
-            alignment = self.bertmap.align(self.ontology1, self.ontology2)
+            return list(self.iter_alignment())
+        except Exception as e:
+            logger.error(f"Error during ontology alignment: {str(e)}")
+            raise
+
+    def realign(self, previous_alignment_path: str, old_ontology_path1: Optional[str] = None,
+                old_ontology_path2: Optional[str] = None) -> List[Tuple[str, str, float]]:
+        """
+        Update a previous alignment to new releases of the ontologies, rescoring only what changed.
+
+        Classes are compared between releases by their labels, synonyms and direct superclasses.
+        Mappings between unchanged classes are carried over. Added and changed source classes,
+        and those whose previous target was removed or changed, are aligned against all target
+        classes; all source classes are aligned against added and changed target classes. The
+        rescored pairs are merged into the carried-over ones as merge_alignments does, keeping
+        one mapping per source class only with the embedding method, like align_ontologies.
+
+        Args:
+            previous_alignment_path (str): The previous alignment, in any format save_alignment writes.
+            old_ontology_path1 (Optional[str]): The previous release of the first ontology, if it changed.
+            old_ontology_path2 (Optional[str]): The previous release of the second ontology, if it changed.
+
+        Returns:
+            List[Tuple[str, str, float]]: The updated alignment, above the confidence threshold.
+
+        Raises:
+            ValueError: If BERTMap cannot score candidate pairs only, as rescoring the changed
+                classes would then cost a full alignment.
+        """
+        try:
+            if self.alignment_method != "embedding" and not self.bertmap.accepts_candidates:
+                raise ValueError("BERTMap.align takes no candidates, so realignment cannot rescore only "
+                                 "the changed classes; align the ontologies in full instead")
+            empty = {"added": set(), "removed": set(), "changed": set()}
+            # Each old release gets its own World, as it shares its IRIs with the new one
+            diff1 = diff_classes(World().get_ontology(old_ontology_path1).load(), self.ontology1) \
+                if old_ontology_path1 else empty
+            diff2 = diff_classes(World().get_ontology(old_ontology_path2).load(), self.ontology2) \
+                if old_ontology_path2 else empty
+            previous = read_alignment(previous_alignment_path)
+
+            stale_targets = diff2["added"] | diff2["removed"] | diff2["changed"]
+            orphaned = {source for source, target, _ in previous if target in stale_targets}
+            sources = (diff1["added"] | diff1["changed"] | orphaned) - diff1["removed"]
+            targets = diff2["added"] | diff2["changed"]
+            rescored = self._align_classes(sources=sources) if sources else []
+            if targets:
+                rescored += self._align_classes(targets=targets)
+            logger.info(f"Rescored {len(sources)} source classes against all targets and all sources "
+                        f"against {len(targets)} target classes")
+
+            stale_sources = diff1["added"] | diff1["removed"] | diff1["changed"]
+            # The embedding method maps each source class to its nearest target only
+            alignment = merge_alignments(previous, rescored, stale_sources, stale_targets,
+                                         one_per_source=self.alignment_method == "embedding")
             filtered_alignment = [a for a in alignment if a[2] >= self.confidence_threshold]
-            logger.info(f"Aligned ontologies, found {len(filtered_alignment)} alignments above threshold")
+            logger.info(f"Realigned ontologies, found {len(filtered_alignment)} alignments above threshold")
             return filtered_alignment
         except Exception as e:
-            logger.error(f"Error during ontology alignment: {str(e)}")
+            logger.error(f"Error during incremental ontology alignment: {str(e)}")
             raise
 
-    def save_alignment(self, alignment: List[Tuple[str, str, float]], file_path: str) -> None:
+    def save_alignment(self, alignment: Iterable[Tuple[str, str, float]], file_path: str,
+                       fmt: Optional[str] = None) -> int:
         """
-        Save the alignment results to a file.
+        Save the alignment results to a file, writing the mappings one at a time.
 
         Args:
-            alignment (List[Tuple[str, str, float]]): The alignment results.
-            file_path (str): Path to save the alignment results.
+            alignment (Iterable[Tuple[str, str, float]]): The alignment results, such as
+                align_ontologies or iter_alignment returns.
+            file_path (str): Path to save the alignment results. A ".gz" suffix gzips the file.
+            fmt (Optional[str]): One of ALIGNMENT_FORMATS. Defaults to the format of the file
+                name: ".tsv", ".sssom.tsv", ".jsonl", ".rdf" (Alignment API) or ".parquet", and
+                "source <-> target: score" lines otherwise.
+
+        Returns:
+            int: The number of mappings written.
 
         Raises:
             IOError: If there's an error writing to the file.
         """
         try:
-            with open(file_path, 'w') as f:
-                for a in alignment:
-                    f.write(f"{a[0]} <-> {a[1]}: {a[2]}\n")
-            logger.info(f"Saved alignment results to {file_path}")
+            with open_alignment_writer(file_path, fmt, self.ontology1.base_iri, self.ontology2.base_iri) as writer:
+                count = writer.write_all(alignment)
+            logger.info(f"Saved {count} alignment results to {file_path}")
+            return count
         except IOError as e:
             logger.error(f"Error saving alignment results: {str(e)}")
             raise
@@ -77,9 +304,23 @@ if __name__ == "__main__":
     parser.add_argument("ontology1", help="Path to the first ontology file")
     parser.add_argument("ontology2", help="Path to the second ontology file")
     parser.add_argument("--output", default="alignment_results.txt", help="Path to save alignment results")
+    parser.add_argument("--reference", help="Reference alignment to measure candidate recall against, instead of aligning")
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 5, 10, 20, 50, 100],
+                        help="Numbers of candidates per class to measure recall at")
+    parser.add_argument("--previous", help="Previous alignment to update incrementally")
+    parser.add_argument("--old-ontology1", help="Previous release of the first ontology (with --previous)")
+    parser.add_argument("--old-ontology2", help="Previous release of the second ontology (with --previous)")
+    parser.add_argument("--format", choices=ALIGNMENT_FORMATS, help="Output format, by default from the output file name")
     args = parser.parse_args()
 
     aligner = OntologyAligner(args.ontology1, args.ontology2)
-    alignment = aligner.align_ontologies()
-    aligner.save_alignment(alignment, args.output)
-    print(f"Alignment completed. Results saved to {args.output}")
\ No newline at end of file
+    if args.reference:
+        for k, recall in aligner.evaluate_candidates(args.reference, args.k).items():
+            print(f"Recall at {k}: {recall:.4f}")
+    else:
+        if args.previous:
+            alignment = aligner.realign(args.previous, args.old_ontology1, args.old_ontology2)
+        else:
+            alignment = aligner.iter_alignment()
+        aligner.save_alignment(alignment, args.output, args.format)
+        print(f"Alignment completed. Results saved to {args.output}")
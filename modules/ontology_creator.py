@@ -1,54 +1,153 @@
+import itertools
 import json
 import logging
 import os
-from typing import Dict, List, Union, Type
+import time
+from collections import defaultdict
+from collections.abc import Mapping
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union, Type
 from owlready2 import *
-from jsonschema import validate
+from jsonschema.validators import validator_for
 import jsonschema.exceptions
 from modules.config import load_config
+from modules.config_fingerprints import (ensure_fingerprint_table, fingerprinted_individuals, record_fingerprints,
+                                         section_fingerprints)
+from modules.config_stream import stream_ontology_config, iter_json_lines, resolve_individuals_file
+from modules.ontology_output import default_output_path, save_ontology, verify_output
 
 config = load_config()
 logging.basicConfig(level=config.get('Logging', 'level'), format=config.get('Logging', 'format'))
 logger = logging.getLogger(__name__)
 
+@lru_cache(maxsize=None)
+def _read_schema(schema_path: str) -> str:
+    with open(schema_path) as schema_file:
+        return schema_file.read()
+
+def _load_schema(schema_path: str) -> Dict[str, Any]:
+    # The file is read once, but every caller gets its own dict to edit
+    return json.loads(_read_schema(schema_path))
+
+@lru_cache(maxsize=8)
+def _compile_validators(schema_json: str) -> Tuple[Any, Optional[Any]]:
+    # Keyed on the serialized schema, so every creator with the same schema shares the
+    # validators. The second one checks a single individual against the items schema.
+    schema = json.loads(schema_json)
+    validator_class = validator_for(schema)
+    validator_class.check_schema(schema)
+    validator = validator_class(schema)
+    items_schema = schema.get("properties", {}).get("individuals", {}).get("items")
+    return validator, validator.evolve(schema=items_schema) if items_schema is not None else None
+
+class _ClassMap(Mapping):
+    """Class name to Owlready2 class mapping that only builds the Python classes that get used."""
+
+    def __init__(self, world: World, storids: Dict[str, int]):
+        self.world = world
+        self.storids = storids
+        self.loaded = {}
+
+    def __getitem__(self, name: str) -> ThingClass:
+        cls = self.loaded.get(name)
+        if cls is None:
+            cls = self.loaded[name] = self.world._get_by_storid(self.storids[name])
+        return cls
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.storids)
+
+    def __len__(self) -> int:
+        return len(self.storids)
+
 class OntologyCreator:
     def __init__(self):
-        with open(config.get('OntologyCreator', 'config_schema_path')) as schema_file:
-            self.CONFIG_SCHEMA = json.load(schema_file)
+        self.CONFIG_SCHEMA = _load_schema(config.get('OntologyCreator', 'config_schema_path'))
+        # Whether to warn about object property values naming no declared individual; shards
+        # turn it off, as their individuals refer to individuals of other shards
+        self.check_object_targets = True
+
+    @property
+    def CONFIG_SCHEMA(self) -> Dict[str, Any]:
+        return self._config_schema
 
-    def create_ontology_from_config(self, config_path: str) -> None:
+    @CONFIG_SCHEMA.setter
+    def CONFIG_SCHEMA(self, schema: Dict[str, Any]) -> None:
+        self._config_schema = schema
+        self._validator, self._individual_validator = _compile_validators(json.dumps(schema, sort_keys=True))
+
+    def validate_config(self, ontology_config: Dict[str, Any]) -> None:
+        """
+        Validate every section of a config except its individuals, which are checked one by
+        one as they are created.
+
+        Raises:
+            jsonschema.exceptions.ValidationError: If the configuration is invalid.
+        """
+        self._validator.validate({key: value for key, value in ontology_config.items() if key != "individuals"})
+
+    def _validate_individual(self, index: int, individual: Dict) -> None:
+        if self._individual_validator is None:
+            return
+        error = jsonschema.exceptions.best_match(self._individual_validator.iter_errors(individual))
+        if error is not None:
+            error.path.extendleft([index, "individuals"])
+            error.message = f"Individual {index}: {error.message}"
+            raise error
+
+    def _validated_individuals(self, individuals: Iterable[Dict]) -> Iterator[Dict]:
+        for index, individual in enumerate(individuals):
+            self._validate_individual(index, individual)
+            yield individual
+
+    def create_ontology_from_config(self, config_path: str, streaming: Optional[bool] = None,
+                                    verification: Optional[str] = None, output_path: Optional[str] = None,
+                                    output_format: Optional[str] = None, compress: Optional[bool] = None) -> None:
+        if streaming is None:
+            streaming = config.getboolean('OntologyCreator', 'streaming', fallback=False)
+        if verification is None:
+            verification = config.get('OntologyCreator', 'verification', fallback='cheap')
+        if output_format is None:
+            output_format = config.get('OntologyCreator', 'output_format', fallback='rdfxml')
+        if compress is None:
+            compress = config.getboolean('OntologyCreator', 'compress', fallback=False)
         try:
-            with open(config_path, 'r') as file:
-                ontology_config = json.load(file)
+            ontology_config, individuals = self._read_config(config_path, streaming)
+            self.validate_config(ontology_config)
             
-            validate(instance=ontology_config, schema=self.CONFIG_SCHEMA)
-            
-            ontology_iri = ontology_config["ontology_iri"]
-            self.onto = get_ontology(ontology_iri)
+            output_dir = config.get('General', 'output_dir')
+            if not os.path.exists(output_dir):
+                os.makedirs(output_dir)
 
-            with self.onto:
+            if streaming:
+                store_path = config.get('OntologyCreator', 'quadstore_path',
+                                        fallback=os.path.join(output_dir, "my_dynamic_ontology.sqlite3"))
+                if os.path.exists(store_path):
+                    os.remove(store_path)
+                self.world = World(filename=store_path, exclusive=False)
+                logger.info(f"Streaming ontology creation into quadstore {store_path}")
+            else:
+                self.world = World()
+            self._open_ontology(ontology_config)
+            db = self.world.graph.db
+            ensure_fingerprint_table(db)
+
+            self._handle_imports(ontology_config.get("imports", []))
+            with self.namespace:
                 self._create_classes(ontology_config["classes"])
                 self._create_object_properties(ontology_config.get("object_properties", {}))
                 self._create_data_properties(ontology_config.get("data_properties", {}))
-                self._create_individuals(ontology_config.get("individuals", []))
+                self._create_individuals(fingerprinted_individuals(db, self._validated_individuals(individuals)))
                 self._handle_disjoint_classes(ontology_config.get("disjoint_classes", []))
                 self._handle_equivalent_classes(ontology_config.get("equivalent_classes", []))
                 self._handle_general_axioms(ontology_config.get("general_axioms", []))
                 self._add_annotations(ontology_config.get("annotations", {}))
                 logger.info("Annotations added to the ontology")
+            record_fingerprints(db, section_fingerprints(ontology_config))
 
-            output_dir = config.get('General', 'output_dir')
-            if not os.path.exists(output_dir):
-                os.makedirs(output_dir)
-
-            output_path = os.path.join(output_dir, "my_dynamic_ontology.owl")
-            self.onto.save(file=output_path, format="rdfxml")
-            default_world.save()
-            logger.info(f"Ontology created and saved successfully to {output_path}")
-
-            # Reload the ontology to ensure all changes are properly saved
-            reloaded_onto = get_ontology(output_path).load()
-            logger.info("Ontology reloaded for verification")
+            self.world.save()
+            self._export(output_dir, output_path, output_format, compress, verification)
+            logger.info(f"Ontology created and saved successfully to {self.manifest['path']}")
         
         except FileNotFoundError:
             logger.error(f"Configuration file not found: {config_path}")
@@ -60,14 +159,69 @@ class OntologyCreator:
             logger.error(f"Configuration validation error: {ve}")
             raise
 
-    def _create_classes(self, classes_config: Dict[str, str]) -> None:
-        self.classes = {}
+    def _read_config(self, config_path: str, streaming: bool) -> Tuple[Dict[str, Any], Iterable[Dict]]:
+        if streaming:
+            return stream_ontology_config(config_path)
+        with open(config_path, 'r') as file:
+            ontology_config = json.load(file)
+        individuals = ontology_config.get("individuals", [])
+        if "individuals_file" in ontology_config:
+            individuals = itertools.chain(individuals, iter_json_lines(resolve_individuals_file(config_path, ontology_config)))
+        return ontology_config, individuals
+
+    def _open_ontology(self, ontology_config: Dict[str, Any]) -> None:
+        self.onto = self.world.get_ontology(ontology_config["ontology_iri"])
+        # Entities may be named under another IRI than the ontology's own, e.g. for shards
+        if "namespace_iri" in ontology_config:
+            self.namespace = self.onto.get_namespace(ontology_config["namespace_iri"])
+        else:
+            self.namespace = self.onto
+
+    def _export(self, output_dir: str, output_path: Optional[str], output_format: str, compress: bool, verification: str) -> None:
+        if output_path is None:
+            output_path = config.get('OntologyCreator', 'output_path',
+                                     fallback=default_output_path(output_dir, output_format, compress))
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        self.manifest = save_ontology(self.onto, output_path, format=output_format, compress=compress)
+        verify_output(self.manifest, verification)
+
+    def _sort_classes(self, classes_config: Dict[str, str]) -> List[str]:
+        # Kahn's algorithm. Every class has a single parent, so the hierarchy is a forest and
+        # the queue is simply the classes whose parent has already been placed.
+        children = defaultdict(list)
+        order = []
         for cls, parent in classes_config.items():
             if parent == "Thing":
-                self.classes[cls] = types.new_class(cls, (Thing,))
+                order.append(cls)
+            elif parent in classes_config:
+                children[parent].append(cls)
             else:
-                self.classes[cls] = types.new_class(cls, (self.classes[parent],))
-            logger.debug(f"Created class: {cls} with parent: {parent}")
+                raise ValueError(f"Parent class '{parent}' of '{cls}' is not defined in the ontology classes")
+        position = 0
+        while position < len(order):
+            order.extend(children.pop(order[position], ()))
+            position += 1
+        if len(order) != len(classes_config):
+            cyclic = sorted(set(classes_config) - set(order))
+            raise ValueError(f"Cyclic class hierarchy among: {', '.join(cyclic)}")
+        return order
+
+    def _create_classes(self, classes_config: Dict[str, str], only: Optional[Iterable[str]] = None) -> None:
+        order = self._sort_classes(classes_config)
+        db = self.world.graph.db
+        context = self.onto.graph.c
+        storids = {cls: self.world._abbreviate(self.namespace.base_iri + cls) for cls in order}
+        triples = []
+        if only is not None:
+            only = set(only)
+            order = [cls for cls in order if cls in only]
+        for cls in order:
+            parent = classes_config[cls]
+            triples.append((context, storids[cls], rdf_type, owl_class))
+            triples.append((context, storids[cls], rdfs_subclassof, owl_thing if parent == "Thing" else storids[parent]))
+        db.executemany("INSERT INTO objs VALUES (?,?,?,?)", triples)
+        self.classes = _ClassMap(self.world, storids)
+        logger.debug(f"Created {len(triples) // 2} classes")
 
     def _create_object_properties(self, properties_config: Dict[str, Dict]) -> None:
         for prop, details in properties_config.items():
@@ -123,17 +277,79 @@ class OntologyCreator:
         else:
             return self.classes[range_type]
 
-    def _create_individuals(self, individuals_config: List[Dict]) -> None:
+    def _create_individuals(self, individuals_config: Iterable[Dict]) -> None:
+        batch_size = config.getint('OntologyCreator', 'batch_size', fallback=10000)
+        context = self.onto.graph.c
+        base_iri = self.namespace.base_iri
+        abbreviate = self.world._abbreviate
+        to_rdf = self.world._to_rdf
+        # Resolved once per property name, and functional status once per (property, class) pair
+        properties = {}
+        functional = {}
+        objs, datas = [], []
+        start = time.perf_counter()
+        count = 0
         for individual in individuals_config:
-            ind = self.classes[individual["class"]](individual["name"])
+            class_name = individual["class"]
+            storid = abbreviate(base_iri + individual["name"])
+            objs.append((context, storid, rdf_type, owl_named_individual))
+            objs.append((context, storid, rdf_type, self.classes.storids[class_name]))
             for attr, values in individual.get("attributes", {}).items():
-                prop = getattr(self.onto, attr)
-                if prop.is_functional_for(ind.__class__):
-                    setattr(ind, prop.name, values[0])
-                else:
-                    for value in values:
-                        getattr(ind, prop.name).append(value)
-            logger.debug(f"Created individual: {individual['name']} of class {individual['class']}")
+                key = (attr, class_name)
+                if key not in functional:
+                    if attr not in properties:
+                        prop = getattr(self.namespace, attr)
+                        if not isinstance(prop, PropertyClass):
+                            raise ValueError(f"Property '{attr}' of individual '{individual['name']}' is not defined in the ontology")
+                        properties[attr] = (prop, issubclass(prop, ObjectProperty))
+                    functional[key] = properties[attr][0].is_functional_for(self.classes[class_name])
+                prop, is_object = properties[attr]
+                for value in values[:1] if functional[key] else values:
+                    if is_object:
+                        objs.append((context, storid, prop.storid, abbreviate(base_iri + value)))
+                    else:
+                        datas.append((context, storid, prop.storid) + to_rdf(value))
+            count += 1
+            if count % batch_size == 0:
+                self._insert_triples(objs, datas)
+                self.world.save()
+                logger.info(f"Committed {count} individuals ({count / (time.perf_counter() - start):.0f} individuals/s)")
+        self._insert_triples(objs, datas)
+        if count:
+            logger.info(f"Created {count} individuals in {time.perf_counter() - start:.2f}s")
+        if self.check_object_targets:
+            self._warn_undeclared_targets([prop.storid for prop, is_object in properties.values() if is_object])
+
+    def _insert_triples(self, objs: List[tuple], datas: List[tuple]) -> None:
+        # An individual listed twice repeats its triples; the quadstore's unique indexes
+        # would reject them, so they are skipped and the individual's values are merged
+        db = self.world.graph.db
+        db.executemany("INSERT OR IGNORE INTO objs VALUES (?,?,?,?)", objs)
+        db.executemany("INSERT OR IGNORE INTO datas VALUES (?,?,?,?,?)", datas)
+        objs.clear()
+        datas.clear()
+
+    def _warn_undeclared_targets(self, property_storids: List[int]) -> None:
+        # Object values are inserted by name, so a misspelt or missing individual would
+        # otherwise leave a dangling IRI without notice
+        if not property_storids:
+            return
+        placeholders = ",".join("?" * len(property_storids))
+        undeclared = [iri for (iri,) in self.world.graph.db.execute(
+            f"""SELECT DISTINCT resources.iri FROM objs JOIN resources ON resources.storid = objs.o
+            WHERE objs.c=? AND objs.p IN ({placeholders})
+            AND NOT EXISTS (SELECT 1 FROM objs AS declared WHERE declared.s = objs.o AND declared.p=?)""",
+            (self.onto.graph.c, *property_storids, rdf_type))]
+        if undeclared:
+            names = ", ".join(iri[len(self.namespace.base_iri):] if iri.startswith(self.namespace.base_iri) else iri
+                              for iri in undeclared[:10])
+            logger.warning(f"{len(undeclared)} object property values name undeclared individuals: {names}"
+                           f"{', ...' if len(undeclared) > 10 else ''}")
+
+    def _handle_imports(self, imports: List[str]) -> None:
+        for iri in imports:
+            self.onto.imported_ontologies.append(self.world.get_ontology(iri))
+            logger.debug(f"Added import of {iri}")
 
     def _handle_disjoint_classes(self, disjoint_classes: List[str]) -> None:
         if disjoint_classes:
@@ -152,7 +368,7 @@ class OntologyCreator:
         for axiom in general_axioms:
             if axiom["axiom_type"] == "TransitiveProperty":
                 for prop_name in axiom["properties"]:
-                    prop = getattr(self.onto, prop_name)
+                    prop = getattr(self.namespace, prop_name)
                     prop.is_a.append(TransitiveProperty)
                     logger.debug(f"Set {prop_name} as TransitiveProperty")
             # Add more axiom types as needed
@@ -161,23 +377,35 @@ class OntologyCreator:
         for ann, details in annotations_config.items():
             ann_prop = types.new_class(ann, (AnnotationProperty,))
             for target, values in details.items():
-                if hasattr(self.onto, target):
-                    entity = getattr(self.onto, target)
+                # Owlready2 namespaces answer unknown names with None
+                entity = getattr(self.namespace, target, None)
+                if entity is not None:
                     for value in values:
                         ann_prop[entity].append(value)
                     logger.debug(f"Added annotation {ann} to {target} with values {values}")
                 else:
                     logger.warning(f"Target '{target}' for annotation '{ann}' not found in the ontology.")
 
-def create_ontology_from_config(config_path: str) -> None:
+def create_ontology_from_config(config_path: str, streaming: Optional[bool] = None,
+                                verification: Optional[str] = None, output_path: Optional[str] = None,
+                                output_format: Optional[str] = None, compress: Optional[bool] = None) -> None:
     creator = OntologyCreator()
-    creator.create_ontology_from_config(config_path)
+    creator.create_ontology_from_config(config_path, streaming=streaming, verification=verification,
+                                        output_path=output_path, output_format=output_format, compress=compress)
 
 if __name__ == "__main__":
     import argparse
     
     parser = argparse.ArgumentParser(description="Create an ontology from a configuration file.")
     parser.add_argument("config", help="Path to the configuration JSON file")
+    parser.add_argument("--stream", action="store_true", default=None,
+                        help="Stream individuals into a disk-backed quadstore with periodic commits")
+    parser.add_argument("--verify", choices=["none", "cheap", "full"],
+                        help="Check the written file: not at all, by checksum and triple count, or by reparsing it")
+    parser.add_argument("--output", help="Path of the created ontology file")
+    parser.add_argument("--format", choices=["rdfxml", "ntriples", "sqlite"], help="Output serialization")
+    parser.add_argument("--gzip", action="store_true", default=None, help="Gzip-compress the output file")
     args = parser.parse_args()
     
-    create_ontology_from_config(args.config)
\ No newline at end of file
+    create_ontology_from_config(args.config, streaming=args.stream, verification=args.verify,
+                                output_path=args.output, output_format=args.format, compress=args.gzip)
\ No newline at end of file
@@ -0,0 +1,178 @@
+import gzip
+import hashlib
+import logging
+import os
+import sqlite3
+from typing import Any, BinaryIO, Dict
+from owlready2 import Ontology, World
+from modules.config import load_config
+
+config = load_config()
+logging.basicConfig(level=config.get('Logging', 'level'), format=config.get('Logging', 'format'))
+logger = logging.getLogger(__name__)
+
+VERIFICATION_MODES = ("none", "cheap", "full")
+
+# Output format -> file extension. rdfxml and ntriples are written by Owlready2's serializer,
+# sqlite is a copy of the whole quadstore that World(filename=...) opens without parsing.
+OUTPUT_FORMATS = {"rdfxml": ".owl", "ntriples": ".nt", "sqlite": ".sqlite3"}
+
+class HashingWriter:
+    """
+    Binary file wrapper that hashes and counts everything written through it.
+
+    The serializer writes one small chunk per triple, so writes are gathered into blocks
+    before they are hashed and passed on. Call flush() before closing the wrapped file.
+    """
+
+    BLOCK_SIZE = 1 << 20
+
+    def __init__(self, file: BinaryIO):
+        self.file = file
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+        self.lines = 0
+        self.pending = []
+        self.pending_size = 0
+
+    def write(self, data: bytes) -> int:
+        self.pending.append(data)
+        self.pending_size += len(data)
+        if self.pending_size >= self.BLOCK_SIZE:
+            self.flush()
+        return len(data)
+
+    def flush(self) -> None:
+        block = b"".join(self.pending)
+        self.pending.clear()
+        self.pending_size = 0
+        self.sha256.update(block)
+        self.size += len(block)
+        self.lines += block.count(b"\n")
+        self.file.write(block)
+
+def count_triples(ontology: Ontology) -> int:
+    """Count the object and data triples asserted in an ontology's quadstore context."""
+    return _count_context_triples(ontology.world.graph.db, ontology.graph.c)
+
+def _count_context_triples(db, c: int) -> int:
+    return (db.execute("SELECT COUNT() FROM objs WHERE c=?", (c,)).fetchone()[0]
+            + db.execute("SELECT COUNT() FROM datas WHERE c=?", (c,)).fetchone()[0])
+
+def default_output_path(output_dir: str, format: str = "rdfxml", compress: bool = False) -> str:
+    """Return the default path of the created ontology for an output format."""
+    if format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format: {format}")
+    return os.path.join(output_dir, "my_dynamic_ontology" + OUTPUT_FORMATS[format] + (".gz" if compress else ""))
+
+def open_output(path: str, mode: str, compressed: bool):
+    return gzip.open(path, mode, compresslevel=6) if compressed else open(path, mode)
+
+def _file_digest(path: str, compressed: bool = False) -> Dict[str, Any]:
+    sha256 = hashlib.sha256()
+    size = 0
+    lines = 0
+    with open_output(path, 'rb', compressed) as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha256.update(chunk)
+            size += len(chunk)
+            lines += chunk.count(b"\n")
+    return {"sha256": sha256.hexdigest(), "size": size, "lines": lines}
+
+def save_ontology(ontology: Ontology, output_path: str, format: str = "rdfxml", compress: bool = False) -> Dict[str, Any]:
+    """
+    Write an ontology to disk, recording the checksum, size and triple count of what was written.
+
+    RDF/XML and N-Triples are streamed through the serializer straight into the (optionally
+    gzip-compressed) file; checksums and sizes are those of the uncompressed content. The
+    sqlite format copies the ontology's committed quadstore with SQLite's backup API.
+
+    Args:
+        ontology (Ontology): The ontology to save.
+        output_path (str): Path of the output file.
+        format (str): One of "rdfxml", "ntriples" or "sqlite".
+        compress (bool): Gzip the output. Not supported for the sqlite format.
+
+    Returns:
+        Dict[str, Any]: The manifest of the written file.
+
+    Raises:
+        ValueError: If the format is unknown, or compression is requested for sqlite.
+    """
+    if format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format: {format}")
+    manifest = {
+        "path": output_path,
+        "format": format,
+        "compressed": compress,
+        "ontology_iri": ontology.base_iri,
+        "context": ontology.graph.c,
+        "triples": count_triples(ontology),
+    }
+    if format == "sqlite":
+        if compress:
+            raise ValueError("The sqlite output format cannot be compressed")
+        source = ontology.world.graph.db
+        if os.path.abspath(output_path) != os.path.abspath(ontology.world.filename or ""):
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            target = sqlite3.connect(output_path)
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+        manifest.update(_file_digest(output_path))
+    else:
+        with open_output(output_path, 'wb', compress) as f:
+            writer = HashingWriter(f)
+            ontology.save(file=writer, format=format)
+            writer.flush()
+        manifest.update(sha256=writer.sha256.hexdigest(), size=writer.size, lines=writer.lines)
+    return manifest
+
+def verify_output(manifest: Dict[str, Any], mode: str = "cheap") -> None:
+    """
+    Check a written ontology file against its manifest.
+
+    "cheap" rereads the file's bytes to compare size and SHA-256 (and, for N-Triples, the
+    line count against the triple count) without parsing it. "full" parses the file into a
+    fresh World and compares triple counts. "none" skips verification.
+
+    Args:
+        manifest (Dict[str, Any]): The manifest returned by save_ontology.
+        mode (str): One of "none", "cheap" or "full".
+
+    Raises:
+        ValueError: If the mode is unknown or the file does not match its manifest.
+    """
+    if mode not in VERIFICATION_MODES:
+        raise ValueError(f"Unknown verification mode: {mode}")
+    if mode == "none":
+        return
+
+    path = manifest["path"]
+    digest = _file_digest(path, manifest.get("compressed", False))
+    if digest["size"] != manifest["size"] or digest["sha256"] != manifest["sha256"]:
+        raise ValueError(f"{path} does not match the serialized ontology ({digest['size']} of {manifest['size']} bytes)")
+    if manifest["format"] == "ntriples" and digest["lines"] != manifest["triples"]:
+        raise ValueError(f"{path} holds {digest['lines']} triples, expected {manifest['triples']}")
+
+    if mode == "full":
+        if manifest["format"] == "sqlite":
+            # The copy may hold several ontologies with the same IRI, count the saved one's context
+            world = World(filename=path, exclusive=False)
+            try:
+                triples = _count_context_triples(world.graph.db, manifest["context"])
+            finally:
+                world.close()
+        else:
+            world = World()
+            try:
+                with open_output(path, 'rb', manifest.get("compressed", False)) as f:
+                    reloaded = world.get_ontology(manifest["ontology_iri"]).load(fileobj=f, format=manifest["format"])
+                triples = count_triples(reloaded)
+            finally:
+                world.close()
+        if triples != manifest["triples"]:
+            raise ValueError(f"{path} reloads with {triples} triples, expected {manifest['triples']}")
+    logger.info(f"Verified {path} ({mode}): {manifest['size']} bytes, {manifest['triples']} triples, sha256 {manifest['sha256'][:12]}")
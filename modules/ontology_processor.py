@@ -1,25 +1,169 @@
+import contextlib
+import functools
+import itertools
+import json
 import logging
-from typing import List, Tuple, Dict
+import sys
+from collections import OrderedDict
+from typing import Any, ContextManager, List, Tuple, Dict, Optional, Iterator, Iterable, TextIO
 from owlready2 import *
+from owlready2.base import _universal_abbrev_2_datatype
 from modules.config import load_config
+from modules.ontology_store import OntologyStore
+from modules.class_hierarchy import ClassHierarchyIndex, hierarchy_signature, iri_name
+from modules.reasoning_session import ReasoningSession
 
 config = load_config()
 logging.basicConfig(level=config.get('Logging', 'level'), format=config.get('Logging', 'format'))
 logger = logging.getLogger(__name__)
 
+ANNOTATION_PREFIXES = {
+    "rdfs": "http://www.w3.org/2000/01/rdf-schema#",
+    "owl": "http://www.w3.org/2002/07/owl#",
+    "skos": "http://www.w3.org/2004/02/skos/core#",
+    "dc": "http://purl.org/dc/elements/1.1/",
+    "dcterms": "http://purl.org/dc/terms/",
+    "oboInOwl": "http://www.geneontology.org/formats/oboInOwl#",
+}
+
+# Entity kinds of iter_entities, by the rdf:type that declares them
+ENTITY_TYPES = {
+    "classes": owl_class,
+    "object_properties": owl_object_property,
+    "data_properties": owl_data_property,
+    "annotation_properties": owl_annotation_property,
+    "individuals": owl_named_individual,
+}
+
+PROPERTY_CHARACTERISTICS = (FunctionalProperty, InverseFunctionalProperty, TransitiveProperty, SymmetricProperty,
+                            AsymmetricProperty, ReflexiveProperty, IrreflexiveProperty)
+
+# Columns of property_profiles
+PROFILE_COLUMNS = ("name", "iri", "type", "characteristics", "domain", "range", "inverse")
+
+# Query types of run_query: method name, required query keys passed positionally and
+# optional query keys passed by name
+BATCH_QUERIES = {
+    "entities": ("query_entities", (), ()),
+    "subclasses": ("query_subclasses", ("class",), ()),
+    "individuals": ("query_individuals", ("class",), ()),
+    "ancestors": ("query_ancestors", ("class",), ("include_self",)),
+    "descendants": ("query_descendants", ("class",), ("include_self",)),
+    "is_subclass_of": ("is_subclass_of", ("class", "ancestor"), ()),
+    "reasoning": ("perform_reasoning", ("class",), ()),
+    "object_properties": ("query_object_properties", (), ()),
+    "data_properties": ("query_data_properties", (), ()),
+    "domains_and_ranges": ("query_property_domains_and_ranges", ("property",), ()),
+    "characteristics": ("query_property_characteristics", ("property",), ()),
+    "hierarchy": ("query_class_hierarchy", (), ()),
+    "annotations": ("query_annotations", (), ("properties",)),
+    "consistency": ("check_ontology_consistency", (), ()),
+    "metrics": ("get_ontology_metrics", (), ()),
+    "page": ("query_page", ("entity_type",), ("class", "offset", "limit", "after")),
+    "property_profiles": ("property_profiles", (), ()),
+}
+
+# Optional query keys whose method parameter has another name
+_QUERY_PARAMETERS = {"class": "class_name"}
+
+def _copy_result(value: Any) -> Any:
+    # Cached lists and dicts are handed out as copies, so callers cannot edit the cache
+    if isinstance(value, tuple):
+        return tuple(_copy_result(item) for item in value)
+    if isinstance(value, (list, dict)):
+        return value.copy()
+    return value
+
+def memoized(method):
+    """
+    Cache a query method's results on the processor, keyed by method name and arguments.
+
+    The cache is dropped as a whole when the ontology changes, including by reasoning.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = (method.__name__, args, tuple(sorted(kwargs.items())))
+        return _copy_result(self._cached_result(key, lambda: method(self, *args, **kwargs)))
+    return wrapper
+
+def _to_json(value: Any) -> Any:
+    # Entities become their names, and datatypes such as int in data property ranges
+    # their Python type names
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    if isinstance(value, dict):
+        return {key: _to_json(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_json(item) for item in value]
+    return getattr(value, "name", None) or getattr(value, "__name__", str(value))
+
 class OntologyProcessor:
-    def __init__(self, ontology_path: str):
+    def __init__(self, ontology_path: str, quadstore_dir: Optional[str] = None):
         try:
-            self.ontology = get_ontology(ontology_path).load()
+            quadstore_dir = quadstore_dir or config.get('OntologyProcessor', 'quadstore_dir')
+            if quadstore_dir:
+                self.ontology = OntologyStore(quadstore_dir).open_ontology(ontology_path)
+            else:
+                self.ontology = get_ontology(ontology_path).load()
             self.reasoning_enabled = config.getboolean('OntologyProcessor', 'reasoning_enabled', fallback=False)
             logger.info(f"Loaded ontology from {ontology_path}")
+            self.reasoning = ReasoningSession(self.ontology)
             if self.reasoning_enabled:
                 logger.info("Reasoning is enabled")
-                sync_reasoner(self.ontology)
+                self.reasoning.classify()
+            self._hierarchy_index = None
+            self._hierarchy_generation = None
+            self._hierarchy_signature = None
+            self._results: OrderedDict = OrderedDict()
+            self._results_generation = None
+            self.result_cache_size = config.getint('OntologyProcessor', 'result_cache_size', fallback=256)
+            self.get_hierarchy_index()
         except FileNotFoundError:
             logger.error(f"Ontology file not found: {ontology_path}")
             raise
 
+    def _generation(self) -> int:
+        # SQLite's change counter for the quadstore connection; it moves on every triple edit
+        return self.ontology.world.graph.db.total_changes
+
+    def _entities(self, storids: List[int]) -> List[Thing]:
+        return [self.ontology.world._get_by_storid(storid) for storid in storids]
+
+    def _class_storid(self, class_name: str) -> int:
+        cls = getattr(self.ontology, class_name)
+        if not isinstance(cls, ThingClass) or cls.storid not in self.get_hierarchy_index():
+            raise AttributeError(f"Class not found in ontology: {class_name}")
+        return cls.storid
+
+    def _cached_result(self, key: Tuple, compute) -> Any:
+        generation = self._generation()
+        if generation != self._results_generation:
+            self._results.clear()
+            self._results_generation = generation
+        if key in self._results:
+            self._results.move_to_end(key)
+            logger.debug(f"Answered {key[0]}{key[1]} from the result cache")
+            return self._results[key]
+        value = compute()
+        if self.result_cache_size > 0:
+            self._results[key] = value
+            if len(self._results) > self.result_cache_size:
+                self._results.popitem(last=False)
+        return value
+
+    def get_hierarchy_index(self) -> ClassHierarchyIndex:
+        # The index is rebuilt only when an edit touched class declarations, subclass or
+        # equivalence triples; other edits move the generation but keep the signature
+        generation = self._generation()
+        if self._hierarchy_index is None or self._hierarchy_generation != generation:
+            signature = hierarchy_signature(self.ontology)
+            if self._hierarchy_index is None or signature != self._hierarchy_signature:
+                self._hierarchy_index = ClassHierarchyIndex(self.ontology)
+                self._hierarchy_signature = signature
+            self._hierarchy_generation = generation
+        return self._hierarchy_index
+
+    @memoized
     def query_entities(self) -> Tuple[List[Thing], List[Property]]:
         classes = list(self.ontology.classes())
         properties = list(self.ontology.properties())
@@ -29,9 +173,9 @@ class OntologyProcessor:
     def perform_reasoning(self, concept_name: str) -> List[Thing]:
         try:
             if self.reasoning_enabled:
-                sync_reasoner(self.ontology)
-            concept = getattr(self.ontology, concept_name)
-            inferred_subsumers = list(concept.ancestors())
+                self.reasoning.classify()
+            storid = self._class_storid(concept_name)
+            inferred_subsumers = self._entities(self.get_hierarchy_index().ancestors(storid))
             logger.info(f"Performed reasoning on {concept_name}, found {len(inferred_subsumers)} inferred subsumers")
             return inferred_subsumers
         except AttributeError:
@@ -40,14 +184,43 @@ class OntologyProcessor:
 
     def query_subclasses(self, class_name: str) -> List[Thing]:
         try:
-            cls = getattr(self.ontology, class_name)
-            subclasses = list(cls.subclasses())
+            storid = self._class_storid(class_name)
+            subclasses = self._entities(self.get_hierarchy_index().children(storid))
             logger.info(f"Queried subclasses of {class_name}, found {len(subclasses)} subclasses")
             return subclasses
         except AttributeError:
             logger.error(f"Class not found in ontology: {class_name}")
             raise
 
+    def query_ancestors(self, class_name: str, include_self: bool = False) -> List[Thing]:
+        try:
+            storid = self._class_storid(class_name)
+            ancestors = self._entities(self.get_hierarchy_index().ancestors(storid, include_self))
+            logger.info(f"Queried ancestors of {class_name}, found {len(ancestors)} ancestors")
+            return ancestors
+        except AttributeError:
+            logger.error(f"Class not found in ontology: {class_name}")
+            raise
+
+    def query_descendants(self, class_name: str, include_self: bool = False) -> List[Thing]:
+        try:
+            storid = self._class_storid(class_name)
+            descendants = self._entities(self.get_hierarchy_index().descendants(storid, include_self))
+            logger.info(f"Queried descendants of {class_name}, found {len(descendants)} descendants")
+            return descendants
+        except AttributeError:
+            logger.error(f"Class not found in ontology: {class_name}")
+            raise
+
+    def is_subclass_of(self, class_name: str, ancestor_name: str) -> bool:
+        try:
+            index = self.get_hierarchy_index()
+            return index.is_subclass_of(self._class_storid(class_name), self._class_storid(ancestor_name))
+        except AttributeError:
+            logger.error(f"Class not found in ontology: {class_name} or {ancestor_name}")
+            raise
+
+    @memoized
     def query_individuals(self, class_name: str) -> List[Thing]:
         try:
             cls = getattr(self.ontology, class_name)
@@ -58,29 +231,75 @@ class OntologyProcessor:
             logger.error(f"Class not found in ontology: {class_name}")
             raise
 
+    @memoized
     def query_object_properties(self) -> List[ObjectProperty]:
         object_properties = list(self.ontology.object_properties())
         logger.info(f"Queried {len(object_properties)} object properties")
         return object_properties
 
+    @memoized
     def query_data_properties(self) -> List[DataProperty]:
         data_properties = list(self.ontology.data_properties())
         logger.info(f"Queried {len(data_properties)} data properties")
         return data_properties
 
-    def query_annotations(self) -> Dict[str, Dict[str, List[str]]]:
-        annotations = {}
-        for entity in list(self.ontology.classes()) + list(self.ontology.individuals()):
-            entity_annotations = {}
-            for prop in self.ontology.annotation_properties():
-                values = list(prop[entity])
-                if values:
-                    entity_annotations[prop.name] = values
-            if entity_annotations:
-                annotations[entity.name] = entity_annotations
+    def _annotation_property_storids(self, properties: Optional[Iterable[str]]) -> Dict[int, str]:
+        if properties is None:
+            return {storid: iri_name(self.ontology.world._unabbreviate(storid)) for (storid,) in self.ontology.world.graph.db.execute(
+                "SELECT s FROM objs WHERE c=? AND p=? AND o=? AND s > 0",
+                (self.ontology.graph.c, rdf_type, owl_annotation_property))}
+        storids = {}
+        for prop in properties:
+            prefix, _, local_name = prop.partition(":")
+            if "://" in prop:
+                iri = prop
+            elif local_name and prefix in ANNOTATION_PREFIXES:
+                iri = ANNOTATION_PREFIXES[prefix] + local_name
+            else:
+                entity = getattr(self.ontology, prop)
+                if not isinstance(entity, AnnotationPropertyClass):
+                    raise AttributeError(f"Annotation property not found in ontology: {prop}")
+                iri = entity.iri
+            storid = self.ontology.world._abbreviate(iri, False)
+            if storid is not None:
+                storids[storid] = iri_name(iri)
+        return storids
+
+    def iter_annotations(self, properties: Optional[Iterable[str]] = None) -> Iterator[Tuple[str, Dict[str, List[str]]]]:
+        # One scan over all annotation triples, ordered by subject, so only one entity's
+        # annotations are held at a time. Properties may be names declared in the ontology,
+        # full IRIs or CURIEs such as "rdfs:label" and "skos:altLabel".
+        world = self.ontology.world
+        prop_names = self._annotation_property_storids(properties)
+        if not prop_names:
+            return
+        placeholders = ",".join("?" * len(prop_names))
+        rows = world.graph.db.execute(
+            f"""SELECT q.s, resources.iri, q.p, q.o, q.d FROM (
+                SELECT s, p, o, d FROM datas WHERE p IN ({placeholders})
+                UNION ALL
+                SELECT s, p, o, NULL FROM objs WHERE p IN ({placeholders})
+            ) q JOIN resources ON resources.storid = q.s
+            WHERE q.s IN (SELECT s FROM objs WHERE c=? AND p=? AND o IN (?, ?))
+            ORDER BY q.s""",
+            (*prop_names, *prop_names, self.ontology.graph.c, rdf_type, owl_class, owl_named_individual))
+
+        current, current_iri, entity_annotations = None, None, {}
+        for s, iri, p, o, d in rows:
+            if s != current:
+                if entity_annotations:
+                    yield iri_name(current_iri), entity_annotations
+                current, current_iri, entity_annotations = s, iri, {}
+            entity_annotations.setdefault(prop_names[p], []).append(world._to_python(o, d))
+        if entity_annotations:
+            yield iri_name(current_iri), entity_annotations
+
+    def query_annotations(self, properties: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, List[str]]]:
+        annotations = dict(self.iter_annotations(properties))
         logger.info(f"Queried annotations for {len(annotations)} entities")
         return annotations
 
+    @memoized
     def query_property_characteristics(self, property_name: str) -> List[str]:
         try:
             prop = getattr(self.ontology, property_name)
@@ -94,26 +313,17 @@ class OntologyProcessor:
                 characteristics.append("TransitiveProperty")
             
             logger.info(f"Queried characteristics of {property_name}, found {len(characteristics)} characteristics")
-            
-            # Debugging: print the property and its characteristics
-            print(f"Property: {property_name}, Characteristics: {characteristics}")
-            
             return characteristics
         except AttributeError:
             logger.error(f"Property not found in ontology: {property_name}")
             raise
 
     def query_class_hierarchy(self) -> Dict[str, List[str]]:
-        hierarchy = {}
-        for cls in self.ontology.classes():
-            parent_names = [parent.name for parent in cls.is_a if isinstance(parent, ThingClass)]
-            for parent_name in parent_names:
-                if parent_name not in hierarchy:
-                    hierarchy[parent_name] = []
-                hierarchy[parent_name].append(cls.name)
+        hierarchy = self.get_hierarchy_index().hierarchy()
         logger.info(f"Queried class hierarchy, found {len(hierarchy)} parent classes")
         return hierarchy
 
+    @memoized
     def query_property_domains_and_ranges(self, property_name: str) -> Tuple[List[Thing], List[Thing]]:
         try:
             prop = getattr(self.ontology, property_name)
@@ -126,39 +336,279 @@ class OntologyProcessor:
             raise
 
     def check_ontology_consistency(self) -> bool:
-        try:
-            with self.ontology:
-                sync_reasoner()
-            logger.info("Checked ontology consistency")
-            return True
-        except OwlReadyInconsistentOntologyError:
+        is_consistent = self.reasoning.is_consistent()
+        logger.info("Checked ontology consistency")
+        if not is_consistent:
             logger.warning("Ontology is inconsistent")
-            return False
+        return is_consistent
 
+    @memoized
     def get_ontology_metrics(self) -> Dict[str, int]:
-        metrics = {
-            "num_classes": len(list(self.ontology.classes())),
-            "num_object_properties": len(list(self.ontology.object_properties())),
-            "num_data_properties": len(list(self.ontology.data_properties())),
-            "num_individuals": len(list(self.ontology.individuals())),
-            "num_annotation_properties": len(list(self.ontology.annotation_properties())),
-        }
+        # Counted in the quadstore, in the same way the ontology's classes(), individuals(),
+        # ... iterators select entities, without loading any of them
+        kinds = {storid: kind for kind, storid in ENTITY_TYPES.items()}
+        metrics = {f"num_{kind}": 0 for kind in ENTITY_TYPES}
+        for o, count in self.ontology.world.graph.db.execute(
+                f"""SELECT o, COUNT(DISTINCT s) FROM objs WHERE c=? AND p=? AND o IN ({",".join("?" * len(kinds))}) AND s > 0
+                GROUP BY o""", (self.ontology.graph.c, rdf_type, *kinds)):
+            metrics[f"num_{kinds[o]}"] = count
         logger.info("Calculated ontology metrics")
         return metrics
 
+    def _iter_storids(self, sql: str, params: Tuple, offset: int, limit: Optional[int], after: Optional[int]) -> Iterator[Thing]:
+        # Keyset pagination on storid: sql selects column s and ends in a WHERE clause
+        rows = self.ontology.world.graph.db.execute(
+            f"{sql} AND s > ? ORDER BY s LIMIT ? OFFSET ?",
+            (*params, after or 0, -1 if limit is None else limit, offset))
+        for (storid,) in rows:
+            yield self.ontology.world._get_by_storid(storid)
+
+    def iter_entities(self, entity_type: str, offset: int = 0, limit: Optional[int] = None,
+                      after: Optional[int] = None) -> Iterator[Thing]:
+        """
+        Iterate over the entities of one kind declared in the ontology, in storid order.
+
+        Entities are read from the quadstore as they are consumed, so the caller holds only
+        the ones it keeps.
+
+        Args:
+            entity_type (str): One of ENTITY_TYPES, e.g. "classes" or "individuals".
+            offset (int): Number of entities to skip.
+            limit (Optional[int]): Maximum number of entities to yield.
+            after (Optional[int]): Cursor: only yield entities with a larger storid, such as the
+                last entity of the previous page.
+
+        Raises:
+            ValueError: If the entity type is unknown.
+        """
+        if entity_type not in ENTITY_TYPES:
+            raise ValueError(f"Unknown entity type: {entity_type}")
+        return self._iter_storids("SELECT DISTINCT s FROM objs WHERE c=? AND p=? AND o=?",
+                                  (self.ontology.graph.c, rdf_type, ENTITY_TYPES[entity_type]), offset, limit, after)
+
+    def iter_individuals(self, class_name: str, offset: int = 0, limit: Optional[int] = None,
+                         after: Optional[int] = None) -> Iterator[Thing]:
+        """Iterate over the instances of a class and of its subclasses, as query_individuals, in storid order."""
+        try:
+            descendants = self.get_hierarchy_index().descendants(self._class_storid(class_name))
+        except AttributeError:
+            logger.error(f"Class not found in ontology: {class_name}")
+            raise
+        return self._iter_storids("SELECT DISTINCT s FROM objs WHERE p=? AND o IN (SELECT value FROM json_each(?))",
+                                  (rdf_type, json.dumps(descendants)), offset, limit, after)
+
+    def iter_subclasses(self, class_name: str, offset: int = 0, limit: Optional[int] = None,
+                        after: Optional[int] = None) -> Iterator[Thing]:
+        """Iterate over the direct subclasses of a class, as query_subclasses, in storid order."""
+        try:
+            children = sorted(self.get_hierarchy_index().children(self._class_storid(class_name)))
+        except AttributeError:
+            logger.error(f"Class not found in ontology: {class_name}")
+            raise
+        children = (storid for storid in children if storid > (after or 0))
+        stop = None if limit is None else offset + limit
+        return (self.ontology.world._get_by_storid(storid) for storid in itertools.islice(children, offset, stop))
+
+    def query_page(self, entity_type: str, class_name: Optional[str] = None, offset: int = 0, limit: int = 100,
+                   after: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Return one page of entities, with the cursor of the next page.
+
+        Args:
+            entity_type (str): One of ENTITY_TYPES, or "subclasses" or "individuals" with a class_name.
+            class_name (Optional[str]): The class whose subclasses or individuals to list.
+            offset (int): Number of entities to skip.
+            limit (int): Page size.
+            after (Optional[int]): Cursor returned as "next" with the previous page.
+
+        Returns:
+            Dict[str, Any]: The page's entities under "items" and, unless it is the last page,
+                the cursor of the next one under "next".
+
+        Raises:
+            ValueError: If the entity type is unknown or the page size is not positive.
+            AttributeError: If the class is not found in the ontology.
+        """
+        offset, limit, after = int(offset), int(limit), None if after is None else int(after)
+        if limit < 1:
+            raise ValueError(f"Page size must be positive: {limit}")
+        if entity_type == "subclasses" and class_name:
+            entities = self.iter_subclasses(class_name, offset, limit + 1, after)
+        elif entity_type == "individuals" and class_name:
+            entities = self.iter_individuals(class_name, offset, limit + 1, after)
+        else:
+            entities = self.iter_entities(entity_type, offset, limit + 1, after)
+        items = list(entities)
+        page = {"items": items[:limit], "next": items[limit - 1].storid if len(items) > limit else None}
+        logger.info(f"Queried a page of {len(page['items'])} {entity_type}")
+        return page
+
+    def property_profiles(self) -> Dict[str, List[Any]]:
+        """
+        Profile every object and data property of the ontology in one pass over the quadstore.
+
+        Returns:
+            Dict[str, List[Any]]: One column per PROFILE_COLUMNS entry, one row per property in
+                storid order: its name, IRI, "object" or "data" type, characteristics, domain,
+                range and inverse. Classes are given by IRI local name, datatypes by the name of
+                their Python type (as in query_property_domains_and_ranges results passed through
+                run_query), and class expressions in their Owlready2 notation. The columns can be handed to
+                pandas.DataFrame or pyarrow.Table.from_pydict; see property_profile_frame.
+        """
+        world = self.ontology.world
+        characteristics = {cls.storid: cls.__name__ for cls in PROPERTY_CHARACTERISTICS}
+        types = {owl_object_property: "object", owl_data_property: "data"}
+        relations = {rdf_domain: "domain", rdf_range: "range"}
+
+        def name_of(storid: int, iri: Optional[str]) -> str:
+            if storid in _universal_abbrev_2_datatype:
+                return _universal_abbrev_2_datatype[storid].__name__
+            return iri_name(iri) if iri else str(self.ontology._parse_bnode(storid))
+
+        profiles, inverses = {}, []
+        for s, p, o, iri, o_iri in world.graph.db.execute(
+                """SELECT objs.s, objs.p, objs.o, rs.iri, ro.iri FROM objs
+                JOIN resources rs ON rs.storid = objs.s
+                LEFT JOIN resources ro ON ro.storid = objs.o
+                WHERE objs.c = ? AND objs.p IN (?, ?, ?, ?)
+                AND objs.s IN (SELECT s FROM objs WHERE c = ? AND p = ? AND o IN (?, ?))
+                ORDER BY objs.s""",
+                (self.ontology.graph.c, rdf_type, rdf_domain, rdf_range, owl_inverse_property,
+                 self.ontology.graph.c, rdf_type, owl_object_property, owl_data_property)):
+            profile = profiles.get(s)
+            if profile is None:
+                profile = profiles[s] = {"name": iri_name(iri), "iri": iri, "type": None, "characteristics": [],
+                                         "domain": [], "range": [], "inverse": None}
+            if p == rdf_type:
+                if o in types:
+                    profile["type"] = types[o]
+                elif o in characteristics:
+                    profile["characteristics"].append(characteristics[o])
+            elif p == owl_inverse_property:
+                inverses.append((s, o, o_iri))
+            else:
+                profile[relations[p]].append(name_of(o, o_iri))
+        # owl:inverseOf is declared on one of the two properties only
+        for s, o, o_iri in inverses:
+            profiles[s]["inverse"] = iri_name(o_iri)
+            if o in profiles:
+                profiles[o]["inverse"] = profiles[s]["name"]
+
+        columns = {column: [profile[column] for profile in profiles.values()] for column in PROFILE_COLUMNS}
+        logger.info(f"Profiled {len(profiles)} properties")
+        return columns
+
+    def property_profile_frame(self) -> "pandas.DataFrame":
+        """
+        Return property_profiles as a pandas DataFrame.
+
+        Raises:
+            ImportError: If pandas is not installed.
+        """
+        # Imported here, so that loading pandas does not slow down every other use of the processor
+        try:
+            import pandas
+        except ImportError:
+            raise ImportError("pandas is required for property_profile_frame; use property_profiles for plain columns")
+        return pandas.DataFrame(self.property_profiles(), columns=list(PROFILE_COLUMNS))
+
+    def run_query(self, query: Dict[str, Any]) -> Any:
+        """
+        Answer one query object such as {"query": "subclasses", "class": "Person"}.
+
+        Args:
+            query (Dict[str, Any]): The query type under "query", one of BATCH_QUERIES, and its
+                arguments: "class", "ancestor", "property", "include_self" or "properties".
+
+        Returns:
+            Any: The JSON-serializable result, with entities given by name.
+
+        Raises:
+            ValueError: If the query type is unknown or a required argument is missing.
+            AttributeError: If a class or property is not found in the ontology.
+        """
+        query_type = query.get("query")
+        if query_type not in BATCH_QUERIES:
+            raise ValueError(f"Unknown query type: {query_type}")
+        method, required, optional = BATCH_QUERIES[query_type]
+        missing = [key for key in required if key not in query]
+        if missing:
+            raise ValueError(f"Missing argument for {query_type} query: {', '.join(missing)}")
+        args = [query[key] for key in required]
+        kwargs = {_QUERY_PARAMETERS.get(key, key): query[key] for key in optional if key in query}
+        return _to_json(getattr(self, method)(*args, **kwargs))
+
+    def run_batch(self, queries: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Answer queries one after another against the loaded ontology.
+
+        Each query is answered by a copy of the query object with its "result", or with an
+        "error" if it failed, so one bad query does not stop the batch.
+        """
+        for query in queries:
+            yield self._answer(query)
+
+    def _answer(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            return {**query, "result": self.run_query(query)}
+        except (ValueError, AttributeError, TypeError) as e:
+            return {**query, "error": str(e)}
+        except OwlReadyInconsistentOntologyError:
+            return {**query, "error": "The ontology is inconsistent"}
+
+    def run_batch_file(self, input_file: TextIO, output_file: TextIO,
+                       lock: ContextManager = contextlib.nullcontext()) -> Dict[str, int]:
+        """
+        Answer a JSON Lines stream of queries, writing one JSON Lines result per query.
+
+        Lines that are not JSON objects get an error result with their line number in their place.
+
+        Args:
+            input_file (TextIO): The queries, one JSON object per non-blank line.
+            output_file (TextIO): Where the results are written, in query order.
+            lock (ContextManager): Held while each query is answered, and released between
+                queries, so other users of the processor can take turns with a long batch.
+
+        Returns:
+            Dict[str, int]: The number of queries answered and of those that failed.
+        """
+        counts = {"queries": 0, "errors": 0}
+        for line_number, line in enumerate(input_file, 1):
+            if not line.strip():
+                continue
+            try:
+                query = json.loads(line)
+                if not isinstance(query, dict):
+                    raise ValueError("Query is not a JSON object")
+                with lock:
+                    result = self._answer(query)
+            except ValueError as e:
+                result = {"line": line_number, "error": str(e)}
+            counts["queries"] += 1
+            counts["errors"] += "error" in result
+            output_file.write(json.dumps(result) + "\n")
+        logger.info(f"Answered {counts['queries']} batch queries, {counts['errors']} failed")
+        return counts
+
 if __name__ == "__main__":
     import argparse
     
     parser = argparse.ArgumentParser(description="Process and query an ontology.")
     parser.add_argument("ontology", help="Path to the ontology file")
-    parser.add_argument("--query", choices=["entities", "subclasses", "individuals", "annotations", "metrics"],
+    parser.add_argument("--query", choices=["entities", "subclasses", "individuals", "annotations", "metrics", "properties"],
                         help="Type of query to perform")
     parser.add_argument("--class", dest="class_name", help="Class name for subclass or individual queries")
+    parser.add_argument("--annotation-property", dest="annotation_properties", action="append",
+                        help="Annotation property to report (name, IRI or CURIE such as rdfs:label); repeatable")
+    parser.add_argument("--batch", help="JSON Lines file of queries to answer, or - for stdin; results go to stdout")
     args = parser.parse_args()
 
     processor = OntologyProcessor(args.ontology)
 
-    if args.query == "entities":
+    if args.batch:
+        with open(args.batch) if args.batch != "-" else contextlib.nullcontext(sys.stdin) as queries:
+            processor.run_batch_file(queries, sys.stdout)
+    elif args.query == "entities":
         classes, properties = processor.query_entities()
         print(f"Classes: {[c.name for c in classes]}")
         print(f"Properties: {[p.name for p in properties]}")
@@ -169,9 +619,13 @@ if __name__ == "__main__":
         individuals = processor.query_individuals(args.class_name)
         print(f"Individuals of {args.class_name}: {[i.name for i in individuals]}")
     elif args.query == "annotations":
-        annotations = processor.query_annotations()
-        for entity, ann in annotations.items():
+        for entity, ann in processor.iter_annotations(args.annotation_properties):
             print(f"{entity}: {ann}")
+    elif args.query == "properties":
+        profiles = processor.property_profiles()
+        print("\t".join(PROFILE_COLUMNS))
+        for row in zip(*profiles.values()):
+            print("\t".join(", ".join(value) if isinstance(value, list) else str(value or "") for value in row))
     elif args.query == "metrics":
         metrics = processor.get_ontology_metrics()
         for metric, value in metrics.items():
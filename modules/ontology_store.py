@@ -0,0 +1,137 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Dict
+from owlready2 import World, Ontology
+from modules.config import load_config
+
+config = load_config()
+logging.basicConfig(level=config.get('Logging', 'level'), format=config.get('Logging', 'format'))
+logger = logging.getLogger(__name__)
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    Compute the SHA-256 digest of a file without reading it into memory at once.
+
+    Args:
+        path (str): Path to the file.
+        chunk_size (int): Number of bytes read per iteration.
+
+    Returns:
+        str: The hexadecimal digest.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class OntologyStore:
+    """
+    A directory of persistent Owlready2 SQLite quadstores, one per ontology source file.
+
+    Stores are named after the SHA-256 of the source file's content. An index maps each
+    source path to its last seen modification time, size and digest, so an unchanged file
+    is reopened without hashing or parsing it, and a changed file is re-imported once.
+    """
+
+    INDEX_FILE = "index.json"
+
+    def __init__(self, store_dir: str):
+        """
+        Initialize the OntologyStore.
+
+        Args:
+            store_dir (str): Directory holding the quadstores and their index.
+        """
+        self.store_dir = store_dir
+        os.makedirs(store_dir, exist_ok=True)
+        self.index_path = os.path.join(store_dir, self.INDEX_FILE)
+
+    def open_ontology(self, ontology_path: str) -> Ontology:
+        """
+        Open the ontology from its cached quadstore, importing the source file if needed.
+
+        Args:
+            ontology_path (str): Path to the ontology source file.
+
+        Returns:
+            Ontology: The loaded ontology, backed by an on-disk World.
+
+        Raises:
+            FileNotFoundError: If the ontology file is not found.
+        """
+        source = os.path.abspath(ontology_path)
+        stat = os.stat(source)
+        index = self._read_index()
+        entry = index.get(source)
+
+        if (entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size
+                and os.path.exists(self._store_path(entry["sha256"]))):
+            logger.info(f"Opened cached quadstore for {ontology_path}")
+            return self._open(entry["sha256"], entry["base_iri"])
+
+        digest = file_sha256(source)
+        known = next((e for e in index.values() if e["sha256"] == digest), None)
+        if known and os.path.exists(self._store_path(digest)):
+            base_iri = known["base_iri"]
+            logger.info(f"Content of {ontology_path} is unchanged, reusing its quadstore")
+        else:
+            base_iri = self._import(source, digest)
+
+        stale = entry["sha256"] if entry and entry["sha256"] != digest else None
+        index[source] = {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "sha256": digest,
+            "base_iri": base_iri,
+        }
+        self._write_index(index)
+        if stale and not any(e["sha256"] == stale for e in index.values()):
+            self._remove_store(stale)
+
+        return self._open(digest, base_iri)
+
+    def _store_path(self, digest: str) -> str:
+        return os.path.join(self.store_dir, f"{digest}.sqlite3")
+
+    def _open(self, digest: str, base_iri: str) -> Ontology:
+        world = World(filename=self._store_path(digest), exclusive=False)
+        ontology = world.get_ontology(base_iri).load()
+        # Commit right away so other processes can open the same store
+        world.save()
+        return ontology
+
+    def _import(self, source: str, digest: str) -> str:
+        tmp_path = self._store_path(digest) + ".tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        world = World(filename=tmp_path)
+        try:
+            ontology = world.get_ontology(source).load()
+            base_iri = ontology.base_iri
+            world.save()
+        finally:
+            world.close()
+        os.replace(tmp_path, self._store_path(digest))
+        logger.info(f"Imported {source} into quadstore {self._store_path(digest)}")
+        return base_iri
+
+    def _remove_store(self, digest: str) -> None:
+        path = self._store_path(digest)
+        if os.path.exists(path):
+            os.remove(path)
+            logger.debug(f"Removed stale quadstore {path}")
+
+    def _read_index(self) -> Dict[str, Dict]:
+        if not os.path.exists(self.index_path):
+            return {}
+        with open(self.index_path, 'r') as f:
+            return json.load(f)
+
+    def _write_index(self, index: Dict[str, Dict]) -> None:
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
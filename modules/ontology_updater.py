@@ -0,0 +1,286 @@
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Iterable, Iterator, Optional, Set
+from owlready2 import (World, TransitiveProperty, rdf_type, rdfs_subclassof, owl_class,
+                       owl_equivalentclass, owl_inverse_property)
+import jsonschema.exceptions
+from modules.config import load_config
+from modules.config_fingerprints import (FINGERPRINT_TABLE, ENTITY_SECTIONS, ensure_fingerprint_table,
+                                         fingerprinted_individuals, record_fingerprints, section_fingerprints)
+from modules.ontology_creator import OntologyCreator
+
+config = load_config()
+logging.basicConfig(level=config.get('Logging', 'level'), format=config.get('Logging', 'format'))
+logger = logging.getLogger(__name__)
+
+_NEW_FINGERPRINTS = "temp.new_fingerprints"
+
+class OntologyUpdater(OntologyCreator):
+    """
+    Applies the difference between a config and the last one applied to a quadstore.
+
+    Every quadstore written by OntologyCreator records a fingerprint per class, property,
+    annotation property and individual of its config (and one for the axiom sections). An
+    update fingerprints the new config the same way, diffs the two in SQL, and only removes
+    and recreates the entities whose fingerprint was added, removed or changed.
+    """
+
+    def update_ontology_from_config(self, config_path: str, quadstore_path: Optional[str] = None,
+                                    streaming: Optional[bool] = None, verification: Optional[str] = None,
+                                    output_path: Optional[str] = None, output_format: Optional[str] = None,
+                                    compress: Optional[bool] = None, export: bool = True) -> Dict[str, Dict[str, int]]:
+        """
+        Update a quadstore, and optionally its exported file, to match a new config.
+
+        Args:
+            config_path (str): Path to the new configuration JSON file.
+            quadstore_path (Optional[str]): Quadstore to update. Defaults to the configured
+                quadstore_path, as written by streaming creation.
+            streaming (Optional[bool]): Read individuals incrementally.
+            verification (Optional[str]): Verification mode of the exported file.
+            output_path (Optional[str]): Path of the exported file.
+            output_format (Optional[str]): Format of the exported file.
+            compress (Optional[bool]): Gzip the exported file.
+            export (bool): Write the updated ontology out after updating the quadstore.
+
+        Returns:
+            Dict[str, Dict[str, int]]: Number of added, removed and changed entries per section.
+
+        Raises:
+            FileNotFoundError: If the configuration file or the quadstore is not found.
+            ValueError: If the quadstore holds no applied config, or the ontology IRIs changed.
+        """
+        if streaming is None:
+            streaming = config.getboolean('OntologyCreator', 'streaming', fallback=False)
+        if verification is None:
+            verification = config.get('OntologyCreator', 'verification', fallback='cheap')
+        if output_format is None:
+            output_format = config.get('OntologyCreator', 'output_format', fallback='rdfxml')
+        if compress is None:
+            compress = config.getboolean('OntologyCreator', 'compress', fallback=False)
+        output_dir = config.get('General', 'output_dir')
+        if quadstore_path is None:
+            quadstore_path = config.get('OntologyCreator', 'quadstore_path',
+                                        fallback=os.path.join(output_dir, "my_dynamic_ontology.sqlite3"))
+        if not os.path.exists(quadstore_path):
+            raise FileNotFoundError(f"Quadstore not found: {quadstore_path}")
+        start = time.perf_counter()
+
+        try:
+            ontology_config, individuals = self._read_config(config_path, streaming)
+            self.validate_config(ontology_config)
+
+            self.world = World(filename=quadstore_path, exclusive=False)
+            db = self.world.graph.db
+            if db.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (FINGERPRINT_TABLE,)).fetchone() is None:
+                raise ValueError(f"{quadstore_path} holds no applied config, create the ontology first")
+            ensure_fingerprint_table(db, _NEW_FINGERPRINTS)
+            db.execute(f"DELETE FROM {_NEW_FINGERPRINTS}")
+            record_fingerprints(db, section_fingerprints(ontology_config), _NEW_FINGERPRINTS)
+            # Unchanged individuals were validated when they were applied, only the others
+            # are validated, as they are created
+            for _ in fingerprinted_individuals(db, individuals, _NEW_FINGERPRINTS):
+                pass
+
+            diff = self._diff()
+            if diff["ontology"]["changed"]:
+                raise ValueError("The ontology IRI, namespace IRI or imports changed, a full rebuild is needed")
+            self._open_ontology(ontology_config)
+
+            with self.namespace:
+                recreated = self._remove_entities(diff, ontology_config)
+                self._create_entities(diff, ontology_config, config_path, streaming, recreated)
+
+            db.execute(f"""DELETE FROM {FINGERPRINT_TABLE} WHERE NOT EXISTS
+                           (SELECT 1 FROM {_NEW_FINGERPRINTS} n
+                            WHERE n.section = {FINGERPRINT_TABLE}.section AND n.name = {FINGERPRINT_TABLE}.name)""")
+            db.execute(f"""INSERT OR REPLACE INTO {FINGERPRINT_TABLE}
+                           SELECT n.* FROM {_NEW_FINGERPRINTS} n LEFT JOIN {FINGERPRINT_TABLE} o
+                           ON o.section = n.section AND o.name = n.name
+                           WHERE o.fingerprint IS NULL OR o.fingerprint != n.fingerprint""")
+            db.execute(f"DROP TABLE {_NEW_FINGERPRINTS}")
+            self.world.save()
+
+            counts = {section: {kind: len(names) for kind, names in kinds.items() if kind != "old_values"}
+                      for section, kinds in diff.items() if section != "ontology"}
+            logger.info(f"Updated {quadstore_path} in {time.perf_counter() - start:.2f}s: {counts}")
+            if export:
+                self._export(output_dir, output_path, output_format, compress, verification)
+                logger.info(f"Updated ontology saved to {self.manifest['path']}")
+            return counts
+
+        except FileNotFoundError:
+            logger.error(f"Configuration file not found: {config_path}")
+            raise
+        except json.JSONDecodeError:
+            logger.error(f"Invalid JSON in configuration file: {config_path}")
+            raise
+        except jsonschema.exceptions.ValidationError as ve:
+            logger.error(f"Configuration validation error: {ve}")
+            raise
+
+    def _diff(self) -> Dict[str, Dict[str, Any]]:
+        db = self.world.graph.db
+        sections = ("ontology",) + ENTITY_SECTIONS + ("axioms", "individuals")
+        diff = {section: {"added": set(), "removed": set(), "changed": set(), "old_values": {}} for section in sections}
+        for section, name in db.execute(
+                f"""SELECT n.section, n.name FROM {_NEW_FINGERPRINTS} n LEFT JOIN {FINGERPRINT_TABLE} o
+                    ON o.section = n.section AND o.name = n.name WHERE o.section IS NULL"""):
+            diff[section]["added"].add(name)
+        for section, name, value in db.execute(
+                f"""SELECT o.section, o.name, o.value FROM {FINGERPRINT_TABLE} o LEFT JOIN {_NEW_FINGERPRINTS} n
+                    ON o.section = n.section AND o.name = n.name WHERE n.section IS NULL"""):
+            diff[section]["removed"].add(name)
+            diff[section]["old_values"][name] = json.loads(value) if value else None
+        for section, name, value in db.execute(
+                f"""SELECT o.section, o.name, o.value FROM {FINGERPRINT_TABLE} o JOIN {_NEW_FINGERPRINTS} n
+                    ON o.section = n.section AND o.name = n.name WHERE o.fingerprint != n.fingerprint"""):
+            diff[section]["changed"].add(name)
+            diff[section]["old_values"][name] = json.loads(value) if value else None
+        return diff
+
+    def _storid(self, name: str) -> Optional[int]:
+        return self.world._abbreviate(self.namespace.base_iri + name, False)
+
+    def _delete(self, storid: int, as_predicate: bool = False, as_object: bool = False) -> None:
+        # Delete the triples of an entity in the ontology's context: those it is the subject
+        # of, and optionally those it is the predicate or (entity) object of.
+        context = self.onto.graph.c
+        conditions = ["s=?"] + (["p=?"] if as_predicate else [])
+        for table, table_conditions in (("objs", conditions + (["o=?"] if as_object else [])), ("datas", conditions)):
+            self.world.graph.db.execute(f"DELETE FROM {table} WHERE c=? AND ({' OR '.join(table_conditions)})",
+                                        (context,) + (storid,) * len(table_conditions))
+
+    def _remove_entities(self, diff: Dict[str, Dict[str, Any]], ontology_config: Dict[str, Any]) -> Set[str]:
+        # Returns the names of the entities whose triples were all deleted, to be recreated.
+        # Axioms are undone first, through Owlready2, while every class they mention still exists
+        if diff["axioms"]["changed"]:
+            self._undo_axioms(diff["axioms"]["old_values"][""], ontology_config)
+
+        touched: Set[int] = set()
+        recreated: Set[str] = set()
+        for name in diff["individuals"]["removed"]:
+            storid = self._storid(name)
+            if storid:
+                self._delete(storid, as_object=True)
+                touched.add(storid)
+        for name in diff["individuals"]["changed"]:
+            storid = self._storid(name)
+            if storid:
+                self._delete(storid)
+                touched.add(storid)
+                recreated.add(name)
+
+        for name in diff["classes"]["removed"]:
+            storid = self._storid(name)
+            if storid:
+                self._delete(storid, as_object=True)
+                touched.add(storid)
+        for name in diff["classes"]["changed"]:
+            storid = self._storid(name)
+            if storid:
+                self.world.graph.db.execute("DELETE FROM objs WHERE c=? AND s=? AND (p=? OR (p=? AND o=?))",
+                                            (self.onto.graph.c, storid, rdfs_subclassof, rdf_type, owl_class))
+                touched.add(storid)
+
+        for section in ("object_properties", "data_properties"):
+            for name in diff[section]["removed"] | diff[section]["changed"]:
+                names = [name]
+                old_inverse = (diff[section]["old_values"].get(name) or {}).get("inverse_property")
+                if old_inverse:
+                    names.append(old_inverse)
+                for prop_name in names:
+                    storid = self._storid(prop_name)
+                    if not storid:
+                        continue
+                    if name in diff[section]["removed"]:
+                        self._delete(storid, as_predicate=True, as_object=True)
+                    else:
+                        self._delete(storid)
+                        self.world.graph.db.execute("DELETE FROM objs WHERE c=? AND p=? AND o=?",
+                                                    (self.onto.graph.c, owl_inverse_property, storid))
+                        recreated.add(prop_name)
+                    touched.add(storid)
+
+        for name in diff["annotations"]["removed"] | diff["annotations"]["changed"]:
+            storid = self._storid(name)
+            if storid:
+                self._delete(storid, as_predicate=True)
+                touched.add(storid)
+
+        # Drop Owlready2's cached Python objects for everything edited behind its back
+        for storid in touched:
+            self.world._entities.pop(storid, None)
+        return recreated
+
+    def _undo_axioms(self, axioms: Dict[str, Any], ontology_config: Dict[str, Any]) -> None:
+        db = self.world.graph.db
+        context = self.onto.graph.c
+        disjoint = set(axioms.get("disjoint_classes", []))
+        if len(disjoint) > 1:
+            for all_disjoint in list(self.world.disjoint_classes()):
+                if {entity.name for entity in all_disjoint.entities} == disjoint:
+                    all_disjoint.destroy()
+        for eq in axioms.get("equivalent_classes", []):
+            cls, other = self._storid(eq["class"]), self._storid(eq["equivalent_to"][0])
+            if cls and other:
+                db.execute("DELETE FROM objs WHERE c=? AND p=? AND ((s=? AND o=?) OR (s=? AND o=?))",
+                           (context, owl_equivalentclass, cls, other, other, cls))
+        properties = {**ontology_config.get("object_properties", {}), **ontology_config.get("data_properties", {})}
+        for axiom in axioms.get("general_axioms", []):
+            if axiom["axiom_type"] == "TransitiveProperty":
+                for prop_name in axiom["properties"]:
+                    storid = self._storid(prop_name)
+                    if storid and "TransitiveProperty" not in properties.get(prop_name, {}).get("property_type", []):
+                        db.execute("DELETE FROM objs WHERE c=? AND s=? AND p=? AND o=?",
+                                   (context, storid, rdf_type, TransitiveProperty.storid))
+
+    def _create_entities(self, diff: Dict[str, Dict[str, Any]], ontology_config: Dict[str, Any],
+                         config_path: str, streaming: bool, recreated: Set[str]) -> None:
+        def updated(section: str) -> Set[str]:
+            return diff[section]["added"] | diff[section]["changed"]
+
+        self._create_classes(ontology_config["classes"], only=updated("classes"))
+        object_properties = ontology_config.get("object_properties", {})
+        self._create_object_properties({name: object_properties[name] for name in updated("object_properties")})
+        data_properties = ontology_config.get("data_properties", {})
+        self._create_data_properties({name: data_properties[name] for name in updated("data_properties")})
+
+        wanted = updated("individuals")
+        if wanted:
+            # Second pass over the config, keeping only the individuals that are new or changed
+            _, individuals = self._read_config(config_path, streaming)
+            self._create_individuals(self._changed_individuals(individuals, wanted))
+
+        general_axioms = ontology_config.get("general_axioms", [])
+        if diff["axioms"]["changed"]:
+            self._handle_disjoint_classes(ontology_config.get("disjoint_classes", []))
+            self._handle_equivalent_classes(ontology_config.get("equivalent_classes", []))
+            self._handle_general_axioms(general_axioms)
+        else:
+            # Recreated properties lost the characteristics the unchanged general axioms gave them
+            self._handle_general_axioms([{**axiom, "properties": [name for name in axiom["properties"] if name in recreated]}
+                                         for axiom in general_axioms
+                                         if any(name in recreated for name in axiom.get("properties", []))])
+        annotations = ontology_config.get("annotations", {})
+        self._add_annotations({name: annotations[name] for name in updated("annotations")})
+        # Likewise for the values the unchanged annotations gave recreated entities
+        self._add_annotations({name: {target: values for target, values in targets.items() if target in recreated}
+                               for name, targets in annotations.items()
+                               if name not in updated("annotations") and recreated.intersection(targets)})
+
+    def _changed_individuals(self, individuals: Iterable[Dict], wanted: Set[str]) -> Iterator[Dict]:
+        for index, individual in enumerate(individuals):
+            if individual.get("name") in wanted:
+                self._validate_individual(index, individual)
+                yield individual
+
+def update_ontology_from_config(config_path: str, quadstore_path: Optional[str] = None, streaming: Optional[bool] = None,
+                                verification: Optional[str] = None, output_path: Optional[str] = None,
+                                output_format: Optional[str] = None, compress: Optional[bool] = None) -> Dict[str, Dict[str, int]]:
+    updater = OntologyUpdater()
+    return updater.update_ontology_from_config(config_path, quadstore_path=quadstore_path, streaming=streaming,
+                                               verification=verification, output_path=output_path,
+                                               output_format=output_format, compress=compress)
@@ -0,0 +1,196 @@
+import io
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Deque, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+from owlready2 import OwlReadyInconsistentOntologyError
+from modules.config import load_config
+from modules.ontology_processor import BATCH_QUERIES, OntologyProcessor
+
+config = load_config()
+logging.basicConfig(level=config.get('Logging', 'level'), format=config.get('Logging', 'format'))
+logger = logging.getLogger(__name__)
+
+LATENCY_PERCENTILES = (50, 90, 99)
+
+class LatencyTracker:
+    """Keep the most recent request latencies per endpoint and report their percentiles."""
+
+    def __init__(self, window: int = 10000):
+        self.window = window
+        self._latencies: Dict[str, Deque[float]] = defaultdict(lambda: deque(maxlen=self.window))
+        self._counts: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, seconds: float) -> None:
+        with self._lock:
+            self._latencies[endpoint].append(seconds)
+            self._counts[endpoint] += 1
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Request count and latency percentiles in milliseconds, per endpoint."""
+        with self._lock:
+            snapshot = {endpoint: (self._counts[endpoint], sorted(latencies))
+                        for endpoint, latencies in self._latencies.items()}
+        summary = {}
+        for endpoint, (count, latencies) in snapshot.items():
+            stats = {"count": count}
+            for percentile in LATENCY_PERCENTILES:
+                index = min(len(latencies) - 1, int(len(latencies) * percentile / 100))
+                stats[f"p{percentile}_ms"] = round(latencies[index] * 1000, 3)
+            summary[endpoint] = stats
+        return summary
+
+class QueryServer(ThreadingHTTPServer):
+    """
+    HTTP server answering queries against one OntologyProcessor, loaded (and classified)
+    once at startup.
+
+    Requests are accepted on concurrent threads, but the processor is used by one query at a
+    time: an Owlready2 world reads and writes through a single SQLite connection and keeps
+    unsynchronized Python caches of its entities, so queries cannot run in parallel on it.
+    A batch takes the lock for each of its queries, not for the whole body, so single
+    queries are answered between them. Reasoning results are cached by the processor's
+    ReasoningSession, so requests never re-classify an unchanged ontology.
+
+    Endpoints:
+        GET  /query/<type>?class=...&property=...   One query of a type from BATCH_QUERIES.
+        POST /query                                 One query object, as in run_query.
+        POST /batch                                 JSON Lines of queries, answered as JSON Lines.
+        GET  /stats                                 Request counts and latency percentiles.
+        GET  /health                                Liveness check.
+
+    Failed queries answer 400 for an unknown query type or bad arguments, 404 for an entity
+    not in the ontology, 422 if the ontology is inconsistent and 500 for anything else.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, processor: OntologyProcessor, host: str, port: int):
+        super().__init__((host, port), QueryRequestHandler)
+        self.processor = processor
+        self.processor_lock = threading.Lock()
+        self.latencies = LatencyTracker(config.getint('OntologyProcessor', 'latency_window', fallback=10000))
+
+    def answer(self, query: Dict[str, Any]) -> Any:
+        with self.processor_lock:
+            return self.processor.run_query(query)
+
+class QueryRequestHandler(BaseHTTPRequestHandler):
+    server: QueryServer
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/health":
+            self._timed("health", lambda: (200, {"status": "ok"}))
+        elif url.path == "/stats":
+            self._send(200, self.server.latencies.summary())
+        elif url.path.startswith("/query/"):
+            query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            if "properties" in query:
+                query["properties"] = parse_qs(url.query)["properties"]
+            if "include_self" in query:
+                query["include_self"] = query["include_self"].lower() in ("1", "true", "yes")
+            query["query"] = url.path[len("/query/"):]
+            self._timed(query["query"], lambda: self._query(query))
+        else:
+            self._send(404, {"error": f"Unknown endpoint: {url.path}"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode()
+        if url.path == "/query":
+            try:
+                query = json.loads(body)
+            except json.JSONDecodeError as e:
+                self._send(400, {"error": str(e)})
+                return
+            if not isinstance(query, dict):
+                self._send(400, {"error": "Query is not a JSON object"})
+                return
+            self._timed(str(query.get("query")), lambda: self._query(query))
+        elif url.path == "/batch":
+            self._timed("batch", lambda: self._batch(body))
+        else:
+            self._send(404, {"error": f"Unknown endpoint: {url.path}"})
+
+    def _query(self, query: Dict[str, Any]) -> Tuple[int, Any]:
+        try:
+            return 200, {**query, "result": self.server.answer(query)}
+        except (ValueError, TypeError) as e:
+            return 400, {**query, "error": str(e)}
+        except AttributeError as e:
+            return 404, {**query, "error": str(e)}
+        except OwlReadyInconsistentOntologyError:
+            return 422, {**query, "error": "The ontology is inconsistent"}
+
+    def _batch(self, body: str) -> Tuple[int, str]:
+        results = io.StringIO()
+        self.server.processor.run_batch_file(io.StringIO(body), results, self.server.processor_lock)
+        return 200, results.getvalue()
+
+    def _timed(self, endpoint: str, handler) -> None:
+        start = time.perf_counter()
+        try:
+            status, payload = handler()
+        except Exception as e:
+            logger.exception(f"Error answering {endpoint} request")
+            status, payload = 500, {"error": f"Internal error: {e}"}
+        # Unknown query types would otherwise each get their own latency series
+        if endpoint not in BATCH_QUERIES and endpoint not in ("batch", "health"):
+            endpoint = "invalid"
+        self.server.latencies.record(endpoint, time.perf_counter() - start)
+        self._send(status, payload)
+
+    def _send(self, status: int, payload: Any) -> None:
+        if isinstance(payload, str):
+            body, content_type = payload.encode(), "application/x-ndjson"
+        else:
+            body, content_type = json.dumps(payload).encode(), "application/json"
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} - {format % args}")
+
+def serve_ontology(ontology_path: str, host: Optional[str] = None, port: Optional[int] = None,
+                   quadstore_dir: Optional[str] = None) -> None:
+    """
+    Load an ontology once and answer queries over HTTP until interrupted.
+
+    Args:
+        ontology_path (str): Path to the ontology file.
+        host (Optional[str]): Interface to listen on. Defaults to the configured server_host.
+        port (Optional[int]): Port to listen on. Defaults to the configured server_port.
+        quadstore_dir (Optional[str]): Directory of persistent quadstores to load the ontology from.
+    """
+    host = host or config.get('OntologyProcessor', 'server_host', fallback='127.0.0.1')
+    port = port if port is not None else config.getint('OntologyProcessor', 'server_port', fallback=8000)
+    server = QueryServer(OntologyProcessor(ontology_path, quadstore_dir=quadstore_dir), host, port)
+    logger.info(f"Serving {ontology_path} on http://{server.server_address[0]}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        logger.info(f"Request latencies: {server.latencies.summary()}")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve ontology queries over HTTP.")
+    parser.add_argument("ontology", help="Path to the ontology file")
+    parser.add_argument("--host", help="Interface to listen on")
+    parser.add_argument("--port", type=int, help="Port to listen on")
+    parser.add_argument("--quadstore-dir", help="Directory of persistent quadstores to load the ontology from")
+    args = parser.parse_args()
+
+    serve_ontology(args.ontology, host=args.host, port=args.port, quadstore_dir=args.quadstore_dir)
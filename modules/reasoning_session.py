@@ -0,0 +1,394 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Any, ContextManager, Dict, List, Optional, Set, Tuple
+import owlready2
+from owlready2 import (Ontology, World, sync_reasoner, sync_reasoner_pellet, OwlReadyInconsistentOntologyError,
+                       rdf_type, rdfs_subclassof, owl_equivalentclass, owl_imports)
+from modules.config import load_config
+from modules.structural_reasoner import sync_reasoner_structural
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+config = load_config()
+logging.basicConfig(level=config.get('Logging', 'level'), format=config.get('Logging', 'format'))
+logger = logging.getLogger(__name__)
+
+# Relations whose inferred changes are replayed from the cache
+_CACHED_RELATIONS = (rdfs_subclassof, owl_equivalentclass, rdf_type)
+
+REASONER_BACKENDS = ("hermit", "pellet", "structural")
+
+# Backends that run in a JVM subprocess, whose memory shows up under RUSAGE_CHILDREN
+_JVM_BACKENDS = {"hermit", "pellet"}
+
+def _children_max_rss_kb() -> Optional[int]:
+    # The peak RSS of the largest child process waited for so far (kilobytes on Linux)
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+
+def axioms_fingerprint(ontology: Ontology) -> str:
+    """
+    Hash every asserted triple the reasoner sees, independently of storage order and storids.
+
+    HermiT and Pellet are handed the whole world of the ontology, imported and co-loaded
+    ontologies included, and the structural backend reads all of it, so every context is
+    hashed and a change in any of them gives a new fingerprint. Each triple is hashed on the
+    IRIs of its subject, predicate and object, or on the literal and its datatype. Storids
+    depend on what the world held before, so they only stand in for blank nodes, numbered
+    from the world's first blank node. The digests are summed modulo 2**256, so no sort of
+    the quadstore is needed.
+
+    Args:
+        ontology (Ontology): The ontology handed to the reasoner.
+
+    Returns:
+        str: The hexadecimal fingerprint.
+    """
+    db = ontology.world.graph.db
+    # Blank node storids count down from -1, in parse order
+    first_blank = db.execute(
+        """SELECT MAX(b) FROM (SELECT MAX(s) AS b FROM objs WHERE s < 0
+           UNION ALL SELECT MAX(o) FROM objs WHERE o < 0
+           UNION ALL SELECT MAX(s) FROM datas WHERE s < 0)""").fetchone()[0] or 0
+
+    def node(iri: Optional[str], storid: int) -> Any:
+        return iri if iri is not None else storid - first_blank
+
+    total = 0
+    for s_iri, s, p_iri, o_iri, o in db.execute(
+            """SELECT rs.iri, objs.s, rp.iri, ro.iri, objs.o FROM objs
+            LEFT JOIN resources rs ON rs.storid = objs.s
+            LEFT JOIN resources rp ON rp.storid = objs.p
+            LEFT JOIN resources ro ON ro.storid = objs.o"""):
+        triple = (node(s_iri, s), p_iri, node(o_iri, o))
+        total += int.from_bytes(hashlib.sha256(repr(triple).encode()).digest(), "big")
+    for s_iri, s, p_iri, o, d_iri, d in db.execute(
+            """SELECT rs.iri, datas.s, rp.iri, datas.o, rd.iri, datas.d FROM datas
+            LEFT JOIN resources rs ON rs.storid = datas.s
+            LEFT JOIN resources rp ON rp.storid = datas.p
+            LEFT JOIN resources rd ON rd.storid = datas.d"""):
+        triple = (node(s_iri, s), p_iri, o, d_iri if d_iri is not None else d)
+        total += int.from_bytes(hashlib.sha256(repr(triple).encode()).digest(), "big")
+    return format(total % (1 << 256), "064x")
+
+class ReasoningSession:
+    """
+    Classifies an ontology once and reuses the result until the ontology changes.
+
+    Changes are detected with the SQLite change counter of the ontology's quadstore, which
+    moves on every asserted or retracted triple. Inferences written by the reasoner itself
+    are absorbed by recording the counter after each classification.
+
+    With a cache directory, the changes a classification made to the class hierarchy and
+    to class memberships, and the consistency verdict, are also written to disk under a
+    key derived from the asserted axioms of the ontology's world and the reasoner settings. A later process that
+    loads the same ontology replays them instead of running the reasoner.
+    """
+
+    def __init__(self, ontology: Ontology, cache_dir: Optional[str] = None, backend: Optional[str] = None):
+        """
+        Initialize the ReasoningSession.
+
+        Args:
+            ontology (Ontology): The ontology to classify.
+            cache_dir (Optional[str]): Directory of cached reasoner results.
+            backend (Optional[str]): One of "hermit", "pellet" or "structural".
+                Defaults to the reasoner configured under [OntologyProcessor].
+
+        Raises:
+            ValueError: If the backend is unknown.
+        """
+        self.ontology = ontology
+        self.cache_dir = cache_dir or config.get('OntologyProcessor', 'reasoner_cache_dir')
+        self.backend = (backend or config.get('OntologyProcessor', 'reasoner', fallback='hermit')).lower()
+        if self.backend not in REASONER_BACKENDS:
+            raise ValueError(f"Unknown reasoner backend: {self.backend}")
+        self.classified_generation: Optional[int] = None
+        self.consistent: Optional[bool] = None
+        self.runs: List[Dict[str, Any]] = []
+        self._jvm_peak_exact = False
+        # On by default so every run records its memory; tracing slows the structural backend down
+        self.measure_memory = config.getboolean('OntologyProcessor', 'reasoner_measure_memory', fallback=True)
+
+    def _generation(self) -> int:
+        return self.ontology.world.graph.db.total_changes
+
+    @property
+    def dirty(self) -> bool:
+        return self.classified_generation != self._generation()
+
+    def invalidate(self) -> None:
+        self.classified_generation = None
+
+    def settings(self) -> Dict[str, str]:
+        return {"reasoner": self.backend, "infer_property_values": "false", "owlready2": owlready2.VERSION}
+
+    def classify(self, force: bool = False) -> None:
+        """
+        Run the reasoner if the ontology changed since the last classification.
+
+        Args:
+            force (bool): Reason even if the cached classification is current.
+
+        Raises:
+            OwlReadyInconsistentOntologyError: If the ontology is inconsistent, whether this
+                was just found or cached from the last classification.
+        """
+        if force or self.dirty:
+            cache_path = self._cache_path() if self.cache_dir else None
+            start = time.perf_counter()
+            cached = not force and cache_path is not None and os.path.exists(cache_path)
+            peak_kb = None
+            if cached:
+                self._apply_cached(cache_path)
+            else:
+                peak_kb = self._run_reasoner(cache_path)
+            self._record_run(time.perf_counter() - start, cached, peak_kb)
+            self.classified_generation = self._generation()
+        else:
+            logger.debug("Ontology unchanged since last classification, reusing inferences")
+        if not self.consistent:
+            raise OwlReadyInconsistentOntologyError()
+
+    def is_consistent(self) -> bool:
+        try:
+            self.classify()
+            return True
+        except OwlReadyInconsistentOntologyError:
+            return False
+
+    def classify_detached(self, lock: ContextManager, cancelled: Optional[threading.Event] = None) -> bool:
+        """
+        Classify a copy of the world, so that other threads can keep querying the ontology.
+
+        The lock guards the ontology's world against those threads. It is held while the
+        world is serialized and while the inferences are replayed, through the reasoner
+        cache, but not while the reasoner runs. The world is serialized rather than
+        committed and copied, so edits the caller has not saved stay unsaved. If the
+        ontology changed in the meantime, the copy is taken and classified again.
+
+        Args:
+            lock (ContextManager): The lock the other users of the world hold.
+            cancelled (Optional[threading.Event]): If set by the time the reasoner finishes,
+                its inferences are dropped.
+
+        Returns:
+            bool: Whether the ontology is classified; False if the run was cancelled.
+
+        Raises:
+            OwlReadyInconsistentOntologyError: If the ontology is inconsistent.
+        """
+        work_dir = tempfile.mkdtemp(prefix="reasoning-")
+        snapshot_path = os.path.join(work_dir, "snapshot.nt")
+        copy_world = None
+        try:
+            with lock:
+                if not self.dirty:
+                    self.classify()
+                    return True
+                generation = self._generation()
+                # Imports are left out, as for HermiT: the imported triples are in the world
+                # already, and the copy must not fetch them again
+                with open(snapshot_path, 'wb') as f:
+                    self.ontology.world.save(f, format="ntriples", filter=lambda graph, s, p, o, d: p != owl_imports)
+            start = time.perf_counter()
+            copy_world = World(filename=os.path.join(work_dir, "snapshot.sqlite3"))
+            with open(snapshot_path, 'rb') as f:
+                copy_ontology = copy_world.get_ontology(self.ontology.base_iri).load(fileobj=f, format="ntriples")
+            copy = ReasoningSession(copy_ontology, cache_dir=self.cache_dir or work_dir, backend=self.backend)
+            copy.measure_memory = self.measure_memory
+            cache_path = copy._cache_path()
+            cached = os.path.exists(cache_path)
+            peak_kb = None if cached else copy._run_reasoner(cache_path)
+            self._jvm_peak_exact = copy._jvm_peak_exact
+            if cancelled is not None and cancelled.is_set():
+                logger.info("Classification cancelled, dropping its inferences")
+                return False
+            with lock:
+                if self._generation() == generation:
+                    self._apply_cached(cache_path)
+                    self._record_run(time.perf_counter() - start, cached, peak_kb)
+                    self.classified_generation = self._generation()
+        finally:
+            if copy_world is not None:
+                copy_world.close()
+            shutil.rmtree(work_dir, ignore_errors=True)
+        if self.classified_generation != self._generation():
+            logger.info("Ontology changed during classification, classifying it again")
+            return self.classify_detached(lock, cancelled)
+        if not self.consistent:
+            raise OwlReadyInconsistentOntologyError()
+        return True
+
+    def _run_reasoner(self, cache_path: Optional[str]) -> Optional[int]:
+        # Returns the run's peak memory in KB when measure_memory is set, see _record_run
+        before = self._relation_snapshot() if cache_path else None
+        if self.backend == "pellet":
+            reasoner = sync_reasoner_pellet
+        elif self.backend == "structural":
+            reasoner = sync_reasoner_structural
+        else:
+            reasoner = sync_reasoner
+        jvm = self.backend in _JVM_BACKENDS
+        measure_python = self.measure_memory and not jvm
+        children_before = _children_max_rss_kb() if self.measure_memory and jvm else None
+        started_tracing = measure_python and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        if measure_python:
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        try:
+            reasoner(self.ontology)
+            self.consistent = True
+            logger.info(f"Classified ontology with {self.backend}")
+        except OwlReadyInconsistentOntologyError:
+            self.consistent = False
+            logger.info(f"Classified ontology with {self.backend}, it is inconsistent")
+        finally:
+            peak_kb = None
+            if measure_python:
+                peak_kb = (tracemalloc.get_traced_memory()[1] - baseline) // 1024
+                if started_tracing:
+                    tracemalloc.stop()
+            elif children_before is not None:
+                # RUSAGE_CHILDREN keeps the largest child's peak: it is this run's JVM peak if
+                # that JVM is the largest child so far, and an upper bound of it otherwise
+                peak_kb = _children_max_rss_kb()
+                self._jvm_peak_exact = peak_kb > children_before
+        if cache_path:
+            after = self._relation_snapshot()
+            self._write_cache(cache_path, sorted(after - before), sorted(before - after))
+        return peak_kb
+
+    def _record_run(self, seconds: float, cached: bool, peak_kb: Optional[int] = None) -> None:
+        # peak_kb is the JVM's peak RSS for hermit and pellet ("jvm_max_rss_bound" when an
+        # earlier, larger child process hides it), and the peak of the Python allocations made
+        # during the run (tracemalloc) for structural
+        if peak_kb is None:
+            memory_measure = None
+        elif self.backend not in _JVM_BACKENDS:
+            memory_measure = "python_allocations"
+        else:
+            memory_measure = "jvm_max_rss" if self._jvm_peak_exact else "jvm_max_rss_bound"
+        run = {
+            "backend": self.backend,
+            "seconds": seconds,
+            "peak_kb": peak_kb,
+            "memory_measure": memory_measure,
+            "cached": cached,
+            "consistent": self.consistent,
+        }
+        self.runs.append(run)
+        memory = f", peak {run['memory_measure']} {peak_kb} KB" if peak_kb is not None else ""
+        logger.info(f"Reasoning with {self.backend} took {seconds:.3f}s{memory}{', from cache' if cached else ''}")
+
+    def _cache_path(self) -> str:
+        settings = json.dumps(self.settings(), sort_keys=True)
+        key = hashlib.sha256(f"{axioms_fingerprint(self.ontology)}\n{settings}".encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _relation_snapshot(self) -> Set[Tuple[int, int, int]]:
+        placeholders = ",".join("?" * len(_CACHED_RELATIONS))
+        return set(self.ontology.world.graph.db.execute(
+            f"SELECT s, p, o FROM objs WHERE p IN ({placeholders}) AND s > 0 AND o > 0", _CACHED_RELATIONS))
+
+    def _write_cache(self, cache_path: str, added: List[Tuple[int, int, int]], removed: List[Tuple[int, int, int]]) -> None:
+        unabbreviate = self.ontology.world._unabbreviate
+        entry = {
+            "settings": self.settings(),
+            "consistent": self.consistent,
+            "added": [[unabbreviate(s), unabbreviate(p), unabbreviate(o)] for s, p, o in added],
+            "removed": [[unabbreviate(s), unabbreviate(p), unabbreviate(o)] for s, p, o in removed],
+        }
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = cache_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, cache_path)
+        logger.info(f"Cached reasoner results in {cache_path}")
+
+    def _apply_cached(self, cache_path: str) -> None:
+        with open(cache_path, 'r') as f:
+            entry = json.load(f)
+        world = self.ontology.world
+        with self.ontology:
+            for s, p, o in entry["added"]:
+                subject, target = world[s], world[o]
+                if p == world._unabbreviate(owl_equivalentclass):
+                    if target not in subject.equivalent_to:
+                        subject.equivalent_to.append(target)
+                elif target not in subject.is_a:
+                    subject.is_a.append(target)
+            for s, p, o in entry["removed"]:
+                subject, target = world[s], world[o]
+                if p == world._unabbreviate(owl_equivalentclass):
+                    if target in subject.equivalent_to:
+                        subject.equivalent_to.remove(target)
+                elif target in subject.is_a:
+                    subject.is_a.remove(target)
+        self.consistent = entry["consistent"]
+        logger.info(f"Applied cached reasoner results from {cache_path}")
+
+def _compare_one(ontology_path: str, backend: str) -> Dict[str, Any]:
+    ontology = World().get_ontology(ontology_path).load()
+    session = ReasoningSession(ontology, backend=backend)
+    session.cache_dir = None
+    session.measure_memory = True
+    before = session._relation_snapshot()
+    try:
+        session.classify()
+    except OwlReadyInconsistentOntologyError:
+        pass
+    after = session._relation_snapshot()
+    ontology.world.close()
+    return dict(session.runs[-1], added=len(after - before), removed=len(before - after))
+
+def compare_reasoners(ontology_path: str, backends: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Classify the same ontology with several backends, each in a fresh worker process.
+
+    A worker of its own gives each backend a clean slate for its memory figure: peak_kb is
+    the JVM's peak RSS for hermit and pellet (the worker's only child process), and the peak
+    of the Python allocations made while classifying for structural, which runs in the
+    worker itself; tracing those allocations slows the structural run down. Loading the
+    ontology is not counted.
+
+    Args:
+        ontology_path (str): Path to the ontology file.
+        backends (Optional[List[str]]): Backends to compare. Defaults to all of them.
+
+    Returns:
+        List[Dict[str, Any]]: One timing and memory record per backend, with the number of
+            subclass, equivalence and type triples the classification added and removed.
+    """
+    results = []
+    for backend in backends or list(REASONER_BACKENDS):
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as worker:
+            results.append(worker.submit(_compare_one, ontology_path, backend).result())
+    return results
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare reasoner backends on an ontology.")
+    parser.add_argument("ontology", help="Path to the ontology file")
+    parser.add_argument("--backends", nargs="+", choices=list(REASONER_BACKENDS), help="Backends to compare")
+    args = parser.parse_args()
+
+    for result in compare_reasoners(args.ontology, args.backends):
+        print(f"{result['backend']}: {result['seconds']:.3f}s, peak {result['memory_measure']} {result['peak_kb']} KB, "
+              f"consistent={result['consistent']}, +{result['added']}/-{result['removed']} inferred triples")
@@ -0,0 +1,208 @@
+import json
+import logging
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Collection, Dict, Iterable, List, Optional, Tuple
+from modules.config import load_config
+from modules.config_stream import stream_ontology_config
+from modules.ontology_creator import OntologyCreator
+from modules.ontology_output import HashingWriter, OUTPUT_FORMATS, default_output_path, open_output, verify_output
+
+config = load_config()
+logging.basicConfig(level=config.get('Logging', 'level'), format=config.get('Logging', 'format'))
+logger = logging.getLogger(__name__)
+
+SHARD_MERGE_MODES = ("concat", "imports")
+
+# Sections every shard needs to resolve classes and properties of its individuals
+_SHARD_SECTIONS = ("classes", "object_properties", "data_properties")
+
+def partition_individuals(individuals: Iterable[Dict[str, Any]], directory: str, shards: int,
+                          tracked: Collection[str] = ()) -> Tuple[List[str], Dict[str, int]]:
+    """
+    Deal individuals round-robin into JSON Lines shard files.
+
+    Args:
+        individuals (Iterable[Dict[str, Any]]): The individuals, read lazily.
+        directory (str): Directory of the shard files.
+        shards (int): Number of shards.
+        tracked (Collection[str]): Names of individuals whose shard is reported.
+
+    Returns:
+        Tuple[List[str], Dict[str, int]]: The paths of the shard files, and the shard of each
+            tracked individual that was dealt.
+    """
+    paths = [os.path.join(directory, f"individuals-{shard}.jsonl") for shard in range(shards)]
+    files = [open(path, 'w') for path in paths]
+    placed = {}
+    try:
+        for position, individual in enumerate(individuals):
+            files[position % shards].write(json.dumps(individual) + "\n")
+            if individual["name"] in tracked:
+                placed[individual["name"]] = position % shards
+    finally:
+        for f in files:
+            f.close()
+    return paths, placed
+
+def _split_annotations(annotations: Dict[str, Dict[str, List]], placed: Dict[str, int],
+                       shards: int) -> Tuple[Dict[str, Dict[str, List]], List[Dict[str, Dict[str, List]]]]:
+    # Annotations on individuals go to the shard holding the individual, the others to the
+    # main ontology
+    main = {}
+    per_shard = [{} for _ in range(shards)]
+    for annotation, targets in annotations.items():
+        for target, values in targets.items():
+            destination = per_shard[placed[target]] if target in placed else main
+            destination.setdefault(annotation, {})[target] = values
+    return main, per_shard
+
+def _write_config(path: str, ontology_config: Dict[str, Any]) -> str:
+    with open(path, 'w') as f:
+        json.dump(ontology_config, f)
+    return path
+
+def _build_shard(config_path: str, output_path: str, output_format: str) -> Dict[str, Any]:
+    # Runs in a worker process, each with its own World
+    creator = OntologyCreator()
+    # Individuals may refer to individuals dealt into other shards
+    creator.check_object_targets = False
+    creator.create_ontology_from_config(config_path, streaming=False, verification="none",
+                                        output_path=output_path, output_format=output_format, compress=False)
+    return creator.manifest
+
+def _shard_iri(ontology_iri: str, file_name: str) -> str:
+    # The last IRI segment is the file name, so Owlready2 finds imported shards on onto_path
+    return ontology_iri.rstrip("#/").rsplit("/", 1)[0] + "/" + file_name
+
+def create_sharded_ontology(config_path: str, shards: Optional[int] = None, workers: Optional[int] = None,
+                            merge: Optional[str] = None, output_path: Optional[str] = None,
+                            output_format: str = "ntriples", compress: bool = False,
+                            verification: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Build an ontology from a config by creating its individuals in parallel shards.
+
+    The individuals are dealt into shards, and each shard is created in a separate process
+    with its own World, holding the classes and properties of the config and the shard's
+    individuals. The axioms and annotations are created once, in a main ontology without
+    individuals, except for annotations on individuals, which are created in the shard of
+    the individual. The result is either:
+
+    - "concat": a single N-Triples file, the main ontology followed by the shard triples
+      that are not already in it;
+    - "imports": the main ontology with an owl:imports of each shard, written next to it
+      as ``<output name>-shard<i><extension>`` and named so Owlready2 finds them on onto_path.
+
+    Args:
+        config_path (str): Path to the configuration JSON file.
+        shards (Optional[int]): Number of shards. Defaults to the number of workers.
+        workers (Optional[int]): Number of worker processes. Defaults to the CPU count.
+        merge (Optional[str]): "concat" or "imports". Defaults to the configured shard_merge.
+        output_path (Optional[str]): Path of the (main) output file.
+        output_format (str): "ntriples", or "rdfxml" with the imports merge.
+        compress (bool): Gzip the merged output. Only supported with the concat merge.
+        verification (Optional[str]): Verification mode of the (main) output file.
+
+    Returns:
+        Dict[str, Any]: The manifest of the (main) output file, with the shard manifests
+            under "shards". With the concat merge, the shard files are deleted, so their
+            manifests have no path.
+
+    Raises:
+        ValueError: If the merge mode, output format or compression is not supported.
+        FileNotFoundError: If the configuration file is not found.
+        json.JSONDecodeError: If the configuration file is not valid JSON.
+        jsonschema.exceptions.ValidationError: If the configuration is invalid.
+    """
+    workers = workers or config.getint('OntologyCreator', 'workers', fallback=os.cpu_count() or 1)
+    shards = shards or config.getint('OntologyCreator', 'shards', fallback=workers)
+    merge = merge or config.get('OntologyCreator', 'shard_merge', fallback='concat')
+    if verification is None:
+        verification = config.get('OntologyCreator', 'verification', fallback='cheap')
+    if merge not in SHARD_MERGE_MODES:
+        raise ValueError(f"Unknown shard merge mode: {merge}")
+    if output_format not in ("ntriples", "rdfxml") or (merge == "concat" and output_format != "ntriples"):
+        raise ValueError(f"The {merge} merge does not support the {output_format} format")
+    if compress and merge == "imports":
+        raise ValueError("Imported shards cannot be compressed")
+
+    sections, individuals = stream_ontology_config(config_path)
+    OntologyCreator().validate_config(sections)
+
+    if output_path is None:
+        output_path = default_output_path(config.get('General', 'output_dir'), output_format, compress)
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(output_dir, exist_ok=True)
+    stem = os.path.basename(output_path).split(".", 1)[0]
+    extension = OUTPUT_FORMATS[output_format]
+    start = time.perf_counter()
+
+    with tempfile.TemporaryDirectory(dir=output_dir) as work_dir:
+        annotations = sections.get("annotations", {})
+        individual_paths, placed = partition_individuals(
+            individuals, work_dir, shards, {target for targets in annotations.values() for target in targets})
+        main_annotations, shard_annotations = _split_annotations(annotations, placed, shards)
+        shard_configs, shard_outputs = [], []
+        for shard, individuals_path in enumerate(individual_paths):
+            shard_config = {key: sections[key] for key in _SHARD_SECTIONS if key in sections}
+            shard_config["ontology_iri"] = sections["ontology_iri"]
+            if shard_annotations[shard]:
+                shard_config["annotations"] = shard_annotations[shard]
+            shard_config["individuals_file"] = os.path.basename(individuals_path)
+            if merge == "imports":
+                file_name = f"{stem}-shard{shard}{extension}"
+                shard_config["ontology_iri"] = _shard_iri(sections["ontology_iri"], file_name)
+                shard_config["namespace_iri"] = sections["ontology_iri"]
+                shard_outputs.append(os.path.join(output_dir, file_name))
+            else:
+                shard_outputs.append(os.path.join(work_dir, f"shard-{shard}.nt"))
+            shard_configs.append(_write_config(os.path.join(work_dir, f"shard-{shard}.json"), shard_config))
+
+        main_config = {key: value for key, value in sections.items() if key != "individuals_file"}
+        main_config["annotations"] = main_annotations
+        if merge == "imports":
+            main_config["imports"] = sections.get("imports", []) + [_shard_iri(sections["ontology_iri"], os.path.basename(path))
+                                                                    for path in shard_outputs]
+            main_path = output_path
+        else:
+            main_path = os.path.join(work_dir, "main.nt")
+        main_config_path = _write_config(os.path.join(work_dir, "main.json"), main_config)
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_build_shard, shard_config, shard_output, output_format)
+                       for shard_config, shard_output in zip(shard_configs, shard_outputs)]
+            main_manifest = _build_shard(main_config_path, main_path, output_format)
+            shard_manifests = [future.result() for future in futures]
+        logger.info(f"Built {shards} shards with {workers} workers in {time.perf_counter() - start:.2f}s")
+
+        if merge == "imports":
+            manifest = main_manifest
+        else:
+            manifest = _concatenate(main_path, [m.pop("path") for m in shard_manifests], output_path, compress)
+            manifest["ontology_iri"] = main_manifest["ontology_iri"]
+
+    manifest["shards"] = shard_manifests
+    logger.info(f"Sharded ontology saved to {output_path} in {time.perf_counter() - start:.2f}s")
+    verify_output(manifest, verification)
+    return manifest
+
+def _concatenate(main_path: str, shard_paths: List[str], output_path: str, compress: bool) -> Dict[str, Any]:
+    # Shards repeat the class and property declarations of the main ontology, and hold no
+    # blank nodes, so their duplicates can be dropped by exact line comparison.
+    with open(main_path, 'rb') as f:
+        main_lines = f.readlines()
+    seen = set(main_lines)
+    with open_output(output_path, 'wb', compress) as f:
+        writer = HashingWriter(f)
+        for line in main_lines:
+            writer.write(line)
+        for shard_path in shard_paths:
+            with open(shard_path, 'rb') as shard:
+                for line in shard:
+                    if line not in seen:
+                        writer.write(line)
+        writer.flush()
+    return {"path": output_path, "format": "ntriples", "compressed": compress,
+            "sha256": writer.sha256.hexdigest(), "size": writer.size, "lines": writer.lines, "triples": writer.lines}
@@ -0,0 +1,85 @@
+import logging
+from typing import Dict, Set
+from owlready2 import (Ontology, Thing, Nothing, ThingClass, OwlReadyInconsistentOntologyError,
+                       rdf_type, owl_named_individual)
+from modules.config import load_config
+from modules.class_hierarchy import ClassHierarchyIndex
+
+config = load_config()
+logging.basicConfig(level=config.get('Logging', 'level'), format=config.get('Logging', 'format'))
+logger = logging.getLogger(__name__)
+
+def sync_reasoner_structural(ontology: Ontology) -> None:
+    """
+    Classify an ontology in-process from its named class axioms, without a JVM.
+
+    The reasoner covers subclass and equivalence closure and disjointness:
+
+    - classes that subsume each other (through owl:equivalentClass or subclass cycles)
+      inherit each other's most specific named parents;
+    - classes below two members of the same disjointness axiom are made equivalent to
+      owl:Nothing;
+    - an individual whose asserted types fall below two disjoint classes makes the
+      ontology inconsistent.
+
+    Class expressions (restrictions, unions, complements) are not interpreted; use
+    HermiT or Pellet when those matter.
+
+    Args:
+        ontology (Ontology): The ontology to classify. Inferences are asserted in it, unless
+            it is inconsistent.
+
+    Raises:
+        OwlReadyInconsistentOntologyError: If an individual belongs to disjoint classes.
+    """
+    world = ontology.world
+    index = ClassHierarchyIndex(ontology)
+
+    disjoint_sets = []
+    for disjoint in world.disjoint_classes():
+        storids = {entity.storid for entity in disjoint.entities
+                   if isinstance(entity, ThingClass) and entity.storid in index}
+        if len(storids) > 1:
+            disjoint_sets.append(storids)
+
+    unsatisfiable: Set[int] = set()
+    for storids in disjoint_sets:
+        seen: Dict[int, int] = {}
+        for storid in storids:
+            for descendant in index.descendants(storid):
+                seen[descendant] = seen.get(descendant, 0) + 1
+        unsatisfiable.update(descendant for descendant, count in seen.items() if count > 1)
+
+    # Like HermiT, leave the ontology untouched when it is inconsistent
+    individuals = {s for (s,) in world.graph.db.execute(
+        "SELECT s FROM objs WHERE p=? AND o=? AND s > 0", (rdf_type, owl_named_individual))}
+    types: Dict[int, Set[int]] = {}
+    for s, o in world.graph.db.execute("SELECT s, o FROM objs WHERE p=? AND s > 0 AND o > 0", (rdf_type,)):
+        if s in individuals and o in index:
+            types.setdefault(s, set()).update(index.ancestors(o))
+    for individual, ancestors in types.items():
+        if ancestors & unsatisfiable or any(len(ancestors & storids) > 1 for storids in disjoint_sets):
+            logger.info(f"Individual {world._unabbreviate(individual)} belongs to disjoint classes")
+            raise OwlReadyInconsistentOntologyError()
+
+    with ontology:
+        for members in index.equivalence_groups():
+            group = set(members)
+            shared = {parent for member in members for parent in index.parents(member) if parent not in group}
+            shared = {parent for parent in shared
+                      if not any(other != parent and index.is_subclass_of(other, parent) for other in shared)}
+            for member in members:
+                cls = world._get_by_storid(member)
+                new_parents = [world._get_by_storid(parent) for parent in sorted(shared)]
+                new_parents = [parent for parent in new_parents if parent not in cls.is_a]
+                if new_parents:
+                    kept = [parent for parent in cls.is_a if parent is not Thing]
+                    cls.is_a.reinit(kept + new_parents)
+                    logger.debug(f"Reparented {cls} under {new_parents}")
+
+        for storid in unsatisfiable:
+            cls = world._get_by_storid(storid)
+            if Nothing not in cls.equivalent_to:
+                cls.equivalent_to.append(Nothing)
+        if unsatisfiable:
+            logger.info(f"Found {len(unsatisfiable)} unsatisfiable classes")
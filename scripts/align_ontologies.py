@@ -1,6 +1,7 @@
 import argparse
 import logging
 from modules.config import load_config
+from modules.alignment_io import ALIGNMENT_FORMATS
 from modules.ontology_aligner import OntologyAligner
 
 config = load_config()
@@ -12,12 +13,26 @@ def main():
     parser.add_argument("ontology1", help="Path to the first ontology file")
     parser.add_argument("ontology2", help="Path to the second ontology file")
     parser.add_argument("--output", default="alignment_results.txt", help="Path to save alignment results")
+    parser.add_argument("--reference", help="Reference alignment to measure candidate recall against, instead of aligning")
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 5, 10, 20, 50, 100],
+                        help="Numbers of candidates per class to measure recall at")
+    parser.add_argument("--previous", help="Previous alignment to update incrementally")
+    parser.add_argument("--old-ontology1", help="Previous release of the first ontology (with --previous)")
+    parser.add_argument("--old-ontology2", help="Previous release of the second ontology (with --previous)")
+    parser.add_argument("--format", choices=ALIGNMENT_FORMATS, help="Output format, by default from the output file name")
     args = parser.parse_args()
 
     try:
         aligner = OntologyAligner(args.ontology1, args.ontology2)
-        alignment = aligner.align_ontologies()
-        aligner.save_alignment(alignment, args.output)
+        if args.reference:
+            for k, recall in aligner.evaluate_candidates(args.reference, args.k).items():
+                print(f"Recall at {k}: {recall:.4f}")
+            return
+        if args.previous:
+            alignment = aligner.realign(args.previous, args.old_ontology1, args.old_ontology2)
+        else:
+            alignment = aligner.iter_alignment()
+        aligner.save_alignment(alignment, args.output, args.format)
         logger.info(f"Alignment completed. Results saved to {args.output}")
     except Exception as e:
         logger.error(f"An error occurred while aligning ontologies: {str(e)}")
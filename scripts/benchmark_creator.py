@@ -0,0 +1,65 @@
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+from modules.config import load_config
+from modules.ontology_creator import OntologyCreator
+
+config = load_config()
+logging.basicConfig(level=config.get('Logging', 'level'), format=config.get('Logging', 'format'))
+logger = logging.getLogger(__name__)
+
+def write_synthetic_config(directory: str, num_individuals: int, num_classes: int) -> str:
+    """Write a config with a flat class list and individuals carrying data and object property values."""
+    classes = {"Entity": "Thing"}
+    classes.update({f"Class{i}": "Entity" for i in range(num_classes)})
+    ontology_config = {
+        "ontology_iri": "http://example.org/benchmark.owl",
+        "classes": classes,
+        "object_properties": {"relatedTo": {"domain": ["Entity"], "range": ["Entity"]}},
+        "data_properties": {
+            "hasIndex": {"domain": ["Entity"], "range": ["int"], "property_type": ["FunctionalProperty"]},
+            "hasLabel": {"domain": ["Entity"], "range": ["str"]}
+        },
+        "individuals_file": "individuals.jsonl"
+    }
+    with open(os.path.join(directory, "individuals.jsonl"), 'w') as f:
+        for i in range(num_individuals):
+            individual = {
+                "name": f"individual{i}",
+                "class": f"Class{i % num_classes}",
+                "attributes": {
+                    "hasIndex": [i],
+                    "hasLabel": [f"Individual {i}", f"Alias {i}"],
+                    "relatedTo": [f"individual{(i + 1) % num_individuals}"]
+                }
+            }
+            f.write(json.dumps(individual) + "\n")
+    config_path = os.path.join(directory, "benchmark_config.json")
+    with open(config_path, 'w') as f:
+        json.dump(ontology_config, f)
+    return config_path
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure ontology creation throughput on a synthetic config.")
+    parser.add_argument("--individuals", type=int, default=100000, help="Number of individuals to create")
+    parser.add_argument("--classes", type=int, default=100, help="Number of classes the individuals are spread over")
+    parser.add_argument("--format", choices=["rdfxml", "ntriples", "sqlite"], default="ntriples", help="Output serialization")
+    parser.add_argument("--stream", action="store_true", help="Stream individuals into a disk-backed quadstore")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        config_path = write_synthetic_config(directory, args.individuals, args.classes)
+        creator = OntologyCreator()
+        start = time.perf_counter()
+        creator.create_ontology_from_config(config_path, streaming=args.stream, verification="none",
+                                            output_path=os.path.join(directory, "benchmark_output"),
+                                            output_format=args.format)
+        seconds = time.perf_counter() - start
+    print(f"Created {args.individuals} individuals in {seconds:.2f}s ({args.individuals / seconds:.0f} individuals/s), "
+          f"{creator.manifest['triples']} triples")
+
+if __name__ == "__main__":
+    main()
@@ -10,13 +10,19 @@ logger = logging.getLogger(__name__)
 def main():
     parser = argparse.ArgumentParser(description="Create an ontology from a configuration file.")
     parser.add_argument("config", help="Path to the ontology configuration JSON file")
-    parser.add_argument("--output", help="Path to save the created ontology", 
-                        default=config.get('General', 'output_dir'))
+    parser.add_argument("--output", help="Path to save the created ontology")
+    parser.add_argument("--format", choices=["rdfxml", "ntriples", "sqlite"], help="Output serialization")
+    parser.add_argument("--gzip", action="store_true", default=None, help="Gzip-compress the output file")
+    parser.add_argument("--stream", action="store_true", default=None,
+                        help="Stream individuals into a disk-backed quadstore with periodic commits")
+    parser.add_argument("--verify", choices=["none", "cheap", "full"],
+                        help="Check the written file: not at all, by checksum and triple count, or by reparsing it")
     args = parser.parse_args()
 
     try:
-        create_ontology_from_config(args.config)
-        logger.info(f"Ontology created and saved to {args.output}")
+        create_ontology_from_config(args.config, streaming=args.stream, verification=args.verify,
+                                    output_path=args.output, output_format=args.format, compress=args.gzip)
+        logger.info(f"Ontology created and saved to {args.output or config.get('General', 'output_dir')}")
     except Exception as e:
         logger.error(f"An error occurred while creating the ontology: {str(e)}")
 
@@ -1,5 +1,7 @@
 import argparse
 import logging
+import sys
+from contextlib import nullcontext
 from modules.config import load_config
 from modules.ontology_processor import OntologyProcessor
 
@@ -13,10 +15,20 @@ def main():
     parser.add_argument("--concept", help="Concept name for reasoning")
     parser.add_argument("--class", dest="class_name", help="Class name for subclass or individual queries")
     parser.add_argument("--query", choices=["subclasses", "individuals"], help="Type of query to perform")
+    parser.add_argument("--quadstore-dir", help="Directory of persistent quadstores to load the ontology from")
+    parser.add_argument("--batch", help="JSON Lines file of queries to answer, or - for stdin")
+    parser.add_argument("--output", help="JSON Lines file for the batch results; defaults to stdout")
     args = parser.parse_args()
 
     try:
-        processor = OntologyProcessor(args.ontology)
+        processor = OntologyProcessor(args.ontology, quadstore_dir=args.quadstore_dir)
+
+        if args.batch:
+            # The standard streams are left open for the rest of the program
+            with open(args.batch) if args.batch != "-" else nullcontext(sys.stdin) as queries, \
+                    open(args.output, 'w') if args.output else nullcontext(sys.stdout) as results:
+                processor.run_batch_file(queries, results)
+            return
 
         if args.concept:
             inferred_subsumers = processor.perform_reasoning(args.concept)
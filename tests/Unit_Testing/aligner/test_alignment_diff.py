@@ -0,0 +1,112 @@
+import pytest
+from owlready2 import *
+from modules.alignment_diff import class_fingerprints, diff_classes, merge_alignments, read_alignment
+from modules.ontology_aligner import OntologyAligner
+
+ONTOLOGY_IRI = "http://example.org/release.owl#"
+
+def release(changes):
+    world = World()
+    onto = world.get_ontology(ONTOLOGY_IRI)
+    with onto:
+        class Organ(Thing): pass
+        class Heart(Organ): pass
+        class Kidney(Organ):
+            label = ["kidney"]
+        class Lung(Organ): pass
+        changes(onto)
+    return onto
+
+def test_diff_classes():
+    old = release(lambda onto: None)
+
+    def changes(onto):
+        onto.Kidney.label = ["kidney", "renal organ"]
+        destroy_entity(onto.Lung)
+        types.new_class("Liver", (onto.Organ,))
+        onto.Heart.is_a = [Thing]
+
+    new = release(changes)
+    diff = diff_classes(old, new)
+    assert diff["added"] == {ONTOLOGY_IRI + "Liver"}
+    assert diff["removed"] == {ONTOLOGY_IRI + "Lung"}
+    assert diff["changed"] == {ONTOLOGY_IRI + "Kidney", ONTOLOGY_IRI + "Heart"}
+
+def test_unchanged_release_has_same_fingerprints():
+    assert class_fingerprints(release(lambda onto: None)) == class_fingerprints(release(lambda onto: None))
+
+def test_read_alignment(tmp_path):
+    path = tmp_path / "alignment.txt"
+    path.write_text("http://a#X <-> http://b#Y: 0.91\n\nhttp://a#Z <-> http://b#W: 0.5\n")
+    assert read_alignment(str(path)) == [("http://a#X", "http://b#Y", 0.91), ("http://a#Z", "http://b#W", 0.5)]
+
+def test_merge_alignments():
+    previous = [("a#1", "b#1", 0.9), ("a#2", "b#2", 0.8), ("a#3", "b#3", 0.7), ("a#4", "b#4", 0.95)]
+    rescored = [("a#2", "b#5", 0.85), ("a#3", "b#6", 0.6), ("a#4", "b#7", 0.9), ("a#1", "b#1", 0.8)]
+    merged = merge_alignments(previous, rescored, stale_sources={"a#2"}, stale_targets={"b#3"})
+    assert merged == [("a#1", "b#1", 0.8), ("a#2", "b#5", 0.85), ("a#3", "b#6", 0.6),
+                      ("a#4", "b#4", 0.95), ("a#4", "b#7", 0.9)]
+    best = merge_alignments(previous, rescored, stale_sources={"a#2"}, stale_targets={"b#3"}, one_per_source=True)
+    assert best == [("a#1", "b#1", 0.8), ("a#2", "b#5", 0.85), ("a#3", "b#6", 0.6), ("a#4", "b#4", 0.95)]
+
+SOURCE_IRI = "http://example.org/realign-source.owl#"
+TARGET_IRI = "http://example.org/realign-target.owl#"
+
+def save_release(path, base_iri, classes):
+    world = World()
+    onto = world.get_ontology(base_iri)
+    with onto:
+        for name, labels in classes.items():
+            types.new_class(name, (Thing,)).label = labels
+    onto.save(file=str(path))
+    return str(path)
+
+class NameMatchingBERTMap:
+    """Stands in for BERTMap, scoring classes with the same local name 0.95 and others 0.2."""
+
+    def __init__(self):
+        self.scored = []
+
+    def align(self, ontology1, ontology2, candidates=None):
+        self.scored.extend(candidates)
+        return [(s, t, 0.95 if s.split("#")[1] == t.split("#")[1] else 0.2) for s, t in candidates]
+
+def test_realign_rescores_only_stale_classes(tmp_path, monkeypatch):
+    monkeypatch.setattr("modules.ontology_aligner.BERTMap", NameMatchingBERTMap)
+    classes = {"Heart": ["heart"], "Kidney": ["kidney"], "Lung": ["lung"], "Liver": ["liver"]}
+    old_source = save_release(tmp_path / "old_source.owl", SOURCE_IRI, classes)
+    old_target = save_release(tmp_path / "old_target.owl", TARGET_IRI, classes)
+    # Kidney changes and Spleen is added on the source side, Lung changes and Spleen is added on the target side
+    new_source = save_release(tmp_path / "new_source.owl", SOURCE_IRI,
+                              {**classes, "Kidney": ["kidney", "renal organ"], "Spleen": ["spleen"]})
+    new_target = save_release(tmp_path / "new_target.owl", TARGET_IRI,
+                              {**classes, "Lung": ["lung", "pulmo"], "Spleen": ["spleen"]})
+    previous = tmp_path / "previous.txt"
+    previous.write_text("".join(f"{SOURCE_IRI}{name} <-> {TARGET_IRI}{name}: {score}\n" for name, score in
+                                (("Heart", 0.8), ("Kidney", 0.85), ("Lung", 0.9), ("Liver", 0.75))))
+
+    aligner = OntologyAligner(new_source, new_target)
+    alignment = aligner.realign(str(previous), old_source, old_target)
+
+    assert alignment == [(SOURCE_IRI + name, TARGET_IRI + name, score) for name, score in
+                         (("Heart", 0.8), ("Kidney", 0.95), ("Liver", 0.75), ("Lung", 0.95), ("Spleen", 0.95))]
+    scored = aligner.bertmap.bertmap.scored
+    # The added, changed and orphaned source classes are rescored, the unchanged mappings carried over
+    assert {s for s, _ in scored} == {SOURCE_IRI + "Kidney", SOURCE_IRI + "Spleen", SOURCE_IRI + "Lung"}
+    assert {t for _, t in scored} >= {TARGET_IRI + "Kidney", TARGET_IRI + "Spleen", TARGET_IRI + "Lung"}
+
+class AllPairsBERTMap(NameMatchingBERTMap):
+    def align(self, ontology1, ontology2):
+        raise AssertionError("realign must not score every pair")
+
+def test_realign_refuses_backend_without_candidates(tmp_path, monkeypatch):
+    monkeypatch.setattr("modules.ontology_aligner.BERTMap", AllPairsBERTMap)
+    classes = {"Heart": ["heart"]}
+    source = save_release(tmp_path / "source.owl", SOURCE_IRI, classes)
+    target = save_release(tmp_path / "target.owl", TARGET_IRI, classes)
+    previous = tmp_path / "previous.txt"
+    previous.write_text(f"{SOURCE_IRI}Heart <-> {TARGET_IRI}Heart: 0.8\n")
+
+    aligner = OntologyAligner(source, target)
+    with pytest.raises(ValueError, match="rescore only the changed classes"):
+        aligner.realign(str(previous), source, target)
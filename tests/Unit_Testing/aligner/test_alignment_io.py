@@ -0,0 +1,87 @@
+import gzip
+import json
+import pytest
+from modules.alignment_io import (AlignmentWriter, alignment_format, iter_alignment, open_alignment_writer,
+                                  pyarrow, read_alignment)
+from modules.candidate_index import read_reference
+
+ALIGNMENT = [
+    ("http://a.org/onto#Heart", "http://b.org/onto#Heart", 0.91),
+    ("http://a.org/onto#Kidney&Co", "http://b.org/onto#Renal_Organ", 0.75),
+]
+
+def write(path, fmt=None):
+    with open_alignment_writer(str(path), fmt, "http://a.org/onto", "http://b.org/onto") as writer:
+        return writer.write_all(iter(ALIGNMENT))
+
+def same(read, expected=ALIGNMENT):
+    return [(s, t, pytest.approx(score)) for s, t, score in expected] == read
+
+def test_alignment_format():
+    assert alignment_format("out/alignment.txt") == ("txt", False)
+    assert alignment_format("alignment.sssom.tsv.gz") == ("sssom", True)
+    assert alignment_format("alignment.TSV") == ("tsv", False)
+    assert alignment_format("alignment.jsonl.gz") == ("jsonl", True)
+    assert alignment_format("alignment.parquet") == ("parquet", False)
+
+@pytest.mark.parametrize("name", ["alignment.txt", "alignment.tsv", "alignment.jsonl", "alignment.rdf",
+                                  "alignment.sssom.tsv", "alignment.tsv.gz", "alignment.rdf.gz"])
+def test_round_trip(tmp_path, name):
+    path = tmp_path / name
+    assert write(path) == len(ALIGNMENT)
+    assert same(read_alignment(str(path)))
+
+def test_text_format_unchanged(tmp_path):
+    path = tmp_path / "alignment.txt"
+    write(path)
+    assert path.read_text().splitlines()[0] == "http://a.org/onto#Heart <-> http://b.org/onto#Heart: 0.91"
+
+def test_tsv_reads_as_reference(tmp_path):
+    path = tmp_path / "alignment.tsv"
+    write(path)
+    assert read_reference(str(path)) == {(s, t) for s, t, _ in ALIGNMENT}
+
+def test_gzip_and_formats(tmp_path):
+    path = tmp_path / "alignment.jsonl.gz"
+    write(path)
+    with gzip.open(path, 'rt') as f:
+        assert json.loads(f.readline()) == {"source": ALIGNMENT[0][0], "target": ALIGNMENT[0][1], "score": 0.91}
+
+    path = tmp_path / "alignment.sssom.tsv"
+    write(path)
+    lines = path.read_text().splitlines()
+    assert "# subject_source: http://a.org/onto" in lines
+    assert lines[-1].split("\t") == [ALIGNMENT[1][0], "skos:exactMatch", ALIGNMENT[1][1],
+                                     "semapv:SemanticSimilarityThresholdMatching", "0.75"]
+
+def test_explicit_format_overrides_name(tmp_path):
+    path = tmp_path / "alignment.out"
+    write(path, "jsonl")
+    assert same(list(iter_alignment(str(path), "jsonl")))
+    with pytest.raises(ValueError):
+        open_alignment_writer(str(path), "csv")
+    with pytest.raises(ValueError):
+        open_alignment_writer(str(tmp_path / "alignment.parquet.gz"))
+    with pytest.raises(TypeError):
+        AlignmentWriter(str(path))
+
+@pytest.mark.parametrize("name", ["alignment.rdf", "alignment.tsv.gz"])
+def test_previous_file_kept_when_producer_fails(tmp_path, name):
+    path = tmp_path / name
+    write(path)
+
+    def mappings():
+        yield ALIGNMENT[0]
+        raise RuntimeError("aligner failed")
+
+    with pytest.raises(RuntimeError):
+        with open_alignment_writer(str(path)) as writer:
+            writer.write_all(mappings())
+    assert same(read_alignment(str(path)))
+    assert [p.name for p in tmp_path.iterdir()] == [name]
+
+@pytest.mark.skipif(pyarrow is None, reason="pyarrow is not installed")
+def test_parquet_round_trip(tmp_path):
+    path = tmp_path / "alignment.parquet"
+    write(path)
+    assert same(read_alignment(str(path)))
@@ -0,0 +1,130 @@
+import pytest
+from owlready2 import *
+from modules.candidate_index import (CandidateIndex, candidate_recall, class_labels, generate_candidates,
+                                     label_tokens, read_reference)
+from modules.ontology_aligner import BERTMapScorer, OntologyAligner
+
+SOURCE_IRI = "http://example.org/source.owl#"
+TARGET_IRI = "http://example.org/target.owl#"
+
+@pytest.fixture
+def ontologies():
+    world = World()
+    source = world.get_ontology(SOURCE_IRI)
+    target = world.get_ontology(TARGET_IRI)
+    with source:
+        class HeartValve(Thing): pass
+        class Kidney(Thing): pass
+        class UpperLimb(Thing):
+            label = ["upper limb"]
+        class Oesophagus(Thing): pass
+    with target.get_namespace("http://www.geneontology.org/formats/oboInOwl#"):
+        class hasExactSynonym(AnnotationProperty): pass
+    with target:
+        class Heart_Valve(Thing): pass
+        class Renal_Organ(Thing):
+            label = ["renal organ"]
+            hasExactSynonym = ["kidney"]
+        class Arm(Thing):
+            label = ["arm", "upper limbs"]
+        class Esophagus(Thing): pass
+        class Heart(Thing): pass
+    return source, target
+
+REFERENCE = {
+    (SOURCE_IRI + "HeartValve", TARGET_IRI + "Heart_Valve"),
+    (SOURCE_IRI + "Kidney", TARGET_IRI + "Renal_Organ"),
+    (SOURCE_IRI + "UpperLimb", TARGET_IRI + "Arm"),
+    (SOURCE_IRI + "Oesophagus", TARGET_IRI + "Esophagus"),
+}
+
+def test_label_tokens():
+    assert label_tokens("HeartValve") == ["heart", "valve"]
+    assert label_tokens("Heart_valve") == ["heart", "valve"]
+    assert label_tokens("DNABinding of cells") == ["dna", "binding", "of", "cells"]
+
+def test_class_labels_include_names_and_synonyms(ontologies):
+    _, target = ontologies
+    labels = dict(class_labels(target))
+    assert labels[TARGET_IRI + "Renal_Organ"][0] == "Renal_Organ"
+    assert sorted(labels[TARGET_IRI + "Renal_Organ"][1:]) == ["kidney", "renal organ"]
+    assert labels[TARGET_IRI + "Heart"] == ["Heart"]
+
+def test_candidates_reach_reference(ontologies):
+    source, target = ontologies
+    candidates = generate_candidates(source, target, k=2)
+
+    assert all(len(matches) <= 2 for matches in candidates.values())
+    assert candidates[SOURCE_IRI + "HeartValve"][0][0] == TARGET_IRI + "Heart_Valve"
+    recall = candidate_recall(candidates, REFERENCE, [1, 2])
+    assert recall[1] >= 0.75
+    assert recall[2] == 1.0
+
+def test_frequent_features_left_out_of_index():
+    index = CandidateIndex([(f"t{i}", [f"common part{i}"]) for i in range(10)], max_postings=5)
+    assert "w:common" not in index.postings
+    assert index.search(["part3"], 1)[0][0] == "t3"
+    assert index.search(["common"], 3) == []
+
+def test_read_reference(tmp_path):
+    path = tmp_path / "reference.tsv"
+    path.write_text("SrcEntity\tTgtEntity\tScore\nhttp://a#X\thttp://b#Y\t1.0\n")
+    assert read_reference(str(path)) == {("http://a#X", "http://b#Y")}
+    with pytest.raises(ValueError):
+        candidate_recall({}, set())
+
+class CandidateBERTMap:
+    """Stands in for BERTMap, scoring the reference mappings 0.9 and other pairs 0.1."""
+
+    def __init__(self):
+        self.scored = []
+
+    def align(self, ontology1, ontology2, candidates=None):
+        pairs = candidates if candidates is not None else \
+            [(s, t) for s, _ in class_labels(ontology1) for t, _ in class_labels(ontology2)]
+        self.scored.extend(pairs)
+        return [(s, t, 0.9 if (s, t) in REFERENCE else 0.1) for s, t in pairs]
+
+class AllPairsBERTMap(CandidateBERTMap):
+    def align(self, ontology1, ontology2):
+        return super().align(ontology1, ontology2)
+
+class KeywordsBERTMap(CandidateBERTMap):
+    def align(self, ontology1, ontology2, **kwargs):
+        return super().align(ontology1, ontology2)
+
+class IgnoringCandidatesBERTMap(CandidateBERTMap):
+    def align(self, ontology1, ontology2, candidates=None):
+        return super().align(ontology1, ontology2)
+
+def test_bertmap_scorer_candidate_contract(ontologies):
+    source, target = ontologies
+    pairs = [(SOURCE_IRI + "Kidney", TARGET_IRI + "Renal_Organ"), (SOURCE_IRI + "Kidney", TARGET_IRI + "Heart")]
+
+    with_candidates = BERTMapScorer(CandidateBERTMap())
+    assert with_candidates.accepts_candidates
+    assert with_candidates.align(source, target, candidates=pairs) == [(*pairs[0], 0.9), (*pairs[1], 0.1)]
+    assert with_candidates.bertmap.scored == pairs
+
+    # Without a candidates parameter, BERTMap would score every pair: refused, not done quietly
+    for bertmap in (AllPairsBERTMap(), KeywordsBERTMap()):
+        without_candidates = BERTMapScorer(bertmap)
+        assert not without_candidates.accepts_candidates
+        with pytest.raises(ValueError):
+            without_candidates.align(source, target, candidates=pairs)
+        assert without_candidates.bertmap.scored == []
+    assert len(BERTMapScorer(AllPairsBERTMap()).align(source, target)) == 4 * 5
+
+    ignoring = BERTMapScorer(IgnoringCandidatesBERTMap())
+    assert ignoring.align(source, target, candidates=pairs) == [(*pairs[0], 0.9), (*pairs[1], 0.1)]
+
+def test_aligner_scores_only_candidates(ontologies, tmp_path, monkeypatch):
+    source, target = ontologies
+    source.save(file=str(tmp_path / "source.owl"))
+    target.save(file=str(tmp_path / "target.owl"))
+    monkeypatch.setattr("modules.ontology_aligner.BERTMap", CandidateBERTMap)
+
+    aligner = OntologyAligner(str(tmp_path / "source.owl"), str(tmp_path / "target.owl"))
+    aligner.candidate_k = 2
+    assert set(aligner.align_ontologies()) == {(s, t, 0.9) for s, t in REFERENCE}
+    assert len(aligner.bertmap.bertmap.scored) <= 4 * 2
@@ -0,0 +1,46 @@
+import numpy as np
+from modules.embedding_cache import EmbeddingCache, label_rows
+
+class CountingEncoder:
+    """Deterministic stand-in for a sentence embedding model, counting the texts it encodes."""
+
+    model_id = "counting-encoder"
+
+    def __init__(self):
+        self.texts = []
+
+    def __call__(self, texts):
+        self.texts.extend(texts)
+        return np.array([[len(text), sum(map(ord, text)) % 97, 1.0] for text in texts], dtype=np.float32)
+
+def test_label_rows_normalize_and_deduplicate():
+    rows = label_rows([("http://a#Heart_Valve", ["Heart_Valve", "heart valve", "Valve of heart"])])
+    assert rows == [("http://a#Heart_Valve", "heart valve"), ("http://a#Heart_Valve", "valve of heart")]
+
+def test_cached_embeddings_encode_only_changes(tmp_path):
+    encoder = CountingEncoder()
+    rows = [("http://a#X", "left kidney"), ("http://a#Y", "heart"), ("http://a#Z", "lung")]
+
+    first = np.array(EmbeddingCache(encoder, str(tmp_path)).embed("http://a", rows))
+    assert encoder.texts == ["left kidney", "heart", "lung"]
+
+    cache = EmbeddingCache(encoder, str(tmp_path))
+    second = cache.embed("http://a", rows)
+    assert isinstance(second, np.memmap)
+    assert np.array_equal(first, second) and cache.encoded == 0 and cache.reused == 3
+
+    changed = [rows[2], ("http://a#Y", "cardiac organ"), rows[0]]
+    third = cache.embed("http://a", changed)
+    assert encoder.texts[3:] == ["cardiac organ"]
+    assert np.array_equal(third[0], first[2]) and np.array_equal(third[2], first[0])
+    assert len(list((tmp_path).rglob("vectors-*.npy"))) == 1
+
+def test_cache_is_per_model_and_ontology(tmp_path):
+    encoder = CountingEncoder()
+    rows = [("http://a#X", "kidney")]
+    EmbeddingCache(encoder, str(tmp_path)).embed("http://a", rows)
+    EmbeddingCache(encoder, str(tmp_path)).embed("http://b", rows)
+    other = CountingEncoder()
+    other.model_id = "other-model"
+    EmbeddingCache(other, str(tmp_path)).embed("http://a", rows)
+    assert encoder.texts == ["kidney", "kidney"] and other.texts == ["kidney"]
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+from modules.nearest_neighbours import entity_neighbours, top_k_neighbours
+
+def _normalized(rows, dim, seed):
+    vectors = np.random.default_rng(seed).standard_normal((rows, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def test_blocked_matmul_matches_brute_force():
+    source, target = _normalized(50, 16, 0), _normalized(80, 16, 1)
+    indices, scores = top_k_neighbours(source, target, 5, backend="matmul", block_size=7)
+
+    expected = np.argsort(-(source @ target.T), axis=1)[:, :5]
+    assert indices.shape == (50, 5) and scores.dtype == np.float32
+    assert np.array_equal(indices, expected)
+    assert np.allclose(scores, np.take_along_axis(source @ target.T, expected, axis=1), atol=1e-5)
+
+def test_k_capped_at_target_size_and_unknown_backend():
+    indices, _ = top_k_neighbours(_normalized(3, 4, 0), _normalized(2, 4, 1), 10, backend="matmul")
+    assert indices.shape == (3, 2)
+    with pytest.raises(ValueError):
+        top_k_neighbours(_normalized(3, 4, 0), _normalized(2, 4, 1), 1, backend="annoy")
+
+def test_entity_neighbours_take_best_label_per_entity():
+    target_vectors = np.eye(4, dtype=np.float32)
+    target_rows = [("t#A", "a"), ("t#A", "a2"), ("t#B", "b"), ("t#C", "c")]
+    source_vectors = np.array([[0, 0.6, 0.8, 0], [0, 0, 0, 1]], dtype=np.float32)
+    source_rows = [("s#X", "x"), ("s#Y", "y")]
+
+    sources, targets, indices, scores = entity_neighbours(source_rows, source_vectors, target_rows, target_vectors,
+                                                          k=2, backend="matmul")
+    assert sources == ["s#X", "s#Y"]
+    assert [targets[i] for i in indices[0]] == ["t#B", "t#A"]
+    assert np.allclose(scores[0], [0.8, 0.6])
+    assert targets[indices[1, 0]] == "t#C"
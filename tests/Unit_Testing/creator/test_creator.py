@@ -1,10 +1,12 @@
 import pytest
 import json
+import gzip
 import os
 from pathlib import Path
 from datetime import date, time, datetime
 from owlready2 import *
 from modules.ontology_creator import OntologyCreator, create_ontology_from_config
+from modules.ontology_output import save_ontology, verify_output
 from modules.config import load_config
 from jsonschema.exceptions import ValidationError
 import logging
@@ -146,16 +148,14 @@ def ontology_creator(schema_file):
     creator.CONFIG_SCHEMA = json.load(open(schema_file))
     return creator
 
-def test_create_ontology_from_config(ontology_creator, config_file, test_config, caplog):
+def test_create_ontology_from_config(ontology_creator, config_file, test_config, tmp_path, caplog):
     caplog.set_level(logging.INFO)
     
-    # Ensure the output directory exists in the project root
-    output_dir = PROJECT_ROOT / "output"
-    output_dir.mkdir(parents=True, exist_ok=True)
+    # Write to a scratch file, not the tracked output/my_dynamic_ontology.owl
+    output_file = tmp_path / "my_dynamic_ontology.owl"
     
-    ontology_creator.create_ontology_from_config(config_file)
+    ontology_creator.create_ontology_from_config(config_file, output_path=str(output_file))
     
-    output_file = output_dir / "my_dynamic_ontology.owl"
     print(f"Checking for existence of: {output_file}")
     
     assert output_file.exists(), f"Output file does not exist: {output_file}"
@@ -301,9 +301,6 @@ def test_create_ontology_from_config(ontology_creator, config_file, test_config,
 
     assert "Ontology created and saved successfully" in caplog.text
 
-    # Clean up: remove the created ontology file after the test
-    output_file.unlink()
-
 def test_create_ontology_invalid_config(ontology_creator, tmp_path):
     invalid_config = {
         "ontology_iri": "http://example.org/test_ontology.owl",
@@ -324,4 +321,327 @@ def test_create_ontology_invalid_json(ontology_creator, tmp_path):
     invalid_json_file = tmp_path / "invalid.json"
     invalid_json_file.write_text("{invalid json")
     with pytest.raises(json.JSONDecodeError):
-        ontology_creator.create_ontology_from_config(str(invalid_json_file))
\ No newline at end of file
+        ontology_creator.create_ontology_from_config(str(invalid_json_file))
+
+def test_create_ontology_streaming(ontology_creator, sample_config, tmp_path, caplog):
+    caplog.set_level(logging.INFO)
+    individuals = sample_config["individuals"]
+    sample_config["individuals"] = individuals[:1]
+    sample_config["individuals_file"] = "individuals.jsonl"
+    (tmp_path / "individuals.jsonl").write_text("\n".join(json.dumps(ind) for ind in individuals[1:]) + "\n")
+    config_file = tmp_path / "streaming_config.json"
+    with open(config_file, "w") as f:
+        json.dump(sample_config, f)
+
+    ontology_creator.create_ontology_from_config(str(config_file), streaming=True,
+                                                 output_path=str(tmp_path / "streaming.owl"))
+
+    store_file = PROJECT_ROOT / "output" / "my_dynamic_ontology.sqlite3"
+    try:
+        assert store_file.exists()
+        assert "Streaming ontology creation into quadstore" in caplog.text
+        onto = ontology_creator.onto
+        assert {ind.name for ind in onto.individuals()} == {"John", "Math101", "ProfSmith"}
+        assert isinstance(onto.Math101, onto.Course)
+        assert onto.ProfSmith.hasAge == 45
+    finally:
+        ontology_creator.world.close()
+        store_file.unlink()
+
+def test_stream_ontology_config_skips_individuals(config_file):
+    from modules.config_stream import stream_ontology_config
+
+    sections, individuals = stream_ontology_config(config_file)
+
+    assert "individuals" not in sections
+    assert sections["classes"]["Student"] == "Person"
+    assert [ind["name"] for ind in individuals] == ["John", "Math101", "ProfSmith"]
+
+@pytest.mark.parametrize("verification", ["none", "cheap", "full"])
+def test_create_ontology_verification_modes(ontology_creator, config_file, verification, tmp_path, caplog):
+    caplog.set_level(logging.INFO)
+    output_file = tmp_path / "my_dynamic_ontology.owl"
+
+    ontology_creator.create_ontology_from_config(config_file, verification=verification, output_path=str(output_file))
+
+    assert ontology_creator.manifest["size"] == output_file.stat().st_size
+    assert ontology_creator.manifest["triples"] > 0
+    assert ("Verified" in caplog.text) == (verification != "none")
+
+def test_verify_output_detects_modified_file(tmp_path):
+    world = World()
+    onto = world.get_ontology("http://example.org/verify.owl")
+    with onto:
+        class Person(Thing):
+            pass
+    manifest = save_ontology(onto, str(tmp_path / "verify.nt"), format="ntriples")
+    assert manifest["lines"] == manifest["triples"]
+    verify_output(manifest, "cheap")
+
+    with open(tmp_path / "verify.nt", "ab") as f:
+        f.write(b"<http://example.org/a> <http://example.org/b> <http://example.org/c> .\n")
+    with pytest.raises(ValueError):
+        verify_output(manifest, "cheap")
+    with pytest.raises(ValueError):
+        verify_output(manifest, "exhaustive")
+    world.close()
+
+@pytest.mark.parametrize("output_format, compress", [("ntriples", False), ("ntriples", True), ("rdfxml", True), ("sqlite", False)])
+def test_create_ontology_output_formats(ontology_creator, config_file, tmp_path, output_format, compress):
+    output_path = tmp_path / f"created.{output_format}{'.gz' if compress else ''}"
+
+    ontology_creator.create_ontology_from_config(config_file, verification="full", output_path=str(output_path),
+                                                 output_format=output_format, compress=compress)
+
+    assert output_path.exists()
+    assert ontology_creator.manifest["format"] == output_format
+    if output_format == "sqlite":
+        world = World(filename=str(output_path), exclusive=False)
+        onto = world.get_ontology("http://example.org/test_ontology.owl")
+    else:
+        world = World()
+        with (gzip.open if compress else open)(output_path, "rb") as f:
+            onto = world.get_ontology("http://example.org/test_ontology.owl").load(fileobj=f, format=output_format)
+    assert {ind.name for ind in onto.individuals()} == {"John", "Math101", "ProfSmith"}
+    world.close()
+
+def test_sqlite_output_cannot_be_compressed(ontology_creator, config_file, tmp_path):
+    with pytest.raises(ValueError):
+        ontology_creator.create_ontology_from_config(config_file, output_path=str(tmp_path / "created.sqlite3"),
+                                                     output_format="sqlite", compress=True)
+
+def test_create_ontology_unordered_classes(ontology_creator, tmp_path):
+    unordered_config = {
+        "ontology_iri": "http://example.org/unordered_ontology.owl",
+        "classes": {"GraduateStudent": "Student", "Student": "Person", "Person": "Thing", "Course": "Thing"},
+        "individuals": [{"name": "Alice", "class": "GraduateStudent"}]
+    }
+    config_file = tmp_path / "unordered_config.json"
+    with open(config_file, "w") as f:
+        json.dump(unordered_config, f)
+
+    ontology_creator.create_ontology_from_config(str(config_file), output_path=str(tmp_path / "unordered.owl"))
+
+    onto = ontology_creator.onto
+    assert onto.GraduateStudent.is_a == [onto.Student]
+    assert onto.Student.is_a == [onto.Person]
+    assert onto.Person.is_a == [Thing]
+    assert set(onto.classes()) == {onto.GraduateStudent, onto.Student, onto.Person, onto.Course}
+    assert onto.Alice.is_a == [onto.GraduateStudent]
+
+def test_sort_classes_detects_cycles_and_missing_parents(ontology_creator):
+    assert ontology_creator._sort_classes({"B": "A", "C": "B", "A": "Thing"}) == ["A", "B", "C"]
+    with pytest.raises(ValueError, match="Cyclic class hierarchy among: A, B"):
+        ontology_creator._sort_classes({"A": "B", "B": "A", "C": "Thing"})
+    with pytest.raises(ValueError, match="Parent class 'Missing'"):
+        ontology_creator._sort_classes({"A": "Missing"})
+
+def test_create_individuals_bulk_property_values(ontology_creator, sample_config, tmp_path):
+    sample_config["individuals"] = [
+        {"name": "Jane", "class": "Student", "attributes": {"hasAge": [21, 22], "enrolledIn": ["Math101", "Physics"]}},
+        {"name": "Math101", "class": "Course"},
+        {"name": "ProfSmith", "class": "Professor", "attributes": {"teaches": ["Math101", "Physics"]}},
+        {"name": "Physics", "class": "Course"}
+    ]
+    config_file = tmp_path / "bulk_config.json"
+    with open(config_file, "w") as f:
+        json.dump(sample_config, f)
+
+    ontology_creator.create_ontology_from_config(str(config_file), output_path=str(tmp_path / "bulk.owl"))
+
+    onto = ontology_creator.onto
+    assert onto.Jane.hasAge == 21
+    assert onto.Jane.enrolledIn == onto.Math101
+    assert set(onto.ProfSmith.teaches) == {onto.Math101, onto.Physics}
+    assert isinstance(onto.Physics, onto.Course)
+
+def test_create_individuals_repeated_name_and_undeclared_target(ontology_creator, sample_config, tmp_path, caplog):
+    sample_config["individuals"] = [
+        {"name": "Math101", "class": "Course"},
+        {"name": "ProfSmith", "class": "Professor", "attributes": {"teaches": ["Math101"]}},
+        {"name": "ProfSmith", "class": "Professor", "attributes": {"teaches": ["Math101", "Phyiscs"]}}
+    ]
+    config_file = tmp_path / "repeated_config.json"
+    with open(config_file, "w") as f:
+        json.dump(sample_config, f)
+
+    ontology_creator.create_ontology_from_config(str(config_file), output_path=str(tmp_path / "repeated.owl"))
+
+    onto = ontology_creator.onto
+    db = ontology_creator.world.graph.db
+    assert db.execute("SELECT COUNT() FROM objs WHERE s=? AND p=? AND o=?",
+                      (onto.ProfSmith.storid, onto.teaches.storid, onto.Math101.storid)).fetchone()[0] == 1
+    assert "1 object property values name undeclared individuals: Phyiscs" in caplog.text
+
+def test_create_individuals_unknown_property(ontology_creator, sample_config, tmp_path):
+    sample_config["individuals"] = [{"name": "Jane", "class": "Student", "attributes": {"hasShoeSize": [42]}}]
+    config_file = tmp_path / "unknown_property_config.json"
+    with open(config_file, "w") as f:
+        json.dump(sample_config, f)
+
+    with pytest.raises(ValueError, match="hasShoeSize"):
+        ontology_creator.create_ontology_from_config(str(config_file), output_path=str(tmp_path / "unknown.owl"))
+
+def test_create_sharded_ontology_concat(config_file, tmp_path):
+    from modules.sharded_creator import create_sharded_ontology
+
+    output_path = tmp_path / "sharded.nt"
+    manifest = create_sharded_ontology(config_file, shards=2, workers=2, merge="concat",
+                                       output_path=str(output_path), verification="full")
+
+    assert len(manifest["shards"]) == 2
+    world = World()
+    with open(output_path, "rb") as f:
+        onto = world.get_ontology("http://example.org/test_ontology.owl").load(fileobj=f, format="ntriples")
+    assert {ind.name for ind in onto.individuals()} == {"John", "Math101", "ProfSmith"}
+    assert onto.ProfSmith.hasAge == 45
+    assert onto.Student in next(onto.Course.disjoints()).entities
+    assert len(output_path.read_bytes().splitlines()) == len(set(output_path.read_bytes().splitlines()))
+    world.close()
+
+def test_create_sharded_ontology_imports(config_file, tmp_path):
+    from modules.sharded_creator import create_sharded_ontology
+
+    output_path = tmp_path / "sharded.owl"
+    create_sharded_ontology(config_file, shards=2, workers=2, merge="imports",
+                            output_path=str(output_path), output_format="rdfxml")
+
+    assert (tmp_path / "sharded-shard0.owl").exists() and (tmp_path / "sharded-shard1.owl").exists()
+    onto_path.append(str(tmp_path))
+    try:
+        world = World()
+        onto = world.get_ontology(f"file://{output_path}").load()
+        assert len(onto.imported_ontologies) == 2
+        assert {ind.name for ind in world.individuals()} == {"John", "Math101", "ProfSmith"}
+        assert world["http://example.org/test_ontology.owl#John"].hasAge == 30
+        world.close()
+    finally:
+        onto_path.remove(str(tmp_path))
+
+def test_create_sharded_ontology_annotates_individuals(sample_config, tmp_path):
+    from modules.sharded_creator import create_sharded_ontology
+
+    sample_config["annotations"]["hasDescription"]["ProfSmith"] = ["Teaches the maths courses"]
+    config_file = tmp_path / "annotated_config.json"
+    with open(config_file, "w") as f:
+        json.dump(sample_config, f)
+    output_path = tmp_path / "sharded.nt"
+
+    manifest = create_sharded_ontology(str(config_file), shards=2, workers=2, merge="concat",
+                                       output_path=str(output_path), verification="full")
+
+    assert all("path" not in shard for shard in manifest["shards"])
+    world = World()
+    with open(output_path, "rb") as f:
+        onto = world.get_ontology("http://example.org/test_ontology.owl").load(fileobj=f, format="ntriples")
+    assert onto.hasDescription[onto.ProfSmith] == ["Teaches the maths courses"]
+    assert onto.hasDescription[onto.Person] == ["A human being"]
+    world.close()
+
+def test_schema_validator_compiled_once():
+    assert OntologyCreator()._validator is OntologyCreator()._validator
+
+def test_loaded_schema_not_shared():
+    OntologyCreator().CONFIG_SCHEMA["required"].append("not_a_section")
+    assert "not_a_section" not in OntologyCreator().CONFIG_SCHEMA["required"]
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_invalid_individual_reports_index(sample_config, tmp_path, streaming):
+    sample_config["individuals"][2] = {"name": "ProfSmith"}
+    config_file = tmp_path / "invalid_individual_config.json"
+    with open(config_file, "w") as f:
+        json.dump(sample_config, f)
+
+    creator = OntologyCreator()
+    with pytest.raises(ValidationError) as excinfo:
+        creator.create_ontology_from_config(str(config_file), streaming=streaming, output_path=str(tmp_path / "invalid.owl"))
+    assert excinfo.value.message.startswith("Individual 2:")
+    assert list(excinfo.value.path) == ["individuals", 2]
+    if streaming:
+        creator.world.close()
+        os.remove(PROJECT_ROOT / "output" / "my_dynamic_ontology.sqlite3")
+
+def _ntriples(path):
+    with open(path, "rb") as f:
+        return set(f.read().splitlines())
+
+def test_update_ontology_applies_config_delta(ontology_creator, sample_config, tmp_path):
+    from modules.ontology_updater import OntologyUpdater
+
+    quadstore = tmp_path / "ontology.sqlite3"
+    with open(tmp_path / "old_config.json", "w") as f:
+        json.dump(sample_config, f)
+    ontology_creator.create_ontology_from_config(str(tmp_path / "old_config.json"), output_path=str(quadstore),
+                                                 output_format="sqlite")
+
+    new_config = json.loads(json.dumps(sample_config))
+    new_config["classes"]["Professor"] = "Thing"
+    new_config["classes"]["Lecture"] = "Course"
+    del new_config["classes"]["Human"]
+    new_config["data_properties"]["hasStartTime"]["range"] = ["str"]
+    new_config["individuals"][0]["attributes"]["hasAge"] = [31]
+    del new_config["individuals"][1]
+    new_config["individuals"].append({"name": "Algebra", "class": "Lecture", "attributes": {"hasStartTime": ["10:00"]}})
+    new_config["equivalent_classes"] = []
+    new_config["annotations"]["hasDescription"]["Person"] = ["Any person"]
+    with open(tmp_path / "new_config.json", "w") as f:
+        json.dump(new_config, f)
+
+    updater = OntologyUpdater()
+    counts = updater.update_ontology_from_config(str(tmp_path / "new_config.json"), quadstore_path=str(quadstore),
+                                                 output_path=str(tmp_path / "updated.nt"), output_format="ntriples",
+                                                 verification="full")
+    assert counts["individuals"] == {"added": 1, "removed": 1, "changed": 1}
+    assert counts["classes"] == {"added": 1, "removed": 1, "changed": 1}
+    assert counts["data_properties"]["changed"] == 1
+    assert counts["axioms"]["changed"] == 1
+    updater.world.close()
+
+    rebuilt = OntologyCreator()
+    rebuilt.create_ontology_from_config(str(tmp_path / "new_config.json"), output_path=str(tmp_path / "rebuilt.nt"),
+                                        output_format="ntriples")
+    assert _ntriples(tmp_path / "updated.nt") == _ntriples(tmp_path / "rebuilt.nt")
+
+    unchanged = OntologyUpdater().update_ontology_from_config(str(tmp_path / "new_config.json"), quadstore_path=str(quadstore),
+                                                              output_path=str(tmp_path / "unchanged.nt"), output_format="ntriples")
+    assert all(not any(kinds.values()) for kinds in unchanged.values())
+
+def test_update_ontology_keeps_unchanged_annotations_and_axioms(ontology_creator, sample_config, tmp_path):
+    from modules.ontology_updater import OntologyUpdater
+
+    sample_config["annotations"]["hasDescription"]["John"] = ["A student"]
+    sample_config["general_axioms"][0]["properties"].append("teaches")
+    quadstore = tmp_path / "ontology.sqlite3"
+    with open(tmp_path / "old_config.json", "w") as f:
+        json.dump(sample_config, f)
+    ontology_creator.create_ontology_from_config(str(tmp_path / "old_config.json"), output_path=str(quadstore),
+                                                 output_format="sqlite")
+
+    # Only the annotated individual and the transitive property change
+    new_config = json.loads(json.dumps(sample_config))
+    new_config["individuals"][0]["attributes"]["hasAge"] = [31]
+    new_config["object_properties"]["teaches"]["domain"] = ["Person"]
+    with open(tmp_path / "new_config.json", "w") as f:
+        json.dump(new_config, f)
+
+    updater = OntologyUpdater()
+    counts = updater.update_ontology_from_config(str(tmp_path / "new_config.json"), quadstore_path=str(quadstore),
+                                                 output_path=str(tmp_path / "updated.nt"), output_format="ntriples")
+    assert counts["individuals"]["changed"] == 1
+    assert counts["object_properties"]["changed"] == 1
+    assert not any(counts["annotations"].values()) and not any(counts["axioms"].values())
+    updater.world.close()
+
+    rebuilt = OntologyCreator()
+    rebuilt.create_ontology_from_config(str(tmp_path / "new_config.json"), output_path=str(tmp_path / "rebuilt.nt"),
+                                        output_format="ntriples")
+    updated = _ntriples(tmp_path / "updated.nt")
+    assert updated == _ntriples(tmp_path / "rebuilt.nt")
+    assert any(b"John" in triple and b"A student" in triple for triple in updated)
+    assert any(b"#teaches>" in triple and b"TransitiveProperty" in triple for triple in updated)
+
+def test_update_ontology_requires_applied_config(config_file, tmp_path):
+    from modules.ontology_updater import OntologyUpdater
+
+    with pytest.raises(FileNotFoundError):
+        OntologyUpdater().update_ontology_from_config(config_file, quadstore_path=str(tmp_path / "missing.sqlite3"))
@@ -1,4 +1,5 @@
 import pytest
+import io
 import json
 import os
 from pathlib import Path
@@ -6,6 +7,9 @@ from datetime import date, time, datetime
 from owlready2 import *
 from modules.ontology_processor import OntologyProcessor
 from modules.ontology_creator import OntologyCreator
+from modules.reasoning_session import ReasoningSession, axioms_fingerprint, compare_reasoners
+from modules.query_server import QueryServer
+from modules.async_api import AsyncOntologyProcessor
 from modules.config import load_config
 import logging
 
@@ -104,10 +108,11 @@ def ontology_file(tmp_path, sample_ontology_config, test_config):
     with open(config_file, "w") as f:
         json.dump(sample_ontology_config, f)
 
+    # Write to a scratch file, not the tracked output/my_dynamic_ontology.owl
+    output_file = tmp_path / "my_dynamic_ontology.owl"
     creator = OntologyCreator()
-    creator.create_ontology_from_config(str(config_file))
+    creator.create_ontology_from_config(str(config_file), output_path=str(output_file))
 
-    output_file = Path(test_config.get('General', 'output_dir')) / "my_dynamic_ontology.owl"
     assert output_file.exists(), f"Output file does not exist: {output_file}"
     
     return str(output_file)
@@ -297,3 +302,501 @@ def test_ontology_with_inconsistency(ontology_processor, ontology_file):
     assert not is_consistent
     print("Successfully detected ontology inconsistency")
 
+
+def test_persistent_quadstore_is_reused(ontology_file, tmp_path, caplog):
+    store_dir = tmp_path / "quadstores"
+    source = tmp_path / "persistent_ontology.owl"
+    source.write_bytes(Path(ontology_file).read_bytes())
+
+    OntologyProcessor(str(source), quadstore_dir=str(store_dir))
+    assert len(list(store_dir.glob("*.sqlite3"))) == 1
+
+    caplog.set_level(logging.INFO)
+    processor = OntologyProcessor(str(source), quadstore_dir=str(store_dir))
+    assert "Opened cached quadstore" in caplog.text
+
+    subclass_names = [cls.name for cls in processor.query_subclasses("Person")]
+    assert "Student" in subclass_names
+    assert "Professor" in subclass_names
+
+def test_persistent_quadstore_reimports_changed_file(ontology_file, tmp_path):
+    store_dir = tmp_path / "quadstores"
+    source = tmp_path / "persistent_ontology.owl"
+    source.write_bytes(Path(ontology_file).read_bytes())
+    OntologyProcessor(str(source), quadstore_dir=str(store_dir))
+    old_stores = set(store_dir.glob("*.sqlite3"))
+
+    source.write_bytes(Path(ontology_file).read_bytes() + b"\n")
+    OntologyProcessor(str(source), quadstore_dir=str(store_dir))
+    new_stores = set(store_dir.glob("*.sqlite3"))
+
+    assert len(new_stores) == 1
+    assert new_stores != old_stores
+
+def test_hierarchy_index_queries(ontology_processor):
+    ancestor_names = [cls.name for cls in ontology_processor.query_ancestors("Student")]
+    descendant_names = [cls.name for cls in ontology_processor.query_descendants("Person")]
+
+    assert "Person" in ancestor_names
+    assert "Thing" in ancestor_names
+    assert "Student" not in ancestor_names
+    assert "Student" in descendant_names
+    assert "Professor" in descendant_names
+    assert "Person" not in descendant_names
+    assert ontology_processor.is_subclass_of("Student", "Person")
+    assert not ontology_processor.is_subclass_of("Person", "Student")
+    assert not ontology_processor.is_subclass_of("Course", "Person")
+
+def test_hierarchy_index_follows_edits(ontology_processor):
+    with ontology_processor.ontology:
+        types.new_class("GraduateStudent", (ontology_processor.ontology.Student,))
+
+    assert ontology_processor.is_subclass_of("GraduateStudent", "Person")
+    assert "GraduateStudent" in [cls.name for cls in ontology_processor.query_subclasses("Student")]
+    assert "GraduateStudent" in ontology_processor.query_class_hierarchy()["Student"]
+
+def test_hierarchy_index_kept_on_unrelated_edits(ontology_processor):
+    onto = ontology_processor.ontology
+    index = ontology_processor.get_hierarchy_index()
+    with onto:
+        onto.Person.comment.append("Not part of the hierarchy")
+        student = onto.Student("unrelated_student")
+    assert ontology_processor.get_hierarchy_index() is index
+
+    with onto:
+        onto.Course.is_a.append(onto.Person)
+    assert ontology_processor.get_hierarchy_index() is not index
+    assert ontology_processor.is_subclass_of("Course", "Person")
+
+    # The ontology is shared with the other tests
+    onto.Course.is_a.remove(onto.Person)
+    onto.Person.comment.remove("Not part of the hierarchy")
+    destroy_entity(student)
+
+def test_query_annotations_with_property_filter(ontology_processor):
+    with ontology_processor.ontology:
+        ontology_processor.ontology.Person.label.append("person")
+        ontology_processor.ontology.Person.comment.append("Not requested")
+
+    annotations = ontology_processor.query_annotations(["rdfs:label", "hasDescription"])
+
+    assert annotations["Person"]["label"] == ["person"]
+    assert "A human being" in annotations["Person"]["hasDescription"]
+    assert "comment" not in annotations["Person"]
+
+def test_iter_annotations_streams_entities(ontology_processor):
+    streamed = ontology_processor.iter_annotations()
+
+    assert not isinstance(streamed, dict)
+    assert dict(streamed) == ontology_processor.query_annotations()
+
+def test_reasoning_session_reuses_classification(ontology_processor, monkeypatch):
+    calls = []
+    monkeypatch.setattr("modules.reasoning_session.sync_reasoner", lambda ontology: calls.append(ontology))
+    session = ontology_processor.reasoning
+    session.invalidate()
+
+    assert session.is_consistent()
+    assert session.is_consistent()
+    assert len(calls) == 1
+
+    with ontology_processor.ontology:
+        types.new_class("Lecture", (Thing,))
+    assert session.dirty
+    assert session.is_consistent()
+    assert len(calls) == 2
+
+def test_reasoner_results_cached_on_disk(ontology_file, tmp_path, monkeypatch):
+    def fake_reasoner(ontology):
+        calls.append(ontology)
+        with ontology:
+            ontology.Professor.is_a.append(ontology.Student)
+
+    calls = []
+    monkeypatch.setattr("modules.reasoning_session.sync_reasoner", fake_reasoner)
+    cache_dir = str(tmp_path / "reasoner_cache")
+
+    first = OntologyProcessor(ontology_file, quadstore_dir=str(tmp_path / "store1"))
+    ReasoningSession(first.ontology, cache_dir=cache_dir).classify()
+    assert len(calls) == 1
+    assert len(os.listdir(cache_dir)) == 1
+
+    second = OntologyProcessor(ontology_file, quadstore_dir=str(tmp_path / "store2"))
+    session = ReasoningSession(second.ontology, cache_dir=cache_dir)
+    session.classify()
+    assert len(calls) == 1
+    assert session.consistent
+    assert second.is_subclass_of("Professor", "Student")
+
+def test_axioms_fingerprint_independent_of_world_content(tmp_path):
+    world = World()
+    onto = world.get_ontology("http://example.org/fingerprint.owl")
+    with onto:
+        class Course(Thing): pass
+        class Student(Thing): pass
+        class attends(ObjectProperty): pass
+        class Attendee(Thing):
+            equivalent_to = [Student & attends.some(Course)]
+            comment = ["Anyone attending a course"]
+    onto.save(file=str(tmp_path / "fingerprint.owl"))
+
+    fresh = World().get_ontology(str(tmp_path / "fingerprint.owl")).load()
+    busy_world = World()
+    scratch = busy_world.get_ontology("http://example.org/scratch.owl")
+    with scratch:
+        class Thing1(Thing): pass
+        class rel(ObjectProperty): pass
+        Thing1.is_a.append(rel.some(Thing1) | rel.only(Thing1))
+    scratch.destroy()
+    loaded_later = busy_world.get_ontology(str(tmp_path / "fingerprint.owl")).load()
+
+    assert axioms_fingerprint(fresh) == axioms_fingerprint(loaded_later)
+    with loaded_later:
+        types.new_class("Lecture", (loaded_later.Course,))
+    assert axioms_fingerprint(fresh) != axioms_fingerprint(loaded_later)
+
+def test_axioms_fingerprint_covers_co_loaded_ontologies(tmp_path):
+    world = World()
+    onto = world.get_ontology("http://example.org/main.owl")
+    with onto:
+        class Course(Thing): pass
+    imported = world.get_ontology("http://example.org/imported.owl")
+    onto.imported_ontologies.append(imported)
+    before = axioms_fingerprint(onto)
+
+    # The reasoner sees the imported ontology, so a change in it must miss the cache
+    with imported:
+        class Seminar(Thing): pass
+    with onto:
+        Seminar.is_a.append(Course)
+    changed = axioms_fingerprint(onto)
+    assert changed != before
+    with imported:
+        Seminar.comment.append("Edited in the imported ontology only")
+    assert axioms_fingerprint(onto) != changed
+
+def test_structural_reasoner_backend(ontology_file, tmp_path):
+    processor = OntologyProcessor(ontology_file, quadstore_dir=str(tmp_path / "quadstores"))
+    onto = processor.ontology
+    with onto:
+        pupil = types.new_class("Pupil", (Thing,))
+        pupil.equivalent_to.append(onto.Student)
+
+    session = ReasoningSession(onto, backend="structural")
+    assert session.is_consistent()
+    assert onto.Person in pupil.is_a
+    assert session.runs[-1]["backend"] == "structural"
+    assert session.runs[-1]["seconds"] >= 0
+
+    with onto:
+        AllDisjoint([onto.Student, onto.Professor])
+        tutor = types.new_class("Tutor", (onto.Student, onto.Professor))
+        onto.Professor("AmbiguousTutor").is_a.append(onto.Student)
+    assert not session.is_consistent()
+    # As with HermiT, an inconsistent ontology is left untouched
+    assert Nothing not in tutor.equivalent_to
+
+def test_reasoner_memory_measured_per_run(ontology_file, tmp_path):
+    processor = OntologyProcessor(ontology_file, quadstore_dir=str(tmp_path / "quadstores"))
+    session = ReasoningSession(processor.ontology, backend="structural")
+    session.classify()
+    assert session.runs[-1]["memory_measure"] == "python_allocations"
+    assert session.runs[-1]["peak_kb"] >= 0
+
+    session.measure_memory = False
+    session.classify(force=True)
+    assert session.runs[-1]["peak_kb"] is None
+
+    result, = compare_reasoners(ontology_file, ["structural"])
+    assert result["backend"] == "structural" and result["consistent"]
+    assert result["memory_measure"] == "python_allocations" and result["peak_kb"] >= 0
+
+def test_jvm_memory_bound_when_an_earlier_child_was_larger(ontology_file, tmp_path, monkeypatch):
+    peaks = iter([500000, 500000, 500000, 800000])
+    monkeypatch.setattr("modules.reasoning_session._children_max_rss_kb", lambda: next(peaks))
+    monkeypatch.setattr("modules.reasoning_session.sync_reasoner", lambda ontology: None)
+    processor = OntologyProcessor(ontology_file, quadstore_dir=str(tmp_path / "quadstores"))
+    session = ReasoningSession(processor.ontology, backend="hermit")
+
+    session.classify()
+    assert session.runs[-1]["memory_measure"] == "jvm_max_rss_bound"
+    assert session.runs[-1]["peak_kb"] == 500000
+    session.classify(force=True)
+    assert session.runs[-1]["memory_measure"] == "jvm_max_rss"
+    assert session.runs[-1]["peak_kb"] == 800000
+
+def test_unknown_reasoner_backend(ontology_processor):
+    with pytest.raises(ValueError):
+        ReasoningSession(ontology_processor.ontology, backend="fact++")
+
+def test_run_query_answers_by_name(ontology_processor):
+    assert sorted(ontology_processor.run_query({"query": "subclasses", "class": "Person"})) == ["Professor", "Student"]
+    assert "Person" in ontology_processor.run_query({"query": "ancestors", "class": "Student"})
+    assert ontology_processor.run_query({"query": "is_subclass_of", "class": "Student", "ancestor": "Person"})
+    domains, ranges = ontology_processor.run_query({"query": "domains_and_ranges", "property": "teaches"})
+    assert set(domains) == {"Professor"} and set(ranges) == {"Course"}
+    assert "int" in ontology_processor.run_query({"query": "domains_and_ranges", "property": "hasAge"})[1]
+    assert "FunctionalProperty" in ontology_processor.run_query({"query": "characteristics", "property": "hasAge"})
+
+    with pytest.raises(ValueError):
+        ontology_processor.run_query({"query": "unknown"})
+    with pytest.raises(ValueError):
+        ontology_processor.run_query({"query": "subclasses"})
+
+def test_run_batch_file_writes_one_result_per_query(ontology_processor):
+    queries = io.StringIO("\n".join([
+        json.dumps({"id": 1, "query": "individuals", "class": "Student"}),
+        json.dumps({"id": 2, "query": "subclasses", "class": "NonExistentClass"}),
+        "",
+        "not json",
+        json.dumps({"id": 3, "query": "descendants", "class": "Person", "include_self": True}),
+    ]))
+    results = io.StringIO()
+
+    counts = ontology_processor.run_batch_file(queries, results)
+
+    lines = [json.loads(line) for line in results.getvalue().splitlines()]
+    assert counts == {"queries": 4, "errors": 2}
+    assert lines[0]["id"] == 1 and lines[0]["result"] == ["John"]
+    assert lines[1]["id"] == 2 and "error" in lines[1]
+    assert lines[2]["line"] == 4 and "error" in lines[2]
+    assert {"Person", "Professor", "Student"} <= set(lines[3]["result"])
+
+def test_run_batch_takes_lock_per_query(ontology_processor):
+    held = []
+
+    class Lock:
+        def __enter__(self):
+            held.append(True)
+
+        def __exit__(self, *exc):
+            held[-1] = False
+
+    queries = io.StringIO('{"query": "hierarchy"}\nnot json\n{"query": "metrics"}\n')
+    ontology_processor.run_batch_file(queries, io.StringIO(), Lock())
+    # Taken for each query and released in between, so a long batch does not block other users
+    assert held == [False, False]
+
+def test_run_batch_reports_inconsistency_per_query(ontology_processor, monkeypatch):
+    def inconsistent():
+        raise OwlReadyInconsistentOntologyError()
+
+    ontology_processor.reasoning_enabled = True
+    monkeypatch.setattr(ontology_processor.reasoning, "classify", inconsistent)
+    queries = io.StringIO(json.dumps({"query": "reasoning", "class": "Student"}) + "\n" +
+                          json.dumps({"query": "subclasses", "class": "Person"}) + "\n")
+    results = io.StringIO()
+
+    counts = ontology_processor.run_batch_file(queries, results)
+
+    lines = [json.loads(line) for line in results.getvalue().splitlines()]
+    assert counts == {"queries": 2, "errors": 1}
+    assert lines[0]["error"] == "The ontology is inconsistent"
+    assert {"Professor", "Student"} <= set(lines[1]["result"])
+
+def test_query_server_answers_concurrent_requests(ontology_processor):
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    from urllib.error import HTTPError
+    from urllib.request import Request, urlopen
+
+    server = QueryServer(ontology_processor, "127.0.0.1", 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    def get(path):
+        with urlopen(base + path) as response:
+            return json.loads(response.read())
+
+    try:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(get, ["/query/subclasses?class=Person"] * 20 + ["/query/reasoning?class=Student"] * 20))
+        assert all({"Professor", "Student"} <= set(r["result"]) for r in results[:20])
+        assert all("Person" in r["result"] for r in results[20:])
+
+        request = Request(base + "/query", data=json.dumps({"query": "metrics"}).encode(), method="POST")
+        with urlopen(request) as response:
+            assert json.loads(response.read())["result"]["num_classes"] >= 4
+        request = Request(base + "/batch", data=b'{"query": "hierarchy"}\n{"query": "nope"}\n', method="POST")
+        with urlopen(request) as response:
+            lines = [json.loads(line) for line in response.read().decode().splitlines()]
+        assert "Person" in lines[0]["result"]["Thing"] and "error" in lines[1]
+        with pytest.raises(HTTPError) as error:
+            get("/query/subclasses?class=NonExistentClass")
+        assert error.value.code == 404
+        with pytest.raises(HTTPError) as error:
+            get("/query/subclasses")
+        assert error.value.code == 400
+        with pytest.raises(HTTPError) as error:
+            urlopen(Request(base + "/query", data=json.dumps({"query": "subclasses", "class": ["Person"]}).encode(),
+                            method="POST"))
+        assert error.value.code == 400
+
+        stats = get("/stats")
+        assert stats["subclasses"]["count"] == 23
+        assert stats["reasoning"]["count"] == 20
+        assert stats["reasoning"]["p50_ms"] <= stats["reasoning"]["p99_ms"]
+
+        def fail(query):
+            raise RuntimeError("boom")
+
+        server.answer = fail
+        with pytest.raises(HTTPError) as error:
+            get("/query/metrics")
+        assert error.value.code == 500 and "boom" in json.loads(error.value.read())["error"]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def _slow_structural_reasoning(ontology_processor, monkeypatch, seconds):
+    import time
+    run_reasoner = ReasoningSession._run_reasoner
+    def slow_run_reasoner(session, cache_path):
+        time.sleep(seconds)
+        run_reasoner(session, cache_path)
+    monkeypatch.setattr(ReasoningSession, "_run_reasoner", slow_run_reasoner)
+    ontology_processor.reasoning.backend = "structural"
+    with ontology_processor.ontology:
+        types.new_class("TeachingAssistant", (ontology_processor.ontology.Student,))
+
+def test_async_queries_flow_during_classification(ontology_processor, monkeypatch):
+    import asyncio
+    _slow_structural_reasoning(ontology_processor, monkeypatch, 1.0)
+
+    async def scenario():
+        async with AsyncOntologyProcessor(ontology_processor, query_workers=2) as processor:
+            classification = asyncio.ensure_future(processor.classify())
+            await asyncio.sleep(0.1)
+            subclasses = await asyncio.gather(*[processor.query_subclasses("Person") for _ in range(10)])
+            answered_during_classification = not classification.done()
+            await classification
+            return subclasses, answered_during_classification
+
+    subclasses, answered_during_classification = asyncio.run(scenario())
+    assert answered_during_classification
+    assert all({"Student", "Professor"} <= {c.name for c in result} for result in subclasses)
+    assert not ontology_processor.reasoning.dirty
+    assert ontology_processor.reasoning.runs[-1]["backend"] == "structural"
+
+def test_async_classification_timeout_drops_inferences(ontology_processor, monkeypatch):
+    import asyncio
+    _slow_structural_reasoning(ontology_processor, monkeypatch, 0.5)
+
+    async def scenario():
+        processor = AsyncOntologyProcessor(ontology_processor)
+        with pytest.raises(asyncio.TimeoutError):
+            await processor.classify(timeout=0.1)
+        await asyncio.sleep(0.8)
+        return await processor.query_subclasses("Student", timeout=5)
+
+    assert "TeachingAssistant" in [c.name for c in asyncio.run(scenario())]
+    assert ontology_processor.reasoning.dirty
+
+def test_detached_classification_leaves_store_uncommitted(ontology_file, tmp_path, monkeypatch):
+    import sqlite3
+    import threading
+    processor = OntologyProcessor(ontology_file, quadstore_dir=str(tmp_path / "quadstores"))
+    onto = processor.ontology
+    session = ReasoningSession(onto, backend="structural")
+    with onto:
+        pupil = types.new_class("Pupil", (Thing,))
+        pupil.equivalent_to.append(onto.Student)
+
+    assert session.classify_detached(threading.Lock())
+    assert onto.Person in pupil.is_a
+    # The store on disk still holds only what was saved
+    store = sqlite3.connect(onto.world.graph.filename)
+    assert store.execute("SELECT COUNT() FROM resources WHERE iri=?", (pupil.iri,)).fetchone()[0] == 0
+    store.close()
+
+    closed = []
+    monkeypatch.setattr(World, "close", lambda world: closed.append(world))
+    def failing_reasoner(session, cache_path):
+        raise RuntimeError("reasoner crashed")
+    monkeypatch.setattr(ReasoningSession, "_run_reasoner", failing_reasoner)
+    with onto:
+        types.new_class("Tutor", (onto.Person,))
+    with pytest.raises(RuntimeError):
+        session.classify_detached(threading.Lock())
+    assert len(closed) == 1
+
+def test_query_results_cached_until_ontology_changes(ontology_processor, monkeypatch):
+    calls = []
+    classes = ontology_processor.ontology.classes
+    monkeypatch.setattr(ontology_processor.ontology, "classes", lambda: calls.append(1) or classes())
+
+    first, _ = ontology_processor.query_entities()
+    first.clear()
+    second, _ = ontology_processor.query_entities()
+    assert len(calls) == 1 and len(second) >= 4
+
+    metrics = ontology_processor.get_ontology_metrics()
+    with ontology_processor.ontology:
+        types.new_class("Lecturer", (ontology_processor.ontology.Person,))
+    third, _ = ontology_processor.query_entities()
+    assert len(calls) == 2 and "Lecturer" in [c.name for c in third]
+    assert ontology_processor.get_ontology_metrics()["num_classes"] == metrics["num_classes"] + 1
+
+def test_query_result_cache_is_bounded(ontology_processor):
+    ontology_processor.result_cache_size = 2
+    for class_name in ["Person", "Student", "Professor"]:
+        ontology_processor.query_individuals(class_name)
+    assert [key[1] for key in ontology_processor._results] == [("Student",), ("Professor",)]
+
+def test_iter_entities_streams_in_pages(ontology_processor):
+    classes = {c.name for c in ontology_processor.ontology.classes()}
+    assert {c.name for c in ontology_processor.iter_entities("classes")} == classes
+
+    names, cursor = [], None
+    while True:
+        page = ontology_processor.run_query({"query": "page", "entity_type": "classes", "limit": 2, "after": cursor})
+        names.extend(page["items"])
+        cursor = page["next"]
+        if cursor is None:
+            break
+    assert sorted(names) == sorted(classes)
+    assert [c.name for c in ontology_processor.iter_entities("classes", offset=1, limit=2)] == names[1:3]
+
+    with pytest.raises(ValueError):
+        list(ontology_processor.iter_entities("widgets"))
+
+def test_iter_individuals_and_subclasses_match_queries(ontology_processor):
+    assert {i.name for i in ontology_processor.iter_individuals("Person")} == \
+        {i.name for i in ontology_processor.query_individuals("Person")}
+    assert {c.name for c in ontology_processor.iter_subclasses("Person")} == \
+        {c.name for c in ontology_processor.query_subclasses("Person")}
+    page = ontology_processor.query_page("subclasses", "Person", limit=1)
+    assert len(page["items"]) == 1 and page["next"] == page["items"][0].storid
+    rest = list(ontology_processor.iter_subclasses("Person", after=page["next"]))
+    assert page["items"][0] not in rest and len(rest) >= 1
+
+def test_property_profiles_in_one_pass(ontology_processor):
+    onto = ontology_processor.ontology
+    with onto:
+        taught_by = types.new_class("isTaughtBy", (ObjectProperty, TransitiveProperty))
+        taught_by.inverse_property = onto.teaches
+        taught_by.domain = [onto.Course | onto.Person]
+
+    profiles = ontology_processor.property_profiles()
+    rows = {name: dict(zip(profiles, row)) for name, row in zip(profiles["name"], zip(*profiles.values()))}
+
+    for name in ["teaches", "attends", "hasAge", "hasName"]:
+        domains, ranges = ontology_processor.query_property_domains_and_ranges(name)
+        assert set(rows[name]["domain"]) == {d.name for d in domains}
+        assert set(ontology_processor.query_property_characteristics(name)) <= set(rows[name]["characteristics"])
+    assert rows["teaches"]["type"] == "object" and rows["teaches"]["range"] == ["Course"]
+    assert rows["hasAge"]["type"] == "data" and rows["hasAge"]["range"] == ["int"]
+    assert set(rows["hasAge"]["range"]) == set(ontology_processor.run_query({"query": "domains_and_ranges", "property": "hasAge"})[1])
+    assert rows["isTaughtBy"]["characteristics"] == ["TransitiveProperty"]
+    assert rows["isTaughtBy"]["inverse"] == "teaches" and rows["teaches"]["inverse"] == "isTaughtBy"
+    assert rows["isTaughtBy"]["domain"] == [str(onto.Course | onto.Person)]
+
+    try:
+        import pandas
+    except ImportError:
+        pandas = None
+    if pandas is not None:
+        assert list(ontology_processor.property_profile_frame()["name"]) == profiles["name"]
+    else:
+        with pytest.raises(ImportError):
+            ontology_processor.property_profile_frame()